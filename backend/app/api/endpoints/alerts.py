@@ -3,7 +3,10 @@ from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from typing import Dict, Any
 from app.services.notification_service import notification_service
-from app.services.alert_system import check_and_send_alerts
+from app.services.alert_system import check_and_send_alerts, alert_state
+from app.services.rate_limiter import rate_limiter
+from app.automation.pipeline import threat_pipeline
+from app.automation.leader import pipeline_leader
 import logging
 
 router = APIRouter()
@@ -125,4 +128,51 @@ async def get_users():
         logger.error(f"Error getting users: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-# You can add more alert-related endpoints here later
\ No newline at end of file
+@router.get("/alert-states")
+async def get_alert_states():
+    """
+    Current alert level, last send and pending all-clear for each zone
+    """
+    return {
+        "success": True,
+        "zones": alert_state.get_all()
+    }
+
+@router.get("/pipeline")
+async def get_pipeline_metrics():
+    """
+    Threat pipeline counters, queue depth and observation-to-alert lag
+    (the pipeline only runs in the leader process)
+    """
+    return {
+        "success": True,
+        "leader": pipeline_leader.get_status(),
+        "pipeline": threat_pipeline.get_metrics()
+    }
+
+@router.get("/rate-limits")
+async def get_rate_limits():
+    """
+    Live send rate and queue depth for each delivery provider
+    """
+    return {
+        "success": True,
+        "providers": rate_limiter.get_stats()
+    }
+
+# You can add more alert-related endpoints here later
+@router.get("/notifications/{notification_id}/delivered-rate")
+async def get_delivered_rate(notification_id: str):
+    """
+    Confirmed delivery rate per channel for one alert, from provider receipts
+    """
+    try:
+        channels = notification_service.delivery_log.get_delivered_rate(notification_id)
+        return {
+            "success": True,
+            "notification_id": notification_id,
+            "channels": channels
+        }
+    except Exception as e:
+        logger.error(f"Error fetching delivered rate: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
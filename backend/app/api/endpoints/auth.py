@@ -24,6 +24,8 @@ class UserProfileUpdateRequest(BaseModel):
     full_name: Optional[str] = None
     phone: Optional[str] = None
     location: Optional[str] = None
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
 
 class PasswordChangeRequest(BaseModel):
     current_password: str
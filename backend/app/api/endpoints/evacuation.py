@@ -1,5 +1,6 @@
 # backend/app/api/endpoints/evacuation.py
 from fastapi import APIRouter, HTTPException, Depends
+from pydantic import BaseModel
 from typing import Dict, List, Optional
 from datetime import datetime
 from app.services.notification_service import notification_service
@@ -7,6 +8,15 @@ from app.services.threat_detection import run_threat_detection
 
 router = APIRouter()
 
+class AreaEvacuationRequest(BaseModel):
+    polygon: Optional[List[List[float]]] = None  # [[lat, lon], ...] inundation polygon
+    track: Optional[List[List[float]]] = None  # [[lat, lon], ...] storm track
+    center_lat: Optional[float] = None
+    center_lon: Optional[float] = None
+    radius_km: Optional[float] = None
+    threat_level: str = "HIGH"
+    dry_run: bool = False
+
 @router.post("/trigger-evacuation")
 async def trigger_evacuation_alert(
     location: Optional[str] = None,
@@ -68,6 +78,54 @@ async def trigger_evacuation_alert(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error triggering evacuation alert: {str(e)}")
 
+@router.post("/trigger-evacuation-area")
+async def trigger_area_evacuation_alert(request: AreaEvacuationRequest):
+    """
+    Send an evacuation alert to users inside an inundation polygon, a radius
+    or a storm track buffer. With dry_run only the matching users are counted.
+    """
+    try:
+        affected_area = {
+            "polygon": request.polygon,
+            "track": request.track,
+            "center": [request.center_lat, request.center_lon] if request.center_lat is not None else None,
+            "radius_km": request.radius_km
+        }
+        threat_data = {
+            "timestamp": datetime.now().isoformat(),
+            "overall_threat": request.threat_level,
+            "storm_surge": {"threat_level": request.threat_level.lower()},
+            "affected_area": affected_area
+        }
+        
+        area = notification_service._get_affected_area(threat_data)
+        if not area:
+            raise HTTPException(status_code=400, detail="Provide a polygon, a track, or a center with radius_km")
+        
+        if request.dry_run:
+            users = notification_service.get_users_in_area(**area)
+            return {
+                "success": True,
+                "message": f"{len(users)} users in affected area",
+                "total_users": len(users),
+                "timestamp": datetime.now().isoformat()
+            }
+        
+        result = notification_service.send_evacuation_alert(threat_data)
+        
+        return {
+            "success": result["success"],
+            "message": result["message"],
+            "affected_area": affected_area,
+            "results": result.get("results", {}),
+            "timestamp": datetime.now().isoformat()
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error triggering area evacuation alert: {str(e)}")
+
 @router.post("/test-evacuation")
 async def test_evacuation_system():
     """
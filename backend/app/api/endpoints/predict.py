@@ -1,7 +1,15 @@
 # backend/app/api/endpoints/predict.py
-from fastapi import APIRouter, HTTPException
+import asyncio
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+from fastapi.concurrency import run_in_threadpool
+from app.core.config import settings
 from app.services.prediction_service import prediction_service
 from app.services.threat_detection import run_threat_detection
+from app.services.batch_detection import parse_stations
+from app.services.threat_snapshot import threat_snapshot
+from app.services.threat_stream import threat_hub
 import pandas as pd
 import logging
 
@@ -48,27 +56,117 @@ async def predict_cyclone(data: dict):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [value.strip().removeprefix("W/") for value in if_none_match.split(",")]
+    return "*" in candidates or f'"{etag}"' in candidates
+
 @router.get("/threat-detection")
-async def threat_detection():
+async def threat_detection(request: Request, station: Optional[str] = None, fresh: bool = False):
     """
-    Run comprehensive threat detection (cyclone + storm surge)
-    and return the results
+    Latest threat assessment (cyclone + storm surge) for a monitoring station
+
+    Served from the snapshot the pipeline publishes; it is only recomputed
+    when there is none yet, it is older than THREAT_SNAPSHOT_MAX_AGE_SECONDS,
+    or ?fresh=true is passed. A recomputed assessment is served as is and
+    not published, since only the pipeline numbers snapshot versions (the
+    ids SSE clients resume from). Supports ETag / If-None-Match.
+
+    If recomputing fails, the last snapshot is served when there is one;
+    otherwise the response is a 500. (Before snapshots this endpoint
+    answered 200 with the failed assessment's error payload.)
+
+    Args:
+        station: Station id from MONITORING_STATIONS (defaults to the first one)
+        fresh: Recompute now instead of serving the snapshot
     """
-    try:
-        # Run the threat detection
-        threat_data = run_threat_detection() 
-        
-        return {
-            "status": "success",
-            "data": threat_data,
-            "message": "Threat assessment completed successfully"
-        }
-    except Exception as e:
-        logger.error(f"Error in threat detection: {e}")
-        raise HTTPException(
-            status_code=500, 
-            detail="Failed to complete threat assessment"
-        )
+    stations = {s.station_id: s for s in parse_stations(settings.MONITORING_STATIONS)}
+    station_id = station or next(iter(stations), "mumbai")
+    if station and station not in stations:
+        raise HTTPException(status_code=404, detail=f"Unknown station: {station}")
+
+    entry = threat_snapshot.get(station_id)
+    if fresh or entry is None or threat_snapshot.is_stale(entry):
+        try:
+            monitored = stations.get(station_id)
+            threat_data = await run_in_threadpool(
+                run_threat_detection,
+                latitude=monitored.latitude if monitored else None,
+                longitude=monitored.longitude if monitored else None,
+                location=station_id,
+                station_id=station_id
+            )
+            if "error" in threat_data:
+                raise RuntimeError(threat_data["error"])
+            entry = threat_snapshot.unpublished(threat_data)
+        except Exception as e:
+            logger.error(f"Error in threat detection: {e}")
+            if entry is None:
+                raise HTTPException(
+                    status_code=500, 
+                    detail="Failed to complete threat assessment"
+                )
+
+    headers = {"ETag": f'"{entry["etag"]}"', "Cache-Control": "no-cache"}
+    if entry["version"] is not None:
+        headers["X-Snapshot-Version"] = str(entry["version"])
+    if not fresh and _etag_matches(request.headers.get("if-none-match"), entry["etag"]):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry["body"], media_type="application/json", headers=headers)
+
+@router.get("/threat-snapshot")
+async def get_threat_snapshot():
+    """
+    Latest threat for every monitoring station, with versions
+    """
+    return {"status": "success", "data": threat_snapshot.get_all()}
+
+@router.get("/threat-stream")
+async def threat_stream(request: Request):
+    """
+    Server-Sent Events stream of threat snapshot changes
+
+    Sends a "snapshot" event with every station on connect, then a "delta"
+    event with only the stations that changed whenever the snapshot moves.
+    Event ids are snapshot versions, so a reconnecting EventSource resumes
+    from Last-Event-ID with just what it missed.
+    """
+    last_event_id = request.headers.get("last-event-id", "")
+    since = int(last_event_id) if last_event_id.isdigit() else None
+    queue = threat_hub.subscribe()
+
+    async def events():
+        try:
+            yield b"retry: 3000\n\n"
+            initial = await run_in_threadpool(threat_hub.snapshot_event, since)
+            if initial:
+                yield initial
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout=settings.STREAM_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield b": keep-alive\n\n"
+                    continue
+                if message is None:
+                    break
+                yield message
+        finally:
+            threat_hub.unsubscribe(queue)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    })
+
+@router.get("/threat-stream/stats")
+async def threat_stream_stats():
+    """
+    Subscriber count and broadcast counters for this worker
+    """
+    return {"status": "success", "data": threat_hub.get_stats()}
 
 @router.get("/health")
 async def health_check():
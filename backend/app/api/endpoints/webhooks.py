@@ -0,0 +1,175 @@
+# backend/app/api/endpoints/webhooks.py
+import hmac
+import json
+import logging
+from typing import Dict, Iterator, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import requests
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.services.delivery_receipts import receipt_buffer
+from app.services.webhook_signatures import sns_verifier, verify_twilio_signature
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+# Receipts are only buffered here; answering fast keeps provider retries down
+ACCEPTED = 204
+
+
+def _check_token(request: Request) -> None:
+    # Without a secret anyone could write delivery statuses, so the routes stay closed
+    if not settings.WEBHOOK_SECRET:
+        logger.warning("Webhook call refused: WEBHOOK_SECRET is not configured")
+        raise HTTPException(status_code=503, detail="Webhooks are not configured")
+    if not hmac.compare_digest(request.query_params.get("token", ""), settings.WEBHOOK_SECRET):
+        raise HTTPException(status_code=403, detail="Invalid webhook token")
+
+
+def _public_url(request: Request) -> str:
+    """The URL the provider called (and signed), as seen from outside any proxy"""
+    if not settings.WEBHOOK_BASE_URL:
+        return str(request.url)
+    query = f"?{request.url.query}" if request.url.query else ""
+    return f"{settings.WEBHOOK_BASE_URL.rstrip('/')}{request.url.path}{query}"
+
+
+async def _read_form(request: Request) -> Dict[str, str]:
+    # Parsed by hand so form callbacks don't need python-multipart
+    body = (await request.body()).decode("utf-8", errors="replace")
+    return {key: values[-1] for key, values in parse_qs(body).items()}
+
+
+async def _read_json(request: Request):
+    try:
+        return json.loads(await request.body() or b"null")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid JSON body")
+
+
+@router.post("/twilio")
+async def twilio_status_callback(request: Request):
+    """
+    Twilio message status callback (MessageSid, MessageStatus, ErrorCode),
+    authenticated by its X-Twilio-Signature
+    """
+    if not settings.TWILIO_AUTH_TOKEN:
+        logger.warning("Twilio callback refused: TWILIO_AUTH_TOKEN is not configured")
+        raise HTTPException(status_code=503, detail="Webhooks are not configured")
+    form = await _read_form(request)
+    if not verify_twilio_signature(settings.TWILIO_AUTH_TOKEN, _public_url(request), form,
+                                   request.headers.get("X-Twilio-Signature")):
+        raise HTTPException(status_code=403, detail="Invalid Twilio signature")
+    receipt_buffer.add("twilio", form.get("MessageSid"), form.get("MessageStatus"), form.get("ErrorCode"))
+    return Response(status_code=ACCEPTED)
+
+
+@router.api_route("/nexmo", methods=["GET", "POST"])
+async def nexmo_delivery_receipt(request: Request):
+    """
+    Nexmo (Vonage) delivery receipt, sent as query string, form or JSON
+    """
+    _check_token(request)
+    fields = dict(request.query_params)
+    if request.method == "POST":
+        if request.headers.get("content-type", "").startswith("application/json"):
+            fields.update(await _read_json(request) or {})
+        else:
+            fields.update(await _read_form(request))
+    receipt_buffer.add("nexmo", fields.get("messageId"), fields.get("status"), fields.get("err-code"))
+    return Response(status_code=ACCEPTED)
+
+
+def _sns_delivery_logs(payload) -> Iterator[Tuple[Optional[str], Optional[str], Optional[str]]]:
+    records = payload if isinstance(payload, list) else [payload]
+    for record in records:
+        if not isinstance(record, dict):
+            continue
+        delivery = record.get("delivery") or {}
+        yield (
+            (record.get("notification") or {}).get("messageId"),
+            record.get("status"),
+            delivery.get("providerResponse") if record.get("status") == "FAILURE" else None
+        )
+
+
+@router.post("/sns")
+async def sns_delivery_status(request: Request):
+    """
+    AWS SNS delivery status logs delivered through an HTTPS subscription
+
+    Accepts the subscription handshake and SNS notifications wrapping
+    delivery status log records, both authenticated by their SNS signature
+    and topic, and bare delivery status records, authenticated by token.
+    """
+    payload = await _read_json(request)
+    if not isinstance(payload, (dict, list)):
+        raise HTTPException(status_code=400, detail="Expected a JSON object")
+
+    message_type = payload.get("Type") if isinstance(payload, dict) else None
+    if message_type is None:
+        _check_token(request)
+    else:
+        topics = {arn.strip() for arn in settings.SNS_DELIVERY_TOPIC_ARNS.split(",") if arn.strip()}
+        if not topics:
+            logger.warning("SNS message refused: SNS_DELIVERY_TOPIC_ARNS is not configured")
+            raise HTTPException(status_code=503, detail="Webhooks are not configured")
+        # Any AWS account can sign messages for its own topics, so the topic must be ours too
+        if payload.get("TopicArn") not in topics or not await run_in_threadpool(sns_verifier.verify, payload):
+            raise HTTPException(status_code=403, detail="Invalid SNS signature")
+
+    if message_type == "SubscriptionConfirmation":
+        subscribe_url = payload.get("SubscribeURL", "")
+        if not (urlparse(subscribe_url).hostname or "").endswith(".amazonaws.com"):
+            raise HTTPException(status_code=400, detail="Unexpected SubscribeURL")
+        await run_in_threadpool(requests.get, subscribe_url, timeout=10)
+        logger.info("Confirmed SNS delivery status subscription")
+        return Response(status_code=ACCEPTED)
+
+    if message_type == "Notification":
+        try:
+            payload = json.loads(payload.get("Message") or "null")
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid SNS message")
+
+    for message_id, status, error in _sns_delivery_logs(payload):
+        receipt_buffer.add("aws_sns", message_id, status, error)
+    return Response(status_code=ACCEPTED)
+
+
+@router.post("/push")
+async def push_receipts(request: Request):
+    """
+    Push delivery receipts
+
+    Accepts {"message_id", "status", "error"} objects (single or list) and
+    receipt maps shaped like {"data": {"<message id>": {"status", "details"}}}.
+    """
+    _check_token(request)
+    payload = await _read_json(request)
+
+    if isinstance(payload, dict) and isinstance(payload.get("data"), dict):
+        for message_id, receipt in payload["data"].items():
+            receipt = receipt or {}
+            details = receipt.get("details") or {}
+            receipt_buffer.add("push", message_id, receipt.get("status"), details.get("error") or receipt.get("message"))
+        return Response(status_code=ACCEPTED)
+
+    receipts = payload if isinstance(payload, list) else [payload]
+    for receipt in receipts:
+        if isinstance(receipt, dict):
+            receipt_buffer.add(
+                "push", receipt.get("message_id") or receipt.get("id"), receipt.get("status"), receipt.get("error")
+            )
+    return Response(status_code=ACCEPTED)
+
+
+@router.get("/stats")
+async def get_receipt_stats():
+    """
+    Receipt ingestion counters (received, written, pending, dropped)
+    """
+    return {"success": True, "receipts": receipt_buffer.get_stats()}
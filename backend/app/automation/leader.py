@@ -0,0 +1,106 @@
+# backend/app/automation/leader.py
+import asyncio
+import logging
+import os
+import tempfile
+from typing import Awaitable, Callable, Dict, Optional
+
+from app.core.config import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+
+class LeaderElection:
+    """
+    Elects one process per host to run the ingestion/alert pipeline.
+
+    Every worker tries to take an exclusive, non-blocking lock on the same
+    file; the holder is the leader and the rest keep serving the API while
+    retrying every LEADER_RETRY_SECONDS. The OS drops the lock when the
+    leader process exits for any reason, so a follower takes over on its
+    next retry.
+
+    The lock is per host: workers on different machines each elect their own
+    leader, so multi-host deployments should point LEADER_LOCK_FILE at shared
+    storage that supports locking or run the pipeline on one host only.
+    """
+
+    def __init__(self, path: Optional[str] = None, retry_seconds: Optional[float] = None):
+        self.path = path or settings.LEADER_LOCK_FILE or os.path.join(tempfile.gettempdir(), "ctas_pipeline.lock")
+        self.retry_seconds = retry_seconds or settings.LEADER_RETRY_SECONDS
+        self.is_leader = False
+        self._fd: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def try_acquire(self) -> bool:
+        """Take the lock if it is free; never blocks"""
+        if self.is_leader:
+            return True
+        if self._fd is None:
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                msvcrt.locking(self._fd, msvcrt.LK_NBLCK, 1)
+        except OSError:
+            return False
+
+        self.is_leader = True
+        # Record the holder for anyone inspecting the lock file
+        os.ftruncate(self._fd, 0)
+        os.lseek(self._fd, 0, os.SEEK_SET)
+        os.write(self._fd, str(os.getpid()).encode())
+        return True
+
+    def release(self) -> None:
+        if self._fd is None:
+            return
+        try:
+            if self.is_leader:
+                if fcntl is not None:
+                    fcntl.flock(self._fd, fcntl.LOCK_UN)
+                else:
+                    os.lseek(self._fd, 0, os.SEEK_SET)
+                    msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(self._fd)
+            self._fd = None
+            self.is_leader = False
+
+    async def _campaign(self, on_elected: Callable[[], Awaitable[None]]) -> None:
+        while not self.try_acquire():
+            await asyncio.sleep(self.retry_seconds)
+        logger.info(f"Process {os.getpid()} elected pipeline leader ({self.path})")
+        await on_elected()
+
+    async def start(self, on_elected: Callable[[], Awaitable[None]]) -> None:
+        """Run for leadership in the background; on_elected runs once this process wins"""
+        self._task = asyncio.create_task(self._campaign(on_elected))
+
+    async def stop(self, on_resign: Optional[Callable[[], Awaitable[None]]] = None) -> None:
+        """Stop campaigning; if leading, run on_resign and then release the lock"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+        if self.is_leader and on_resign is not None:
+            await on_resign()
+        self.release()
+
+    def get_status(self) -> Dict:
+        return {"pid": os.getpid(), "is_leader": self.is_leader, "lock_file": self.path}
+
+
+# Create a global instance
+pipeline_leader = LeaderElection()
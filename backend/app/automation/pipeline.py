@@ -0,0 +1,233 @@
+# backend/app/automation/pipeline.py
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from app.core.config import settings
+from app.services.batch_detection import Station, parse_stations, fetch_station_observation, assess_observations
+from app.services.alert_system import check_and_send_alerts
+from app.services.threat_snapshot import threat_snapshot
+
+logger = logging.getLogger(__name__)
+
+# Fields that change on every fetch without the conditions changing
+VOLATILE_FIELDS = {"date", "timestamp", "valid"}
+
+# Alert decisions that reached users, for observation -> alert lag
+ALERT_DECISIONS = {"send", "escalate", "remind", "all_clear"}
+
+LAG_WINDOW = 500
+
+
+@dataclass
+class Observation:
+    station: Station
+    source: str
+    data: Dict[str, Any]
+    observed_at: float = field(default_factory=time.time)
+
+
+def parse_intervals(spec: str) -> Dict[str, float]:
+    """Parse PIPELINE_SOURCE_INTERVALS ("source:seconds,...")"""
+    intervals = {}
+    for entry in spec.split(","):
+        name, _, seconds = entry.strip().partition(":")
+        if name and seconds:
+            intervals[name] = max(1.0, float(seconds))
+    return intervals
+
+
+# Observation sources by name; each is polled per station at its own cadence
+SOURCES: Dict[str, Callable[[Station], Dict[str, Any]]] = {
+    "weather": fetch_station_observation
+}
+
+
+def _percentile(values: Deque[float], fraction: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))], 3)
+
+
+class ThreatPipeline:
+    """
+    Event-driven threat pipeline.
+
+    One ingestion task per (source, station) polls on a fixed grid of tick
+    times: a slow fetch skips the ticks it overran instead of overlapping or
+    drifting. Only changed observations are emitted. Each station has a
+    latest-value mailbox, so a backlog coalesces to the newest observation.
+    Stations wait in a bounded queue for detection workers; when that queue
+    is full, ingestion waits. A worker takes every ready station (up to
+    PIPELINE_BATCH_SIZE) and assesses them with one batched model call. A
+    station is never assessed by two workers at once.
+    """
+
+    def __init__(self, stations: Optional[List[Station]] = None, intervals: Optional[Dict[str, float]] = None,
+                 workers: Optional[int] = None, queue_size: Optional[int] = None):
+        self.stations = stations if stations is not None else parse_stations(settings.MONITORING_STATIONS)
+        self.intervals = intervals if intervals is not None else parse_intervals(settings.PIPELINE_SOURCE_INTERVALS)
+        self.workers = workers or settings.PIPELINE_DETECTION_WORKERS
+        self.queue_size = queue_size or settings.PIPELINE_QUEUE_SIZE
+        self._queue: Optional[asyncio.Queue] = None
+        self._latest: Dict[str, Observation] = {}
+        self._last_data: Dict[tuple, Dict[str, Any]] = {}
+        self._last_emitted_at: Dict[tuple, float] = {}
+        self._scheduled: set = set()
+        self._tasks: List[asyncio.Task] = []
+        self.counters = {
+            "ticks": 0, "skipped_ticks": 0, "observations": 0, "unchanged": 0,
+            "coalesced": 0, "detections": 0, "batches": 0, "alerts": 0, "errors": 0
+        }
+        self._detection_lag: Deque[float] = deque(maxlen=LAG_WINDOW)
+        self._alert_lag: Deque[float] = deque(maxlen=LAG_WINDOW)
+        self._last_detection: Dict[str, Dict[str, Any]] = {}
+
+    @property
+    def running(self) -> bool:
+        return any(not task.done() for task in self._tasks)
+
+    async def start(self) -> None:
+        """Start ingestion and detection tasks on the running event loop"""
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        for _ in range(self.workers):
+            self._tasks.append(asyncio.create_task(self._detect_loop()))
+        for source, interval in self.intervals.items():
+            if source not in SOURCES:
+                logger.error(f"Unknown observation source {source!r}, skipping")
+                continue
+            for station in self.stations:
+                self._tasks.append(asyncio.create_task(self._ingest_loop(source, interval, station)))
+        logger.info(f"Threat pipeline started: {len(self.stations)} stations, sources {self.intervals}, "
+                    f"{self.workers} detection workers")
+
+    async def stop(self) -> None:
+        """Cancel every task and wait for them to finish"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        logger.info("Threat pipeline stopped")
+
+    async def _ingest_loop(self, source: str, interval: float, station: Station) -> None:
+        loop = asyncio.get_running_loop()
+        fetch = SOURCES[source]
+        started = loop.time()
+        tick = 0
+        while True:
+            self.counters["ticks"] += 1
+            try:
+                data = await asyncio.to_thread(fetch, station)
+                await self._emit(Observation(station, source, data))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.counters["errors"] += 1
+                logger.error(f"Error ingesting {source} for {station.station_id}: {e}")
+
+            # Next tick on the fixed grid; ticks a slow fetch ran over are skipped, not queued up
+            elapsed_ticks = int((loop.time() - started) // interval) + 1
+            self.counters["skipped_ticks"] += max(0, elapsed_ticks - tick - 1)
+            tick = elapsed_ticks
+            await asyncio.sleep(max(0.0, started + tick * interval - loop.time()))
+
+    async def _emit(self, observation: Observation) -> None:
+        key = (observation.source, observation.station.station_id)
+        comparable = {k: v for k, v in observation.data.items() if k not in VOLATILE_FIELDS}
+        # Unchanged data is still re-assessed now and then so time-based alert transitions (all-clear) fire
+        if (self._last_data.get(key) == comparable
+                and observation.observed_at - self._last_emitted_at.get(key, 0.0) < settings.PIPELINE_REASSESS_SECONDS):
+            self.counters["unchanged"] += 1
+            return
+        self._last_data[key] = comparable
+        self._last_emitted_at[key] = observation.observed_at
+        self.counters["observations"] += 1
+
+        station_id = observation.station.station_id
+        if station_id in self._latest:
+            self.counters["coalesced"] += 1
+        self._latest[station_id] = observation
+        if station_id not in self._scheduled:
+            self._scheduled.add(station_id)
+            await self._queue.put(station_id)
+
+    async def _detect_loop(self) -> None:
+        while True:
+            station_ids = [await self._queue.get()]
+            while len(station_ids) < settings.PIPELINE_BATCH_SIZE and not self._queue.empty():
+                station_ids.append(self._queue.get_nowait())
+            try:
+                # Keep going while newer observations arrived during assessment
+                while observations := [
+                    observation for station_id in station_ids
+                    if (observation := self._latest.pop(station_id, None)) is not None
+                ]:
+                    try:
+                        await self._assess(observations)
+                    except asyncio.CancelledError:
+                        raise
+                    except Exception as e:
+                        self.counters["errors"] += 1
+                        logger.error(f"Error assessing stations {[o.station.station_id for o in observations]}: {e}")
+            finally:
+                for station_id in station_ids:
+                    self._scheduled.discard(station_id)
+                    self._queue.task_done()
+
+    async def _assess(self, observations: List[Observation]) -> None:
+        threats = await asyncio.to_thread(
+            assess_observations,
+            [observation.station for observation in observations],
+            [observation.data for observation in observations]
+        )
+        detected_at = time.time()
+        self.counters["detections"] += len(threats)
+        self.counters["batches"] += 1
+        for observation in observations:
+            self._detection_lag.append(detected_at - observation.observed_at)
+        await asyncio.to_thread(threat_snapshot.publish, threats)
+
+        for observation, threat_data in zip(observations, threats):
+            decision = await asyncio.to_thread(check_and_send_alerts, threat_data, threat_data.get("weather_data", {}))
+            if decision in ALERT_DECISIONS:
+                self.counters["alerts"] += 1
+                self._alert_lag.append(time.time() - observation.observed_at)
+
+            self._last_detection[observation.station.station_id] = {
+                "overall_threat": threat_data.get("overall_threat"),
+                "decision": decision,
+                "observed_at": observation.observed_at,
+                "detected_at": detected_at
+            }
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Counters, queue depth and observation -> detection / alert lag (seconds)"""
+        return {
+            "running": self.running,
+            "stations": [station.station_id for station in self.stations],
+            "intervals": self.intervals,
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "pending_stations": len(self._latest),
+            **self.counters,
+            "detection_lag": {
+                "p50": _percentile(self._detection_lag, 0.5),
+                "p95": _percentile(self._detection_lag, 0.95),
+                "last": round(self._detection_lag[-1], 3) if self._detection_lag else None
+            },
+            "alert_lag": {
+                "p50": _percentile(self._alert_lag, 0.5),
+                "p95": _percentile(self._alert_lag, 0.95),
+                "last": round(self._alert_lag[-1], 3) if self._alert_lag else None
+            },
+            "last_detection": self._last_detection
+        }
+
+
+# Create a global instance
+threat_pipeline = ThreatPipeline()
@@ -42,6 +42,67 @@ class Settings(BaseSettings):
     PUSH_API_KEY: str = ""
     PUSH_API_URL: str = ""
     
+    # Delivery rate limits (messages per second)
+    EMAIL_RATE_LIMIT: float = 10.0
+    SMS_RATE_LIMIT: float = 30.0
+    SMS_SENDER_RATE_LIMIT: float = 1.0  # Twilio long codes allow ~1 message/sec per number
+    PUSH_RATE_LIMIT: float = 100.0
+    NOTIFICATION_MAX_WORKERS: int = 8
+    
+    # Delivery prioritisation
+    PRIORITY_SURGE_RADIUS_KM: float = 20.0
+    ZONE_CACHE_TTL_SECONDS: int = 60
+    # Recipients are streamed in pages; priority ordering applies within the pending window
+    RECIPIENT_PAGE_SIZE: int = 1000
+    DELIVERY_QUEUE_SIZE: int = 10000
+    # Full rebuild interval for the in-memory recipient index (incremental updates in between)
+    RECIPIENT_INDEX_TTL_SECONDS: int = 900
+    # Area alerts wait this long for a first index build before a bounded bounding-box query
+    RECIPIENT_INDEX_WAIT_SECONDS: float = 10.0
+    # Grid cell size for area targeting (inundation polygons, storm track buffers)
+    GEO_INDEX_CELL_KM: float = 5.0
+    STORM_TRACK_BUFFER_KM: float = 25.0
+    # Users with no coordinates and no located zone can't be placed in an area; alert them
+    # with every area alert rather than never
+    AREA_ALERT_INCLUDE_UNLOCATED: bool = True
+    
+    # Channel failover: give up on a channel this long after its send starts (its rate-limit
+    # token acquired) and try the next one
+    CHANNEL_TIMEOUT_SECONDS: float = 15.0
+    # Threat levels (overall or storm surge) that are sent on every channel at once
+    REDUNDANT_CHANNEL_THREAT_LEVELS: str = "EXTREME"
+    
+    # Delivery log: rows per multi-row insert into notification_deliveries
+    DELIVERY_LOG_BATCH_SIZE: int = 500
+    DELIVERY_LOG_QUEUE_SIZE: int = 200  # Pending writes (batches); beyond this they go to the spill file
+    # A failed write is retried this many times, backing off from DELIVERY_LOG_RETRY_SECONDS, then
+    # spilled to a local file that is replayed whenever the writer is idle
+    DELIVERY_LOG_WRITE_ATTEMPTS: int = 3
+    DELIVERY_LOG_RETRY_SECONDS: float = 1.0
+    DELIVERY_LOG_SPILL_FILE: str = "delivery_log_spill.jsonl"
+    
+    # Delivery receipts from provider status webhooks
+    WEBHOOK_BASE_URL: str = ""  # Public base URL of this API, used for per-message status callbacks
+    WEBHOOK_SECRET: str = ""  # Required: Nexmo, push and bare SNS receipts must carry ?token=<secret>
+    # Twilio callbacks are checked against TWILIO_AUTH_TOKEN (X-Twilio-Signature), SNS messages
+    # against their signature and this comma-separated list of delivery status topics
+    SNS_DELIVERY_TOPIC_ARNS: str = ""
+    RECEIPT_BATCH_SIZE: int = 1000
+    RECEIPT_FLUSH_INTERVAL_SECONDS: float = 2.0
+    RECEIPT_BUFFER_MAX: int = 200000
+    
+    # Alert deduplication: same-level repeats per zone are held back for this long;
+    # the all-clear goes out once a zone has been below threshold this long
+    ALERT_SUPPRESSION_MINUTES: int = 60
+    ALERT_ALL_CLEAR_MINUTES: int = 30
+    ALERT_STATE_FILE: str = "alert_state.json"  # Used when the alert_states table is unavailable
+    # Failed alerts (the users they missed) and failed all-clears are retried after this long,
+    # doubling each time; after the last attempt the alert is given up on and the zone moves on
+    ALERT_RETRY_SECONDS: int = 60
+    ALERT_MAX_ATTEMPTS: int = 5
+    # Alerts whose threat carries no area geometry go to users this close to their station
+    STATION_ALERT_RADIUS_KM: float = 50.0
+    
     # Weather API Keys
     STORMGLASS_API_KEY: str = ""
     NOAA_API_KEY: str = ""
@@ -53,6 +114,33 @@ class Settings(BaseSettings):
     DEFAULT_LATITUDE: str = "19.0760"
     DEFAULT_LONGITUDE: str = "72.8777"
     
+    # Threat pipeline: monitored stations as "id:lat:lon", comma separated
+    # (the id doubles as the storm surge coastal profile, e.g. "mumbai")
+    MONITORING_STATIONS: str = "mumbai:19.0760:72.8777"
+    # Polling cadence per observation source, "source:seconds"
+    PIPELINE_SOURCE_INTERVALS: str = "weather:60"
+    # Stations waiting for detection; ingestion waits when this is full
+    PIPELINE_QUEUE_SIZE: int = 100
+    PIPELINE_DETECTION_WORKERS: int = 4
+    # Unchanged observations are re-assessed at most this often
+    PIPELINE_REASSESS_SECONDS: int = 300
+    # Stations assessed together in one model call, and fetch workers for batch cycles
+    PIPELINE_BATCH_SIZE: int = 256
+    DETECTION_MAX_WORKERS: int = 16
+    # Only the worker holding this lock runs the pipeline (default: <tmp>/ctas_pipeline.lock)
+    LEADER_LOCK_FILE: str = ""
+    LEADER_RETRY_SECONDS: float = 5.0
+    # Latest threat per station, shared with the other workers (default: <tmp>/ctas_threat_snapshot.json)
+    THREAT_SNAPSHOT_FILE: str = ""
+    # /threat-detection recomputes when the snapshot for a station is older than this
+    THREAT_SNAPSHOT_MAX_AGE_SECONDS: int = 900
+    # Threat stream: snapshot checks, keep-alive comments, and events buffered per slow subscriber
+    STREAM_POLL_SECONDS: float = 1.0
+    STREAM_HEARTBEAT_SECONDS: float = 15.0
+    STREAM_SUBSCRIBER_QUEUE: int = 16
+    # Cyclone model: "xgboost" (single observation) or "sequence" (last 24 hourly readings per station)
+    CYCLONE_MODEL: str = "xgboost"
+    
     # Debug and logging
     DEBUG: bool = True
     LOG_LEVEL: str = "INFO"
@@ -0,0 +1,86 @@
+"""
+Phone number normalization for CTAS AI Backend
+
+Numbers are validated and converted to E.164 once, when a profile is written,
+and stored in profiles.phone_e164. Senders then use the stored value; the
+cached to_e164 only does real work for numbers that were never normalized.
+"""
+import re
+from functools import lru_cache
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Compiled once at import instead of on every call
+_PHONE_FORMAT = re.compile(r'^\+?[\d\s\-\(\)]+$')
+_NON_DIGITS = re.compile(r'\D')
+
+MIN_DIGITS = 7
+MAX_DIGITS = 15
+DEFAULT_COUNTRY_CODE = "91"  # India
+
+
+@lru_cache(maxsize=65536)
+def to_e164(phone: Optional[str]) -> Optional[str]:
+    """
+    Validate a phone number and return it in E.164 form
+
+    Args:
+        phone: Raw phone number (digits, spaces, dashes, brackets, optional leading +)
+
+    Returns:
+        E.164 phone number, or None if the number is invalid
+    """
+    if not phone or not _PHONE_FORMAT.match(phone):
+        return None
+
+    digits_only = _NON_DIGITS.sub('', phone)
+    if len(digits_only) < MIN_DIGITS or len(digits_only) > MAX_DIGITS:
+        return None
+
+    # Add country code if not present
+    if len(digits_only) == 10:
+        return f"+{DEFAULT_COUNTRY_CODE}{digits_only}"
+    return f"+{digits_only}"
+
+
+def is_valid_phone(phone: Optional[str]) -> bool:
+    """
+    Check whether a phone number can be normalized
+    """
+    return to_e164(phone) is not None
+
+
+def _string_dtype() -> str:
+    try:
+        import pyarrow  # noqa: F401
+        # Arrow-backed strings run the regex kernels in C++, several times faster than object strings
+        return "string[pyarrow]"
+    except ImportError:
+        return "string"
+
+
+def normalize_phone_series(phones: "pd.Series") -> "pd.Series":
+    """
+    Vectorized to_e164 for bulk backfills
+
+    Args:
+        phones: Series of raw phone numbers (may contain None/NaN)
+
+    Returns:
+        Series of E.164 numbers, None where the input is missing or invalid
+    """
+    # pandas is only needed here (bulk backfills), so the senders don't pay for importing it
+    raw = phones.astype(_string_dtype())
+    digits = raw.str.replace(_NON_DIGITS.pattern, '', regex=True)
+    lengths = digits.str.len()
+
+    valid = (
+        raw.str.match(_PHONE_FORMAT.pattern).fillna(False)
+        & (lengths >= MIN_DIGITS).fillna(False)
+        & (lengths <= MAX_DIGITS).fillna(False)
+    )
+    needs_country_code = (lengths == 10).fillna(False)
+    e164 = ("+" + digits).where(~needs_country_code, "+" + DEFAULT_COUNTRY_CODE + digits)
+    return e164.astype(object).where(valid, None)
@@ -2,8 +2,20 @@
 Utility functions for CTAS AI Backend
 """
 import json
+import logging
+import math
+import threading
+import time
 from datetime import datetime, date
-from typing import Any, Dict, List, Union
+from typing import Any, Dict, List, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# Missing optional columns are probed again after this long (a migration may have run since)
+COLUMN_PROBE_RETRY_SECONDS = 300.0
+
+_column_probes: Dict[Tuple[str, str], Tuple[bool, float]] = {}
+_column_probes_lock = threading.Lock()
 
 def serialize_datetime(obj: Any) -> Any:
     """
@@ -89,3 +101,52 @@ def format_datetime(dt: Union[datetime, str, None]) -> str:
         return dt.strftime("%Y-%m-%d %H:%M:%S")
     
     return str(dt)
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """
+    Great-circle distance between two points in kilometres
+    
+    Args:
+        lat1, lon1: First point in decimal degrees
+        lat2, lon2: Second point in decimal degrees
+        
+    Returns:
+        Distance in kilometres
+    """
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 6371.0 * 2 * math.asin(math.sqrt(min(1.0, a)))
+
+def table_has_columns(client: Any, table: str, columns: str) -> bool:
+    """
+    Whether a table has the given columns, for columns added by optional setup scripts
+    
+    Probed with a one-row select; a column found stays found, a missing one
+    is probed again after COLUMN_PROBE_RETRY_SECONDS.
+    
+    Args:
+        client: Supabase client (None means no)
+        table: Table name
+        columns: Comma-separated column names, as passed to select()
+        
+    Returns:
+        True if a select of those columns succeeds
+    """
+    if client is None:
+        return False
+    key = (table, columns)
+    with _column_probes_lock:
+        found, probed_at = _column_probes.get(key, (False, None))
+    if found or (probed_at is not None and time.monotonic() - probed_at < COLUMN_PROBE_RETRY_SECONDS):
+        return found
+    try:
+        client.table(table).select(columns).limit(1).execute()
+        found = True
+    except Exception as e:
+        logger.warning(f"{table} has no {columns} column(s), continuing without them: {e}")
+        found = False
+    with _column_probes_lock:
+        _column_probes[key] = (found, time.monotonic())
+    return found
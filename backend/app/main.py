@@ -3,10 +3,11 @@ from pathlib import Path
 from dotenv import load_dotenv
 from fastapi import FastAPI
 from contextlib import asynccontextmanager
-import threading
 from fastapi.middleware.cors import CORSMiddleware
-from app.api.endpoints import predict, data, alerts, evacuation, auth
-from app.automation.scheduler import start_scheduler
+from app.api.endpoints import predict, data, alerts, evacuation, auth, webhooks
+from app.automation.pipeline import threat_pipeline
+from app.automation.leader import pipeline_leader
+from app.services.recipient_index import recipient_index
 
 # Load environment variables from the backend/.env file
 env_path = Path(__file__).resolve().parent.parent / '.env'
@@ -21,15 +22,18 @@ print("SMTP_PASSWORD:", "SET" if os.getenv("SMTP_PASSWORD") else "MISSING")
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Start the scheduler in a separate thread when the app starts
-    scheduler_thread = threading.Thread(target=start_scheduler, daemon=True)
-    scheduler_thread.start()
-    print("Automated prediction scheduler started")
+    # Only the elected leader runs the threat pipeline; every worker serves the API
+    await pipeline_leader.start(on_elected=threat_pipeline.start)
+    print("Running for threat pipeline leadership")
+    
+    # Warm the recipient targeting index in the background
+    recipient_index.ensure_fresh()
     
     yield
     
     # Clean up when the app stops
-    print("Shutting down scheduler")
+    print("Shutting down threat pipeline")
+    await pipeline_leader.stop(on_resign=threat_pipeline.stop)
 
 app = FastAPI(
     title="CTAS AI - Coastal Threat Alert System",
@@ -53,6 +57,7 @@ app.include_router(data.router, prefix="/api/v1", tags=["data"])
 app.include_router(alerts.router, prefix="/api/v1", tags=["alerts"])
 app.include_router(evacuation.router, prefix="/api/v1/evacuation", tags=["evacuation"])
 app.include_router(auth.router, prefix="/api/v1/auth", tags=["authentication"])
+app.include_router(webhooks.router, prefix="/api/v1/webhooks", tags=["webhooks"])
 
 @app.get("/")
 async def root():
@@ -66,7 +71,8 @@ async def root():
             "prediction": "/api/v1/prediction",
             "data": "/api/v1/data",
             "evacuation": "/api/v1/evacuation",
-            "sms": "/api/v1/sms"
+            "sms": "/api/v1/sms",
+            "webhooks": "/api/v1/webhooks"
         }
     }
 
@@ -0,0 +1,179 @@
+# app/ml_models/compact_model.py
+#
+# Post-training step for the low-latency serving profile: flattens the model
+# saved by train_model.save_model into a CompactForest, prunes it, checks it
+# against the original on the held-out data and writes model_compact.npz,
+# which CyclonePredictor loads instead of model.pkl when it is present.
+
+import argparse
+import os
+import pickle
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+
+from dataset import dataset_path, load_dataset
+from features import FeaturePipeline
+from forest import CompactForest, booster_proba, file_sha1
+from train_model import DATA_FILE, LOAD_COLUMNS, holdout_cutoff
+
+# Largest allowed |compact - original| class probability, for pruning and for the final check
+DEFAULT_TOLERANCE = 0.005
+
+# Rows used to pick the number of rounds; the final check runs on the whole holdout
+PRUNE_SAMPLE_ROWS = 50_000
+
+
+def load_package(model_path):
+    with open(model_path, 'rb') as f:
+        package = pickle.load(f)
+    # Packages saved before the pipeline was stored get an unfitted one, like CyclonePredictor
+    spec = package.get('feature_pipeline') or {'features': package['features']}
+    return package, FeaturePipeline.from_spec(spec)
+
+
+def reference_proba(model, X):
+    """The original model's class probabilities, the way CyclonePredictor computes them"""
+    if isinstance(model, xgb.Booster):
+        return booster_proba(model, X)
+    return model.predict_proba(X)
+
+
+def choose_rounds(forest, X, reference, tolerance):
+    """
+    Fewest boosting rounds whose probabilities stay within tolerance of the
+    reference on X, from one pass of per-tree leaf values and a running sum.
+
+    Returns:
+        (rounds, max difference at that many rounds)
+    """
+    leaf_values = forest.leaf_values(X)
+    margins = np.tile(forest.bias, (len(X), 1))
+    for r in range(forest.n_rounds):
+        trees = np.flatnonzero(forest.rounds == r)
+        margins += leaf_values[:, trees] @ forest._group_matrix[trees]
+        difference = np.abs(forest.margins_to_proba(margins) - reference).max()
+        if difference <= tolerance:
+            return r + 1, float(difference)
+    return forest.n_rounds, float(difference)
+
+
+def time_per_row(predict, X, repeats=200):
+    rows = X[:repeats]
+    started = time.perf_counter()
+    for i in range(len(rows)):
+        predict(rows[i:i + 1])
+    return (time.perf_counter() - started) / len(rows)
+
+
+def time_batch(predict, X):
+    started = time.perf_counter()
+    predict(X)
+    return len(X) / (time.perf_counter() - started)
+
+
+def serving_memory_mb(kind, path):
+    """
+    Peak RSS of a fresh process that loads a model file the way CyclonePredictor does
+
+    Read from VmHWM where /proc exists: ru_maxrss survives exec on Linux,
+    so it would report this (much larger) process's peak instead.
+    """
+    load = {
+        'pickle': f"import pickle; pickle.load(open({path!r}, 'rb'))",
+        'compact': f"from forest import CompactForest; CompactForest.load({path!r})",
+    }[kind]
+    report = ("import os, resource\n"
+              "if os.path.exists('/proc/self/status'):\n"
+              "    print([l.split()[1] for l in open('/proc/self/status') if l.startswith('VmHWM')][0])\n"
+              "else:\n"
+              "    print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)")
+    code = f"import sys; sys.path.insert(0, {os.path.dirname(os.path.abspath(__file__))!r}); {load}\n{report}"
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True)
+    if result.returncode:
+        return float('nan')
+    peak = int(result.stdout.split()[-1])
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the pruned, quantized serving model')
+    parser.add_argument('--model', default='model.pkl')
+    parser.add_argument('--data', default=None, help='CSV file or partitioned dataset directory')
+    parser.add_argument('--output', default=None, help='Defaults to <model>_compact.npz next to the model')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument('--holdout-fraction', type=float, default=0.2)
+    parser.add_argument('--no-prune', action='store_true', help='Keep every boosting round')
+    args = parser.parse_args()
+
+    source = args.data or (dataset_path(DATA_FILE) if os.path.isdir(dataset_path(DATA_FILE)) else DATA_FILE)
+    output = args.output or f"{os.path.splitext(args.model)[0]}_compact.npz"
+
+    # 1. The original model and its held-out rows (the most recent ones, as in training)
+    package, pipeline = load_package(args.model)
+    model = package['model']
+    booster = model if isinstance(model, xgb.Booster) else model.get_booster()
+    df = load_dataset(source, columns=LOAD_COLUMNS) if os.path.isdir(source) else \
+        pd.read_csv(source, usecols=LOAD_COLUMNS, parse_dates=['date'])
+    X_holdout = pipeline.transform(
+        df[df['date'] >= holdout_cutoff(df['date'].min(), df['date'].max(), args.holdout_fraction)])
+    reference = reference_proba(model, X_holdout)
+    print(f"Holdout rows: {len(X_holdout):,}")
+
+    # 2. Flatten (merging splits that can't change a prediction), then prune rounds
+    forest = CompactForest.from_booster(booster, len(pipeline.features))
+    source_rounds, source_splits = forest.n_rounds, forest.n_nodes
+    if not args.no_prune:
+        sample = np.random.default_rng(42).choice(len(X_holdout), min(len(X_holdout), PRUNE_SAMPLE_ROWS),
+                                                  replace=False)
+        rounds, difference = choose_rounds(forest, X_holdout[sample], reference[sample], args.tolerance)
+        forest = forest.truncate(rounds)
+        print(f"Pruned to {rounds}/{source_rounds} rounds (max difference on sample {difference:.2e})")
+    forest = forest.fold_constant_trees()
+    print(f"Trees: {booster.num_boosted_rounds() * len(forest.bias)} -> {forest.n_trees}, "
+          f"splits: {source_splits} -> {forest.n_nodes}")
+
+    # 3. Parity on the whole holdout; nothing is written unless it holds
+    compact = forest.predict_proba(X_holdout)
+    max_difference = float(np.abs(compact - reference).max()) if len(X_holdout) else 0.0
+    agreement = float((compact.argmax(axis=1) == reference.argmax(axis=1)).mean()) if len(X_holdout) else 1.0
+    print(f"Max probability difference: {max_difference:.2e} (tolerance {args.tolerance:.0e})")
+    print(f"Label agreement: {agreement:.4%}")
+    if max_difference > args.tolerance:
+        print("❌ Compact model is outside tolerance; not saved")
+        sys.exit(1)
+
+    # 4. Save, tied to the exact model.pkl it was built from
+    forest.meta = {
+        'version': 1,
+        'classes': [str(c) for c in package['label_encoder'].classes_],
+        'feature_pipeline': pipeline.to_spec(),
+        'source_sha1': file_sha1(args.model),
+        'source_rounds': source_rounds,
+        'rounds': forest.n_rounds,
+        'tolerance': args.tolerance,
+        'max_difference': max_difference,
+        'label_agreement': agreement,
+    }
+    forest.save(output)
+    print(f"Compact model saved as '{output}'.")
+
+    # 5. What serving gains
+    print(f"\n{'':<22} {'original':>12} {'compact':>12}")
+    print(f"{'file KB':<22} {os.path.getsize(args.model) / 1024:>12.1f} {os.path.getsize(output) / 1024:>12.1f}")
+    print(f"{'model bytes in memory':<22} {len(booster.save_raw('ubj')):>12,} {forest.nbytes():>12,}")
+    print(f"{'loader peak RSS MB':<22} {serving_memory_mb('pickle', args.model):>12.1f} "
+          f"{serving_memory_mb('compact', output):>12.1f}")
+    if len(X_holdout):
+        original = time_per_row(lambda X: reference_proba(model, X), X_holdout) * 1e6
+        print(f"{'single row us':<22} {original:>12.1f} {time_per_row(forest.predict_proba, X_holdout) * 1e6:>12.1f}")
+        print(f"{'batch rows/s':<22} {time_batch(lambda X: reference_proba(model, X), X_holdout):>12,.0f} "
+              f"{time_batch(forest.predict_proba, X_holdout):>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,15 +3,23 @@ import pandas as pd
 import numpy as np
 import joblib
 import os
-from datetime import datetime
+import threading
 import warnings
+from app.ml_models.features import FeaturePipeline
+from app.ml_models.forest import CompactForest, booster_proba, file_sha1
 warnings.filterwarnings('ignore')
 
 class CyclonePredictor:
     def __init__(self):
         """
         Initialize the cyclone predictor with the pre-trained XGBoost model
+
+        If compact_model.py has written model_compact.npz for this exact
+        model.pkl, single observations are scored with that instead (faster
+        per row, no unpickling), and the XGBoost model, which is faster for
+        batches, is only loaded by the first multi-row batch.
         """
+        self._model_lock = threading.Lock()
         try:
             # Get the current directory
             current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -23,113 +31,155 @@ class CyclonePredictor:
             if not os.path.exists(model_path):
                 raise FileNotFoundError(f"Model file not found: {model_path}")
             
-            # Load the model package
-            model_package = joblib.load(model_path)
-            self.model = model_package['model']
-            self.label_encoder = model_package['label_encoder']
-            self.features = model_package['features']
+            self.model_path = model_path
+            self.model = None
+            self.compact = self._load_compact(os.path.join(current_dir, 'model_compact.npz'), model_path)
+            if self.compact is not None:
+                self.classes = self.compact.meta['classes']
+                spec = self.compact.meta['feature_pipeline']
+            else:
+                # Load the model package
+                model_package = joblib.load(model_path)
+                self.model = model_package['model']
+                self.classes = [str(c) for c in model_package['label_encoder'].classes_]
+                # Packages saved before the pipeline was stored get an unfitted one (fills missing features with 0)
+                spec = model_package.get('feature_pipeline') or {'features': model_package['features']}
+            self.pipeline = FeaturePipeline.from_spec(spec)
+            self.features = self.pipeline.features
             
-            print("XGBoost cyclone predictor initialized successfully")
+            print(f"{'Compact' if self.compact is not None else 'XGBoost'} cyclone predictor initialized successfully")
             print(f"Model features: {self.features}")
-            print(f"Model classes: {self.label_encoder.classes_}")
+            print(f"Model classes: {self.classes}")
             
         except Exception as e:
             print(f"Error loading model: {e}")
             # Create a mock predictor for development
+            self.model_path = None
             self.model = None
-            self.label_encoder = None
+            self.compact = None
+            self.classes = None
             self.features = ['day_of_year', 'wind_speed', 'pressure', 'wave_height', 'water_level']
+            self.pipeline = FeaturePipeline(self.features)
             print("Warning: Using mock predictor - predictions will be random")
     
+    def _batch_model(self):
+        """The XGBoost model, loaded on first use when the compact one is serving; the compact one if that fails"""
+        if self.model is None:
+            with self._model_lock:
+                if self.model is None:
+                    try:
+                        self.model = joblib.load(self.model_path)['model']
+                    except Exception as e:
+                        print(f"Error loading XGBoost model, scoring batches with the compact model: {e}")
+                        self.model = self.compact
+        return self.model
+    
+    @staticmethod
+    def _load_compact(compact_path, model_path):
+        """The compact serving model, if there is one built from the current model.pkl"""
+        if not os.path.exists(compact_path):
+            return None
+        compact = CompactForest.load(compact_path)
+        if compact.meta.get('source_sha1') != file_sha1(model_path):
+            print(f"Ignoring {compact_path}: built from a different model.pkl")
+            return None
+        return compact
+    
     def preprocess_data(self, new_data):
         """
-        Preprocess new data to match the training data format
-        """
-        # Create a copy of the data
-        processed_data = new_data.copy()
-        
-        # Convert date to day_of_year if date is provided
-        if 'date' in processed_data.columns and 'day_of_year' not in processed_data.columns:
-            processed_data['date'] = pd.to_datetime(processed_data['date'])
-            processed_data['day_of_year'] = processed_data['date'].dt.dayofyear
+        Preprocess new data to match the training data format, with the
+        feature pipeline saved alongside the model
         
-        # Ensure we have all the required features
-        for feature in self.features:
-            if feature not in processed_data.columns:
-                if feature == 'day_of_year':
-                    # If day_of_year is missing, use current day of year
-                    processed_data[feature] = datetime.now().timetuple().tm_yday
-                else:
-                    # For other missing features, use a default value
-                    processed_data[feature] = 0
-                    print(f"Warning: Missing feature {feature}, using default value 0")
+        Args:
+            new_data: DataFrame (vectorized path) or a single observation dictionary
         
-        # Extract only the feature columns in the correct order
-        X_new = processed_data[self.features]
-        
-        return X_new
+        Returns:
+            float32 feature matrix in the model's feature order
+        """
+        if isinstance(new_data, dict):
+            return self.pipeline.transform_one(new_data)
+        return self.pipeline.transform(new_data)
     
-    def predict(self, input_data):
+    def predict(self, input_data, record=False):
         """
         Make a prediction on new data
         Handles both direct input and wrapped input (with 'data' field)
+        
+        record is accepted for parity with SequencePredictor; this model keeps no readings
         """
         # Handle wrapped input format (with 'data' field)
         if isinstance(input_data, dict) and 'data' in input_data:
             input_data = input_data['data']
         
-        # Convert to DataFrame if it's a single dictionary
-        if isinstance(input_data, dict):
-            new_data = pd.DataFrame([input_data])
+        try:
+            # A single dictionary skips pandas entirely
+            if isinstance(input_data, dict):
+                return self.predict_batch([input_data])[0]
+            return self.predict_batch(pd.DataFrame(input_data))[0]
+        except Exception as e:
+            return {"error": str(e)}
+    
+    def predict_batch(self, input_data, record=False):
+        """
+        Score many observations with one vectorized model call
+        
+        Args:
+            input_data: DataFrame or list of dictionaries, one row per observation
+            record: Unused (parity with SequencePredictor)
+        
+        Returns:
+            List of prediction dictionaries in input order
+        """
+        if isinstance(input_data, pd.DataFrame):
+            new_data, n_rows = input_data, len(input_data)
         else:
-            new_data = pd.DataFrame(input_data)
+            records = list(input_data)
+            n_rows = len(records)
+            # One observation goes through the pipeline's single-row path, without pandas
+            new_data = records[0] if n_rows == 1 else pd.DataFrame(records)
         
-        if self.model is None:
+        if self.model_path is None:
             # Return mock predictions for development
-            import random
-            probability = random.random()
-            classification = "CYCLONE" if probability > 0.5 else "NORMAL"
-            return {
-                "probability": float(probability),
-                "classification": classification,
-                "confidence": abs(probability - 0.5) * 2
-            }
-        
-        try:
-            # Preprocess the data
-            X_processed = self.preprocess_data(new_data)
-            
-            # Make prediction
-            prediction = self.model.predict(X_processed)
-            probabilities = self.model.predict_proba(X_processed)
-            
-            # Convert prediction to label
-            predicted_label = self.label_encoder.inverse_transform(prediction)[0]
-            
-            # Get probability for the predicted class
-            probability = probabilities[0][prediction[0]]
-            
-            # For binary classification, we might want to focus on CYCLONE probability
-            if "CYCLONE" in self.label_encoder.classes_:
-                cyclone_idx = list(self.label_encoder.classes_).index("CYCLONE")
-                cyclone_probability = probabilities[0][cyclone_idx]
-                
-                return {
-                    "probability": float(cyclone_probability),
-                    "classification": predicted_label,
-                    "confidence": abs(cyclone_probability - 0.5) * 2,
-                    "all_probabilities": {cls: float(prob) for cls, prob in zip(self.label_encoder.classes_, probabilities[0])}
-                }
-            else:
-                return {
+            probabilities = np.random.random(n_rows)
+            return [
+                {
                     "probability": float(probability),
-                    "classification": predicted_label,
-                    "confidence": abs(probability - 0.5) * 2,
-                    "all_probabilities": {cls: float(prob) for cls, prob in zip(self.label_encoder.classes_, probabilities[0])}
+                    "classification": "CYCLONE" if probability > 0.5 else "NORMAL",
+                    "confidence": abs(probability - 0.5) * 2
                 }
-            
-        except Exception as e:
-            return {"error": str(e)}
+                for probability in probabilities
+            ]
+        
+        # Preprocess the data
+        X_processed = self.preprocess_data(new_data)
+        
+        # The compact forest is faster for one row, XGBoost for many
+        model = self.compact if n_rows == 1 and self.compact is not None else self._batch_model()
+        
+        # One call for every row (out-of-core training saves a raw Booster, which has no predict_proba)
+        if hasattr(model, 'predict_proba'):
+            probabilities = model.predict_proba(X_processed)
+        else:
+            probabilities = booster_proba(model, X_processed)
+        predictions = probabilities.argmax(axis=1)
+        classes = self.classes
+        predicted_labels = [classes[i] for i in predictions]
+        
+        # For binary classification, we might want to focus on CYCLONE probability
+        if "CYCLONE" in classes:
+            focus = probabilities[:, classes.index("CYCLONE")]
+        else:
+            focus = probabilities[np.arange(len(predictions)), predictions]
+        
+        return [
+            {
+                "probability": float(focus[i]),
+                "classification": predicted_labels[i],
+                "confidence": abs(float(focus[i]) - 0.5) * 2,
+                "all_probabilities": {cls: float(prob) for cls, prob in zip(classes, probabilities[i])}
+            }
+            for i in range(len(predictions))
+        ]
     
 
 # Create a singleton instance
@@ -1,10 +1,18 @@
-import requests
+import argparse
+import os
+import sys
 import pandas as pd
 from bs4 import BeautifulSoup
 import re
+from pathlib import Path
+
+# The backend directory, for app.services
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from app.services.backfill import BackfillEngine, FetchTask, fixture_transport
 
 years = range(2010, 2024)
-cyclones = []
+
+CACHE_DIR = os.path.join("backfill_cache", "wikipedia")
 
 headers = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
@@ -31,16 +39,16 @@ def clean_name(name: str) -> str:
     # Trim whitespace
     return name.strip()
 
-for year in years:
+def season_task(year: int) -> FetchTask:
     url = f"https://en.wikipedia.org/wiki/{year}_North_Indian_Ocean_cyclone_season"
-    print(f"Fetching {url} ...")
-    res = requests.get(url, headers=headers)
+    return FetchTask(key=str(year), url=url, headers=headers)
 
-    if res.status_code != 200:
-        print(f"❌ Could not fetch {url}")
-        continue
+def parse_season(task: FetchTask, html: str) -> list:
+    """[name, start_date, end_date] rows from one season page's tables"""
+    year = int(task.key)
 
-    soup = BeautifulSoup(res.text, "html.parser")
+    cyclones = []
+    soup = BeautifulSoup(html, "html.parser")
     tables = soup.find_all("table", {"class": "wikitable"})
 
     for table in tables:
@@ -74,10 +82,34 @@ for year in years:
                 continue
 
             cyclones.append([name, start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d")])
-
-# Convert to DataFrame and drop duplicates
-df = pd.DataFrame(cyclones, columns=["name", "start_date", "end_date"]).drop_duplicates()
-
-df.to_csv("cyclones.csv", index=False)
-print("✅ Saved cyclones.csv")
-print(df.head(15))
+    return cyclones
+
+def main():
+    parser = argparse.ArgumentParser(description='Scrape North Indian Ocean cyclone seasons into cyclones.csv')
+    parser.add_argument('--cache-dir', default=CACHE_DIR, help='Pages cached here are never fetched again')
+    parser.add_argument('--checkpoint', default=None, help='JSON-lines checkpoint to resume from')
+    parser.add_argument('--fixtures', default=None, help='Read season pages from local HTML files instead')
+    parser.add_argument('--rate', type=float, default=1.0, help='Requests per second')
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+
+    engine = BackfillEngine(
+        "wikipedia", cache_dir=args.cache_dir, rate=args.rate, max_workers=args.workers,
+        transport=fixture_transport(args.fixtures) if args.fixtures else None
+    )
+    tasks = [season_task(year) for year in years]
+    print(f"Fetching {len(tasks)} season pages ...")
+    backfill = engine.run(tasks, parse_season, args.checkpoint)
+    for key, error in backfill.failed.items():
+        print(f"❌ Could not fetch season {key}: {error}")
+
+    # Seasons in year order, then drop duplicates
+    cyclones = [row for task in tasks for row in backfill.results.get(task.key, [])]
+    df = pd.DataFrame(cyclones, columns=["name", "start_date", "end_date"]).drop_duplicates()
+
+    df.to_csv("cyclones.csv", index=False)
+    print("✅ Saved cyclones.csv")
+    print(df.head(15))
+
+if __name__ == "__main__":
+    main()
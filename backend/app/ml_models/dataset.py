@@ -0,0 +1,155 @@
+# app/ml_models/dataset.py
+
+import argparse
+import itertools
+import os
+import shutil
+import time
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+# Measurement columns, stored as float32
+FLOAT_COLUMNS = ['wind_speed', 'pressure', 'wave_height', 'water_level']
+
+# Partition keys; readers filtering on them only open the matching directories
+PARTITIONING = ds.partitioning(pa.schema([('station', pa.string()), ('year', pa.int16())]), flavor='hive')
+
+DEFAULT_STATION = 'default'
+
+
+def _to_table(df, station):
+    """Typed Arrow table for one chunk: parsed timestamps, float32 measurements, partition keys."""
+    df = df.copy()
+    df['date'] = pd.to_datetime(df['date'], format='mixed')
+    for column in FLOAT_COLUMNS:
+        if column in df.columns:
+            df[column] = pd.to_numeric(df[column], errors='coerce').astype('float32')
+    if 'station' not in df.columns:
+        df['station'] = station
+    df['station'] = df['station'].astype(str)
+    df['year'] = df['date'].dt.year.astype('int16')
+    if 'label' in df.columns:
+        df['label'] = df['label'].astype('category')
+    return pa.Table.from_pandas(df, preserve_index=False)
+
+
+def write_dataset(tables, dataset_dir):
+    """
+    Write Arrow tables (with station and date columns) into a hive-partitioned
+    Parquet dataset: dataset_dir/station=<id>/year=<yyyy>/.
+
+    The tables are streamed through a single writer, so only the batch in
+    flight is held in memory.
+    """
+    tables = iter(tables)
+    first = next(tables, None)
+    if first is None:
+        return
+
+    def with_year(table):
+        if 'year' not in table.column_names:
+            table = table.append_column('year', pc.year(table['date']).cast(pa.int16()))
+        return table
+
+    schema = with_year(first).schema
+
+    def batches():
+        for table in itertools.chain([first], tables):
+            yield from with_year(table).cast(schema).to_batches()
+
+    ds.write_dataset(
+        batches(), dataset_dir, schema=schema, format='parquet', partitioning=PARTITIONING,
+        existing_data_behavior='overwrite_or_ignore'
+    )
+
+
+def csv_to_dataset(csv_path, dataset_dir, station=DEFAULT_STATION, chunksize=1_000_000):
+    """
+    Convert a CSV (date, measurements, optional station and label) into a
+    partitioned Parquet dataset, reading it in chunks.
+
+    Rows without a station column go under `station`. An existing dataset
+    at dataset_dir is replaced. Returns the row count.
+    """
+    shutil.rmtree(dataset_dir, ignore_errors=True)
+    rows = 0
+
+    def tables():
+        nonlocal rows
+        for df in pd.read_csv(csv_path, chunksize=chunksize):
+            rows += len(df)
+            yield _to_table(df, station)
+
+    write_dataset(tables(), dataset_dir)
+    return rows
+
+
+def load_dataset(dataset_dir, columns=None, stations=None, years=None):
+    """
+    Load a partitioned dataset into a DataFrame.
+
+    Only `columns` are read, and only the partitions matching `stations` and
+    `years` are opened. Partition columns can be requested like any other.
+    """
+    dataset = ds.dataset(dataset_dir, format='parquet', partitioning=PARTITIONING)
+    condition = None
+    if stations is not None:
+        condition = pc.field('station').isin(list(stations))
+    if years is not None:
+        year_condition = pc.field('year').isin([int(year) for year in years])
+        condition = year_condition if condition is None else condition & year_condition
+    # Fragments come back in path order (station, then year) and rows within them in time order
+    return dataset.to_table(columns=columns, filter=condition).to_pandas()
+
+
+def iter_batches(source, columns, batch_size=1_000_000):
+    """
+    Stream DataFrames of at most batch_size rows from a partitioned dataset
+    directory or a CSV file, reading only `columns`.
+    """
+    if os.path.isdir(source):
+        dataset = ds.dataset(source, format='parquet', partitioning=PARTITIONING)
+        for batch in dataset.to_batches(columns=columns, batch_size=batch_size):
+            if batch.num_rows:
+                yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(source, usecols=columns, parse_dates=['date'], chunksize=batch_size)
+
+
+def dataset_path(csv_path, output_dir='datasets'):
+    """Where the dataset for a CSV lives: <output_dir>/<csv stem>"""
+    return os.path.join(output_dir, Path(csv_path).stem)
+
+
+def _measure(load):
+    started = time.perf_counter()
+    df = load()
+    return time.perf_counter() - started, df.memory_usage(deep=True).sum()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Convert labeled CSVs to partitioned Parquet datasets')
+    parser.add_argument('csv_files', nargs='+')
+    parser.add_argument('--output', default='datasets')
+    parser.add_argument('--station', default=DEFAULT_STATION, help='Station for CSVs without a station column')
+    parser.add_argument('--columns', nargs='*', default=['date', *FLOAT_COLUMNS, 'label'],
+                        help='Columns to load when comparing CSV and Parquet')
+    args = parser.parse_args()
+
+    for csv_path in args.csv_files:
+        target = dataset_path(csv_path, args.output)
+        rows = csv_to_dataset(csv_path, target, args.station)
+        print(f"✅ {csv_path}: {rows:,} rows -> {target}")
+
+        csv_seconds, csv_bytes = _measure(lambda: pd.read_csv(csv_path, usecols=args.columns, parse_dates=['date']))
+        parquet_seconds, parquet_bytes = _measure(lambda: load_dataset(target, columns=args.columns))
+        print(f"   load CSV:     {csv_seconds * 1000:8.1f} ms  {csv_bytes / 1e6:8.2f} MB")
+        print(f"   load Parquet: {parquet_seconds * 1000:8.1f} ms  {parquet_bytes / 1e6:8.2f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+# app/ml_models/features.py
+
+import logging
+import threading
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Features computed from the observation time rather than read from a column,
+# with the pandas .dt attribute (batch path) that gives them
+DATE_FEATURES = {'day_of_year': 'dayofyear', 'month': 'month', 'hour': 'hour'}
+
+
+def _is_number(value):
+    return isinstance(value, (int, float, np.number)) and not isinstance(value, (bool, np.bool_))
+
+
+def _to_datetime(value):
+    """
+    datetime for a datetime, date, date string (any format pandas reads) or
+    epoch seconds, read the way _parse_dates reads a column; None if it
+    can't be read.
+    """
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    if _is_number(value):
+        parsed = pd.to_datetime(value, unit='s', errors='coerce')
+    elif isinstance(value, str):
+        try:
+            # ISO strings, the common case, without going through pandas
+            return datetime.fromisoformat(value)
+        except ValueError:
+            parsed = pd.to_datetime(value, format='mixed', errors='coerce')
+    else:
+        return None
+    return None if pd.isna(parsed) else parsed.to_pydatetime()
+
+
+def _parse_dates(values):
+    """Timestamps for a date column (NaT where unreadable): numbers are epoch seconds, anything else is parsed."""
+    if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+        return pd.to_datetime(values, unit='s', errors='coerce')
+    if values.dtype == object:
+        numbers = values.map(_is_number).astype(bool)
+        if numbers.any():
+            parsed = pd.to_datetime(values.mask(numbers), format='mixed', errors='coerce')
+            epochs = pd.to_datetime(pd.to_numeric(values.where(numbers)), unit='s', errors='coerce')
+            return parsed.where(~numbers, epochs)
+    return pd.to_datetime(values, format='mixed', errors='coerce')
+
+
+def observation_timestamp(record):
+    """Epoch time of an observation's `date`, or None if it has none that can be read."""
+    moment = _to_datetime(record.get('date'))
+    return None if moment is None else moment.timestamp()
+
+
+def _date_feature(moment, feature):
+    if feature == 'day_of_year':
+        return moment.timetuple().tm_yday
+    return getattr(moment, feature)
+
+
+class FeaturePipeline:
+    """
+    Turns observations into the model's feature matrix, identically for
+    training and serving.
+
+    Training fits it (recording a fill value per feature) and stores
+    to_spec() in the model package; CyclonePredictor rebuilds it with
+    from_spec(). transform() is the vectorized batch path; transform_one()
+    fills a per-thread preallocated row, so scoring a single observation
+    allocates nothing and never goes through pandas.
+
+    Date features (day_of_year, month, hour) come from the observation's
+    `date` unless given explicitly; without either, or with a date that
+    can't be read, they are the current time's in both paths. Numeric dates
+    are epoch seconds. Other features that are missing, NaN or not numbers
+    take their training mean instead of zero.
+    """
+
+    def __init__(self, features, fill_values=None):
+        self.features = list(features)
+        self.fill_values = {feature: float(value) for feature, value in (fill_values or {}).items()}
+        self._local = threading.local()
+        self._warned = set()
+        self._compile()
+
+    def _compile(self):
+        """Precompute the fill row and column positions used by both paths."""
+        self._fill = np.array([self.fill_values.get(f, 0.0) for f in self.features], dtype=np.float32)
+        self._raw = [(i, f) for i, f in enumerate(self.features) if f not in DATE_FEATURES]
+        self._dates = [(i, f) for i, f in enumerate(self.features) if f in DATE_FEATURES]
+
+    def fit(self, df):
+        """Record each raw feature's mean as its fill value. Returns self."""
+        self.fill_values = {f: float(df[f].mean()) for _, f in self._raw if f in df.columns}
+        self._compile()
+        return self
+
+    def to_spec(self):
+        """Plain-data description for the model package."""
+        return {'version': 1, 'features': self.features, 'fill_values': self.fill_values}
+
+    @classmethod
+    def from_spec(cls, spec):
+        return cls(spec['features'], spec.get('fill_values'))
+
+    def _warn_missing(self, feature):
+        if feature not in self._warned:
+            self._warned.add(feature)
+            logger.warning(f"Feature {feature} missing from input, using {self.fill_values.get(feature, 0.0)}")
+
+    def _warn_bad_date(self, value):
+        if 'date' not in self._warned:
+            self._warned.add('date')
+            logger.warning(f"Unreadable date {value!r}, using the current time for date features")
+
+    def transform(self, df):
+        """Feature matrix (rows x features, float32) for a DataFrame."""
+        X = np.empty((len(df), len(self.features)), dtype=np.float32)
+        for i, feature in self._raw:
+            if feature in df.columns:
+                column = pd.to_numeric(df[feature], errors='coerce').to_numpy(np.float32, na_value=np.nan)
+                X[:, i] = np.where(np.isnan(column), self._fill[i], column)
+            else:
+                self._warn_missing(feature)
+                X[:, i] = self._fill[i]
+        dates = None
+        for i, feature in self._dates:
+            explicit = None
+            if feature in df.columns:
+                explicit = pd.to_numeric(df[feature], errors='coerce').to_numpy(np.float32, na_value=np.nan)
+                if not np.isnan(explicit).any():
+                    X[:, i] = explicit
+                    continue
+            # Rows without the feature take it from their date
+            if 'date' in df.columns:
+                if dates is None:
+                    parsed = _parse_dates(df['date'])
+                    unreadable = parsed.isna() & df['date'].notna()
+                    if unreadable.any():
+                        self._warn_bad_date(df['date'][unreadable].iloc[0])
+                    dates = parsed.fillna(pd.Timestamp.now(tz=parsed.dt.tz)).dt
+                derived = getattr(dates, DATE_FEATURES[feature]).to_numpy(np.float32)
+            else:
+                derived = _date_feature(datetime.now(), feature)
+            X[:, i] = derived if explicit is None else np.where(np.isnan(explicit), derived, explicit)
+        return X
+
+    def transform_one(self, record):
+        """
+        Feature row (1 x features) for one observation dictionary.
+
+        Returns this thread's reusable buffer: it is overwritten by the next
+        call on the same thread, so score it before transforming again.
+        """
+        row = getattr(self._local, 'row', None)
+        if row is None:
+            row = self._local.row = np.empty((1, len(self.features)), dtype=np.float32)
+        values = row[0]
+        for i, feature in self._raw:
+            value = record.get(feature)
+            if value is None:
+                if feature not in record:
+                    self._warn_missing(feature)
+                values[i] = self._fill[i]
+            else:
+                try:
+                    values[i] = value
+                except (TypeError, ValueError):
+                    values[i] = self._fill[i]
+                if values[i] != values[i]:
+                    # NaN, like the batch path
+                    values[i] = self._fill[i]
+        moment = None
+        for i, feature in self._dates:
+            value = record.get(feature)
+            if value is not None:
+                try:
+                    values[i] = value
+                except (TypeError, ValueError):
+                    values[i] = np.nan
+                if values[i] == values[i]:
+                    continue
+            if moment is None:
+                moment = _to_datetime(record.get('date'))
+                if moment is None:
+                    if not pd.isna(record.get('date')):
+                        self._warn_bad_date(record['date'])
+                    moment = datetime.now()
+            values[i] = _date_feature(moment, feature)
+        return row
@@ -0,0 +1,275 @@
+# app/ml_models/forest.py
+
+import hashlib
+import json
+
+import numpy as np
+from scipy.special import expit
+
+# Objectives whose margins CompactForest knows how to turn into probabilities
+SUPPORTED_OBJECTIVES = {'binary:logistic', 'multi:softprob', 'multi:softmax'}
+
+# Leaves per tree are tracked as bits of one uint64 (max_depth <= 6)
+MAX_LEAVES = 64
+ALL_LEAVES = np.uint64(0xFFFFFFFFFFFFFFFF)
+
+
+def file_sha1(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def booster_proba(booster, X):
+    """Class probabilities (rows x classes) from a raw XGBoost Booster; binary:logistic only gives P(class 1)"""
+    proba = booster.inplace_predict(X).reshape(len(X), -1)
+    if proba.shape[1] == 1:
+        proba = np.column_stack([1 - proba[:, 0], proba[:, 0]])
+    return proba
+
+
+def _collapse(tree, node):
+    """A tree node as ('leaf', value) or ('split', feature, threshold, default_left, left, right),
+    with splits whose two children are equal leaves collapsed into that leaf."""
+    if tree['left_children'][node] == -1:
+        return ('leaf', np.float32(tree['split_conditions'][node]))
+    left = _collapse(tree, tree['left_children'][node])
+    right = _collapse(tree, tree['right_children'][node])
+    if left[0] == right[0] == 'leaf' and left[1] == right[1]:
+        return left
+    return ('split', tree['split_indices'][node], np.float32(tree['split_conditions'][node]),
+            bool(tree['default_left'][node]), left, right)
+
+
+class CompactForest:
+    """
+    An XGBoost tree ensemble flattened into NumPy arrays for serving.
+
+    Split thresholds are quantized to integer bins: each feature's distinct
+    float32 thresholds become its bin edges and a split stores a uint16 bin
+    (threshold = edges[feature][bin - 1]), so a split costs 13 bytes (int16
+    feature, uint16 bin, bool default direction, uint64 mask) and a leaf 4.
+    The float32 thresholds are rebuilt from the bins at load, exactly.
+
+    Trees are scored bitvector-style (QuickScorer): each tree's leaves are
+    bits of a uint64, every split that sends a row right clears the bits of
+    its left subtree, and the row's leaf is the lowest bit left standing.
+    That makes scoring a fixed handful of vectorized passes over all splits
+    of all trees, with no per-level traversal.
+    """
+
+    # Rows scored together; keeps the (rows x splits) working arrays cache-sized
+    CHUNK_CELLS = 1 << 17
+
+    def __init__(self, node_feature, node_threshold, node_default_left, node_mask, node_starts,
+                 leaf_value, leaf_starts, groups, rounds, edges, bias, objective, meta=None):
+        self.node_feature = np.asarray(node_feature, dtype=np.int16)
+        self.node_threshold = np.asarray(node_threshold, dtype=np.uint16)
+        self.node_default_left = np.asarray(node_default_left, dtype=bool)
+        self.node_mask = np.asarray(node_mask, dtype=np.uint64)
+        self.node_starts = np.asarray(node_starts, dtype=np.int64)
+        self.leaf_value = np.asarray(leaf_value, dtype=np.float32)
+        self.leaf_starts = np.asarray(leaf_starts, dtype=np.int64)
+        self.groups = np.asarray(groups, dtype=np.int16)
+        self.rounds = np.asarray(rounds, dtype=np.int32)
+        self.edges = [np.asarray(e, dtype=np.float32) for e in edges]
+        self.bias = np.asarray(bias, dtype=np.float32)
+        self.objective = objective
+        self.meta = meta or {}
+        # Float32 threshold per split; bin 0 (the placeholder split of single-leaf trees) always goes right
+        offsets = np.cumsum([0] + [len(e) for e in self.edges])
+        all_edges = np.concatenate([[-np.inf], *self.edges]).astype(np.float32)
+        self._split_value = np.where(self.node_threshold > 0,
+                                     all_edges[offsets[self.node_feature] + self.node_threshold], -np.inf)
+        self._split_value = self._split_value.astype(np.float32)
+        self._split_feature = self.node_feature.astype(np.intp)
+        # Sums each tree's leaf value into its class margin
+        self._group_matrix = np.zeros((self.n_trees, len(self.bias)), dtype=np.float32)
+        self._group_matrix[np.arange(self.n_trees), self.groups] = 1.0
+
+    @property
+    def n_trees(self):
+        return len(self.groups)
+
+    @property
+    def n_nodes(self):
+        return len(self.node_mask)
+
+    @property
+    def n_leaves(self):
+        return len(self.leaf_value)
+
+    @property
+    def n_rounds(self):
+        return int(self.rounds.max()) + 1 if self.n_trees else 0
+
+    @classmethod
+    def from_booster(cls, booster, n_features, meta=None):
+        """
+        Flatten a trained Booster (gbtree) from its JSON model dump.
+
+        Splits whose two children are leaves with the same value are
+        collapsed into a leaf, since that changes no prediction.
+        """
+        model = json.loads(booster.save_raw('json'))['learner']
+        objective = model['objective']['name']
+        if objective not in SUPPORTED_OBJECTIVES:
+            raise ValueError(f"Unsupported objective: {objective}")
+        gbm = model['gradient_booster']
+        if gbm['name'] != 'gbtree':
+            raise ValueError(f"Unsupported booster: {gbm['name']}")
+        n_classes = max(1, int(model['learner_model_param']['num_class']))
+        base_score = float(model['learner_model_param']['base_score'])
+        # binary:logistic stores base_score as a probability; multiclass adds it to every margin
+        bias = np.full(n_classes, np.log(base_score / (1 - base_score)) if objective == 'binary:logistic'
+                       else base_score, dtype=np.float32)
+
+        trees = [_collapse(tree, 0) for tree in gbm['model']['trees']]
+
+        # Distinct thresholds per feature become the bin edges
+        thresholds = [set() for _ in range(n_features)]
+
+        def collect(node):
+            if node[0] == 'split':
+                thresholds[node[1]].add(node[2])
+                collect(node[4])
+                collect(node[5])
+
+        for tree in trees:
+            collect(tree)
+        edges = [np.array(sorted(t), dtype=np.float32) for t in thresholds]
+        if max((len(e) for e in edges), default=0) >= np.iinfo(np.uint16).max:
+            raise ValueError("Too many distinct thresholds for 16-bit bins")
+
+        node_feature, node_threshold, node_default_left, node_mask, node_starts = [], [], [], [], []
+        leaf_value, leaf_starts, rounds = [], [], []
+        rounds_per_class = [0] * n_classes
+
+        for tree, group in zip(trees, gbm['model']['tree_info']):
+            node_starts.append(len(node_mask))
+            leaf_starts.append(len(leaf_value))
+            first_leaf = len(leaf_value)
+
+            def walk(node):
+                if node[0] == 'leaf':
+                    leaf_value.append(node[1])
+                    return
+                _, feature, threshold, default_left, left, right = node
+                index = len(node_mask)
+                node_feature.append(feature)
+                node_threshold.append(np.searchsorted(edges[feature], threshold) + 1)
+                node_default_left.append(default_left)
+                node_mask.append(None)
+                start = len(leaf_value) - first_leaf
+                walk(left)
+                end = len(leaf_value) - first_leaf
+                walk(right)
+                # Going right rules out the left subtree's leaves
+                node_mask[index] = int(ALL_LEAVES) ^ (((1 << (end - start)) - 1) << start)
+
+            walk(tree)
+            if len(leaf_value) - first_leaf > MAX_LEAVES:
+                raise ValueError(f"Trees may have at most {MAX_LEAVES} leaves (max_depth <= 6)")
+            if len(node_mask) == node_starts[-1]:
+                # A single-leaf tree still needs one split for the per-tree reduction; this one rules out nothing
+                node_feature.append(0)
+                node_threshold.append(0)
+                node_default_left.append(False)
+                node_mask.append(int(ALL_LEAVES))
+            rounds.append(rounds_per_class[group])
+            rounds_per_class[group] += 1
+
+        return cls(node_feature, node_threshold, node_default_left, np.array(node_mask, dtype=np.uint64),
+                   node_starts, leaf_value, leaf_starts, gbm['model']['tree_info'], rounds, edges, bias,
+                   objective, meta)
+
+    def _select(self, keep, bias):
+        """A forest with only the trees at indices `keep`"""
+        node_ends = np.append(self.node_starts[1:], self.n_nodes)
+        leaf_ends = np.append(self.leaf_starts[1:], self.n_leaves)
+        nodes = np.concatenate([np.arange(self.node_starts[t], node_ends[t]) for t in keep] or [[]]).astype(np.int64)
+        leaves = np.concatenate([np.arange(self.leaf_starts[t], leaf_ends[t]) for t in keep] or [[]]).astype(np.int64)
+        node_counts = node_ends[keep] - self.node_starts[keep]
+        leaf_counts = leaf_ends[keep] - self.leaf_starts[keep]
+        return CompactForest(
+            self.node_feature[nodes], self.node_threshold[nodes], self.node_default_left[nodes],
+            self.node_mask[nodes], np.concatenate([[0], np.cumsum(node_counts)[:-1]])[:len(keep)],
+            self.leaf_value[leaves], np.concatenate([[0], np.cumsum(leaf_counts)[:-1]])[:len(keep)],
+            self.groups[keep], self.rounds[keep], self.edges, bias, self.objective, dict(self.meta)
+        )
+
+    def truncate(self, n_rounds):
+        """A forest with only the first n_rounds boosting rounds"""
+        return self._select(np.flatnonzero(self.rounds < n_rounds), self.bias)
+
+    def fold_constant_trees(self):
+        """
+        A forest without its single-leaf trees, their values added to the
+        class bias instead. Predictions are unchanged, but truncate() on the
+        result can no longer drop those trees, so truncate first.
+        """
+        node_counts = np.diff(np.append(self.node_starts, self.n_nodes))
+        constant = (node_counts == 1) & (self.node_threshold[self.node_starts] == 0)
+        bias = self.bias.copy()
+        np.add.at(bias, self.groups[constant], self.leaf_value[self.leaf_starts[constant]])
+        return self._select(np.flatnonzero(~constant), bias)
+
+    def leaf_values(self, X):
+        """Each tree's leaf value for each row (rows x trees)"""
+        X = np.asarray(X, dtype=np.float32)
+        if not self.n_trees:
+            return np.empty((len(X), 0), dtype=np.float32)
+        has_missing = np.isnan(X).any()
+        chunk = max(1, self.CHUNK_CELLS // max(1, self.n_nodes))
+        values = np.empty((len(X), self.n_trees), dtype=np.float32)
+        for start in range(0, len(X), chunk):
+            rows = slice(start, start + chunk)
+            split_inputs = np.take(X[rows], self._split_feature, axis=1)
+            go_right = split_inputs >= self._split_value
+            if has_missing:
+                go_right = np.where(np.isnan(split_inputs), ~self.node_default_left, go_right)
+            masks = np.where(go_right, self.node_mask, ALL_LEAVES)
+            reachable = np.bitwise_and.reduceat(masks, self.node_starts, axis=1)
+            # Lowest set bit -> its index (powers of two are exact in float64)
+            lowest = reachable & (~reachable + np.uint64(1))
+            leaf = np.log2(lowest.astype(np.float64)).astype(np.int64)
+            values[rows] = self.leaf_value[self.leaf_starts + leaf]
+        return values
+
+    def margins_to_proba(self, margins):
+        if self.objective == 'binary:logistic':
+            p = expit(margins[:, 0])
+            return np.column_stack([1 - p, p])
+        exp = np.exp(margins - margins.max(axis=1, keepdims=True))
+        return exp / exp.sum(axis=1, keepdims=True)
+
+    def predict_margin(self, X):
+        return self.leaf_values(X) @ self._group_matrix + self.bias
+
+    def predict_proba(self, X):
+        """Class probabilities (rows x classes), like XGBClassifier.predict_proba"""
+        return self.margins_to_proba(self.predict_margin(X))
+
+    def save(self, path):
+        np.savez(path, node_feature=self.node_feature, node_threshold=self.node_threshold,
+                 node_default_left=self.node_default_left, node_mask=self.node_mask, node_starts=self.node_starts,
+                 leaf_value=self.leaf_value, leaf_starts=self.leaf_starts, groups=self.groups,
+                 rounds=self.rounds, bias=self.bias,
+                 edge_offsets=np.cumsum([0] + [len(e) for e in self.edges]),
+                 edges=np.concatenate(self.edges) if self.edges else np.empty(0, np.float32),
+                 meta=json.dumps({**self.meta, 'objective': self.objective}))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            meta = json.loads(str(data['meta']))
+            offsets = data['edge_offsets']
+            edges = [data['edges'][offsets[i]:offsets[i + 1]] for i in range(len(offsets) - 1)]
+            return cls(data['node_feature'], data['node_threshold'], data['node_default_left'], data['node_mask'],
+                       data['node_starts'], data['leaf_value'], data['leaf_starts'], data['groups'],
+                       data['rounds'], edges, data['bias'], meta.pop('objective'), meta)
+
+    def nbytes(self):
+        arrays = (self.node_feature, self.node_threshold, self.node_default_left, self.node_mask,
+                  self.node_starts, self.leaf_value, self.leaf_starts, self.groups, self.rounds, self.bias,
+                  *self.edges)
+        return sum(a.nbytes for a in arrays)
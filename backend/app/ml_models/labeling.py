@@ -0,0 +1,67 @@
+# app/ml_models/labeling.py
+
+import numpy as np
+import pandas as pd
+
+
+def _active_event_counts(times, starts, ends):
+    """
+    Number of [start, end] windows containing each time.
+
+    With starts and ends sorted independently, the windows covering t are
+    those started at or before t minus those ended before t, so overlapping
+    events need no special handling. O((rows + events) log events).
+    """
+    starts = np.sort(starts)
+    ends = np.sort(ends)
+    return np.searchsorted(starts, times, side='right') - np.searchsorted(ends, times, side='left')
+
+
+def count_active_events(buoy, events, date_col='date', start_col='start_date', end_col='end_date',
+                        station_col=None):
+    """
+    Counts the events whose window (inclusive at both ends) contains each buoy row.
+
+    If station_col is given and present in both frames, events only apply to
+    rows of their own station; otherwise every event applies to every row.
+    Events with no station (a null station_col) apply to all stations, and
+    events with a missing start or end, or one ending before it starts, are
+    ignored (they contain no row).
+    """
+    times = pd.to_datetime(buoy[date_col]).to_numpy('datetime64[ns]')
+    starts = pd.to_datetime(events[start_col], errors='coerce').to_numpy('datetime64[ns]')
+    ends = pd.to_datetime(events[end_col], errors='coerce').to_numpy('datetime64[ns]')
+    # A reversed window would count -1 over its span and cancel a real event there
+    valid = ~(np.isnat(starts) | np.isnat(ends)) & (ends >= starts)
+
+    if station_col is None or station_col not in events.columns or station_col not in buoy.columns:
+        return _active_event_counts(times, starts[valid], ends[valid])
+
+    # Station-less events count everywhere; the rest in one pass per station over
+    # that station's rows (stations are few, rows are many)
+    unassigned = events[station_col].isna().to_numpy()
+    counts = _active_event_counts(times, starts[valid & unassigned], ends[valid & unassigned])
+    codes, stations = pd.factorize(buoy[station_col])
+    order = np.argsort(codes, kind='stable')
+    sorted_codes = codes[order]
+    event_stations = events[station_col].to_numpy()
+    for i, station in enumerate(stations):
+        rows = order[np.searchsorted(sorted_codes, i, 'left'):np.searchsorted(sorted_codes, i, 'right')]
+        station_events = valid & (event_stations == station)
+        if station_events.any():
+            counts[rows] += _active_event_counts(times[rows], starts[station_events], ends[station_events])
+    return counts
+
+
+def label_cyclone_windows(buoy, events, date_col='date', start_col='start_date', end_col='end_date',
+                          station_col=None, label_col='label', positive='CYCLONE', negative='NORMAL'):
+    """
+    Labels buoy rows inside any cyclone window as CYCLONE and the rest NORMAL.
+
+    Same result as checking every event against every row, in one vectorized
+    pass. Returns a copy of buoy with label_col set.
+    """
+    counts = count_active_events(buoy, events, date_col, start_col, end_col, station_col)
+    labeled = buoy.copy()
+    labeled[label_col] = pd.Categorical.from_codes((counts > 0).astype(np.int8), categories=[negative, positive])
+    return labeled
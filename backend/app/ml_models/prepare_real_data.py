@@ -1,16 +1,31 @@
 # app/ml_models/prepare_real_data.py
+import argparse
+import json
+import os
+import sys
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-import requests
-import time
+from pathlib import Path
 from typing import List, Dict, Optional
 
+# The backend directory, for app.services
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from app.services.backfill import BackfillEngine, FetchTask, fixture_transport
+
+WEATHER_URL = "http://api.openweathermap.org/data/2.5/weather"
+API_KEY = "e77778f551addbbba0d6880b39ae0674"  # Replace with your actual key
+
+CACHE_DIR = os.path.join("backfill_cache", "openweathermap")
+
 class HistoricalDataPreparer:
-    def __init__(self):
+    def __init__(self, engine: Optional[BackfillEngine] = None, checkpoint_file: Optional[str] = None):
         self.cyclone_events = []
         self.flood_events = []
         self.normal_periods = []
+        # Rate-limited, cached, concurrent fetching of the daily observations
+        self.engine = engine or BackfillEngine("openweathermap", cache_dir=CACHE_DIR)
+        self.checkpoint_file = checkpoint_file
         
     def load_historical_events(self):
         """
@@ -37,31 +52,51 @@ class HistoricalDataPreparer:
             # Add more normal periods
         ]
     
+    @staticmethod
+    def weather_task(date: str, location: str = "Mumbai") -> FetchTask:
+        """Request for the weather at a location on one date"""
+        timestamp = int(datetime.strptime(date, '%Y-%m-%d').timestamp())
+        return FetchTask(key=f"{location}:{date}", url=WEATHER_URL,
+                         params={'q': location, 'dt': timestamp, 'appid': API_KEY})
+
+    @staticmethod
+    def parse_weather(task: FetchTask, body: str) -> Dict:
+        """The fields we use from an OpenWeatherMap response"""
+        data = json.loads(body)
+        return {
+            'wind_speed': data.get('wind', {}).get('speed', 0),
+            'pressure': data.get('main', {}).get('pressure', 1013),
+            'humidity': data.get('main', {}).get('humidity', 0),
+            'temp': data.get('main', {}).get('temp', 0)
+        }
+
     def fetch_weather_data(self, date: str, location: str = "Mumbai") -> Optional[Dict]:
         """
         Fetch historical weather data for a specific date.
         Note: OpenWeatherMap historical data requires a paid plan.
         You might need to use alternative sources or manual data entry.
         """
+        task = self.weather_task(date, location)
         try:
-            # This is a placeholder - you'll need a paid API for historical data
-            # Alternatively, use data from IMD or other free sources
-            api_key = "e77778f551addbbba0d6880b39ae0674"  # Replace with your actual key
-            url = f"http://api.openweathermap.org/data/2.5/weather?q={location}&dt={int(datetime.strptime(date, '%Y-%m-%d').timestamp())}&appid={api_key}"
-            
-            response = requests.get(url, timeout=10)
-            if response.status_code == 200:
-                data = response.json()
-                return {
-                    'wind_speed': data.get('wind', {}).get('speed', 0),
-                    'pressure': data.get('main', {}).get('pressure', 1013),
-                    'humidity': data.get('main', {}).get('humidity', 0),
-                    'temp': data.get('main', {}).get('temp', 0)
-                }
+            return self.parse_weather(task, self.engine.fetch(task))
         except Exception as e:
             print(f"Error fetching weather data for {date}: {e}")
         
         return None
+
+    def fetch_weather_range(self, dates: List[str], location: str = "Mumbai") -> Dict[str, Optional[Dict]]:
+        """
+        Fetch the weather for many dates concurrently under the engine's rate limit.
+        Dates that could not be fetched map to None (callers fall back to synthetic data).
+        """
+        tasks = [self.weather_task(date, location) for date in dict.fromkeys(dates)]
+        backfill = self.engine.run(tasks, self.parse_weather, self.checkpoint_file)
+        if backfill.failed:
+            print(f"Could not fetch weather data for {len(backfill.failed)} dates")
+        stats = backfill.stats
+        print(f"Weather backfill: {stats['tasks']} dates, {stats['resumed']} from checkpoint, "
+              f"{stats['cache_hits']} from cache, {stats['fetched']} fetched in {stats['seconds']}s")
+        return {task.key.split(':', 1)[1]: backfill.results.get(task.key) for task in tasks}
     
     def generate_synthetic_tidal_data(self, date: str, event_type: str = "NORMAL") -> Dict:
         """
@@ -96,6 +131,12 @@ class HistoricalDataPreparer:
         """
         self.load_historical_events()
         dataset = []
+
+        # Fetch every date up front, concurrently, instead of one request per loop step
+        dates = [event['date'] for event in self.flood_events]
+        for event in self.cyclone_events + self.normal_periods:
+            dates.extend(d.strftime('%Y-%m-%d') for d in pd.date_range(event['start_date'], event['end_date']))
+        weather_by_date = self.fetch_weather_range(dates)
         
         # Add cyclone events
         for event in self.cyclone_events:
@@ -107,8 +148,8 @@ class HistoricalDataPreparer:
             while current_date <= end_date:
                 date_str = current_date.strftime('%Y-%m-%d')
                 
-                # Fetch or generate weather data
-                weather_data = self.fetch_weather_data(date_str)
+                # Fetched or generated weather data
+                weather_data = weather_by_date.get(date_str)
                 if not weather_data:
                     # Fallback to synthetic data if API fails
                     weather_data = {
@@ -140,12 +181,11 @@ class HistoricalDataPreparer:
                 })
                 
                 current_date += timedelta(days=1)
-                time.sleep(0.1)  # Rate limiting
         
         # Add flood events (simplified)
         for event in self.flood_events:
             date_str = event['date']
-            weather_data = self.fetch_weather_data(date_str) or {
+            weather_data = weather_by_date.get(date_str) or {
                 'wind_speed': np.random.uniform(20, 40),
                 'pressure': np.random.uniform(1005, 1015),
                 'humidity': np.random.uniform(80, 95),
@@ -171,7 +211,7 @@ class HistoricalDataPreparer:
             current_date = start_date
             while current_date <= end_date:
                 date_str = current_date.strftime('%Y-%m-%d')
-                weather_data = self.fetch_weather_data(date_str) or {
+                weather_data = weather_by_date.get(date_str) or {
                     'wind_speed': np.random.uniform(5, 20),
                     'pressure': np.random.uniform(1010, 1020),
                     'humidity': np.random.uniform(50, 80),
@@ -190,7 +230,6 @@ class HistoricalDataPreparer:
                 })
                 
                 current_date += timedelta(days=1)
-                time.sleep(0.1)
         
         return dataset
     
@@ -203,9 +242,22 @@ class HistoricalDataPreparer:
 
 def main():
     """Main function to prepare the historical dataset."""
+    parser = argparse.ArgumentParser(description='Prepare the labeled historical dataset')
+    parser.add_argument('--cache-dir', default=CACHE_DIR, help='Responses cached here are never fetched again')
+    parser.add_argument('--checkpoint', default=None, help='JSON-lines checkpoint to resume from')
+    parser.add_argument('--fixtures', default=None, help='Serve requests from local JSON files instead of the API')
+    parser.add_argument('--offline', action='store_true', help='Only use cached responses')
+    parser.add_argument('--rate', type=float, default=2.0, help='Requests per second')
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+
     print("Starting historical data preparation...")
     
-    preparer = HistoricalDataPreparer()
+    engine = BackfillEngine(
+        "openweathermap", cache_dir=args.cache_dir, rate=args.rate, max_workers=args.workers,
+        transport=fixture_transport(args.fixtures) if args.fixtures else None, offline=args.offline
+    )
+    preparer = HistoricalDataPreparer(engine, args.checkpoint)
     dataset = preparer.create_dataset()
     
     if dataset:
@@ -0,0 +1,203 @@
+# app/ml_models/score_archive.py
+#
+# Offline re-scoring of a historical archive with a saved model, to compare
+# its alerts with another model's. Chunks are scored on a process pool whose
+# workers each load the model once; every chunk is written by its worker as
+# one Parquet part file, so results never travel back through the parent.
+
+import argparse
+import glob
+import os
+import pickle
+import shutil
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from dataset import FLOAT_COLUMNS, PARTITIONING, iter_batches
+from features import FeaturePipeline
+from forest import CompactForest
+
+# Input columns copied to the output so scores can be joined back and compared
+KEY_COLUMNS = ['station', 'date', 'label']
+
+# Chunks submitted but not yet scored, per worker (bounds the parent's memory on CSV input)
+CHUNKS_IN_FLIGHT = 2
+
+# Set once per worker process so the model isn't reloaded or pickled for every chunk
+_model = None
+_classes = None
+_pipeline = None
+_output_dir = None
+
+
+def load_model(model_path):
+    """
+    (model, classes, pipeline) from a model.pkl package or a compact .npz
+
+    XGBoost models are pinned to one thread: the pool supplies the parallelism.
+    """
+    if model_path.endswith('.npz'):
+        model = CompactForest.load(model_path)
+        return model, model.meta['classes'], FeaturePipeline.from_spec(model.meta['feature_pipeline'])
+    with open(model_path, 'rb') as f:
+        package = pickle.load(f)
+    model = package['model']
+    if hasattr(model, 'predict_proba'):
+        model.set_params(n_jobs=1)
+    else:
+        model.set_param({'nthread': 1})
+    # Packages saved before the pipeline was stored get an unfitted one, like CyclonePredictor
+    spec = package.get('feature_pipeline') or {'features': package['features']}
+    return model, [str(c) for c in package['label_encoder'].classes_], FeaturePipeline.from_spec(spec)
+
+
+def _init_worker(model_path, output_dir):
+    global _model, _classes, _pipeline, _output_dir
+    _model, _classes, _pipeline = load_model(model_path)
+    _output_dir = output_dir
+
+
+def score_frame(df):
+    """Key columns, predicted class and every class probability for a chunk"""
+    X = _pipeline.transform(df)
+    if hasattr(_model, 'predict_proba'):
+        probabilities = _model.predict_proba(X)
+    else:
+        probabilities = _model.inplace_predict(X).reshape(len(X), -1)
+    scores = pd.DataFrame({column: df[column].to_numpy() for column in KEY_COLUMNS if column in df.columns})
+    scores['prediction'] = np.asarray(_classes)[probabilities.argmax(axis=1)]
+    for i, cls in enumerate(_classes):
+        scores[f'probability_{cls}'] = probabilities[:, i].astype(np.float32)
+    return scores
+
+
+def score_chunk(index, chunk, columns):
+    """
+    Score one chunk and write it as part-<index>.parquet (runs in a worker)
+
+    Args:
+        chunk: a DataFrame, or a Parquet fragment holding one row group,
+            which the worker reads itself
+
+    Returns:
+        (rows, seconds spent in the worker)
+    """
+    started = time.perf_counter()
+    if isinstance(chunk, pd.DataFrame):
+        df = chunk
+    else:
+        df = chunk.to_table(columns=[c for c in columns if c in chunk.physical_schema.names]).to_pandas()
+        for name, value in ds.get_partition_keys(chunk.partition_expression).items():
+            if name in columns:
+                df[name] = value
+    scores = score_frame(df)
+    pq.write_table(pa.Table.from_pandas(scores, preserve_index=False),
+                   os.path.join(_output_dir, f'part-{index:06d}.parquet'))
+    return len(scores), time.perf_counter() - started
+
+
+def input_columns(source):
+    """The columns scoring needs that the source actually has"""
+    if os.path.isdir(source):
+        names = ds.dataset(source, format='parquet', partitioning=PARTITIONING).schema.names
+    else:
+        names = list(pd.read_csv(source, nrows=0).columns)
+    return [c for c in dict.fromkeys(['date', *FLOAT_COLUMNS, *KEY_COLUMNS]) if c in names]
+
+
+def iter_chunks(source, columns, batch_size):
+    """
+    Chunks to score: one row group of a partitioned dataset (read by the
+    worker, so the parent only hands out work) or one parsed CSV chunk.
+    """
+    if os.path.isdir(source):
+        dataset = ds.dataset(source, format='parquet', partitioning=PARTITIONING)
+        for fragment in dataset.get_fragments():
+            yield from fragment.split_by_row_group()
+    else:
+        yield from iter_batches(source, columns, batch_size)
+
+
+def score_archive(source, model_path, output_dir, workers, batch_size=250_000):
+    """
+    Score every row of a CSV file or partitioned dataset into output_dir
+
+    Part files are numbered in input order, so reading output_dir as one
+    Parquet dataset gives the rows back in the order they were read. Part
+    files left by an earlier run are removed first.
+
+    Returns:
+        (rows, seconds, summed worker seconds)
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    for stale in glob.glob(os.path.join(output_dir, 'part-*.parquet')):
+        os.remove(stale)
+    columns = input_columns(source)
+
+    started = time.perf_counter()
+    rows, busy = 0, 0.0
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(model_path, output_dir)) as pool:
+        pending = set()
+        for index, chunk in enumerate(iter_chunks(source, columns, batch_size)):
+            if len(pending) >= workers * CHUNKS_IN_FLIGHT:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    chunk_rows, seconds = future.result()
+                    rows, busy = rows + chunk_rows, busy + seconds
+            pending.add(pool.submit(score_chunk, index, chunk, columns))
+        for future in pending:
+            chunk_rows, seconds = future.result()
+            rows, busy = rows + chunk_rows, busy + seconds
+    return rows, time.perf_counter() - started, busy
+
+
+def report(rows, seconds, busy, workers):
+    print(f"Scored {rows:,} rows in {seconds:.2f}s on {workers} workers: {rows / max(seconds, 1e-9):,.0f} rows/s "
+          f"({rows / max(busy, 1e-9):,.0f} rows/s per busy worker)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Re-score a historical archive with a saved model')
+    parser.add_argument('source', help='CSV file or partitioned dataset directory (dataset.py)')
+    parser.add_argument('--model', default='model.pkl', help='model.pkl package or compact .npz')
+    parser.add_argument('--output', default='scores', help='Directory for the Parquet part files')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--batch-size', type=int, default=250_000, help='Rows per CSV chunk')
+    parser.add_argument('--scaling', action='store_true',
+                        help='Time 1, 2, 4, ... up to --workers workers and report the speedup')
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.source):
+        print("Note: CSV input is parsed by the parent process; convert it with dataset.py to read in parallel")
+
+    if args.scaling:
+        counts = sorted({min(2 ** k, args.workers) for k in range(args.workers.bit_length() + 1)})
+        print(f"{'workers':>7} {'rows/s':>12} {'speedup':>8} {'efficiency':>10}")
+        baseline = None
+        for workers in counts:
+            scratch = tempfile.mkdtemp()
+            try:
+                rows, seconds, _ = score_archive(args.source, args.model, scratch, workers, args.batch_size)
+            finally:
+                shutil.rmtree(scratch, ignore_errors=True)
+            throughput = rows / max(seconds, 1e-9)
+            baseline = baseline or throughput
+            print(f"{workers:>7} {throughput:>12,.0f} {throughput / baseline:>8.2f} "
+                  f"{throughput / baseline / workers:>10.0%}")
+        return
+
+    rows, seconds, busy = score_archive(args.source, args.model, args.output, args.workers, args.batch_size)
+    report(rows, seconds, busy, args.workers)
+    print(f"Predictions written to '{args.output}'.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+# backend/app/ml_models/sequence_predictor.py
+import os
+import numpy as np
+import pandas as pd
+from app.ml_models.features import FeaturePipeline, observation_timestamp
+from app.ml_models.sequences import (LSTMClassifier, SEQUENCE_FEATURES, STEP_SECONDS, StationWindowBuffer,
+                                     TIME_STEPS)
+
+class SequencePredictor:
+    """
+    Cyclone predictor backed by the 24-step LSTM, with the same predict /
+    predict_batch interface and result format as CyclonePredictor.
+
+    The prediction is made on the last TIME_STEPS readings of the
+    observation's station, one per step of the training data's reading
+    interval, with the observation as the newest. Steps come from the
+    observation's `date`, else the time it is scored. Only the monitoring
+    pipeline's observations are kept as readings (record=True); ad-hoc
+    requests are scored against the station's window without changing it.
+    Observations are keyed by `station_id`, else by (lat, lon); ones with
+    neither share one default station, so callers should tag observations
+    (run_threat_detection does).
+    """
+    def __init__(self, model_path=None):
+        """
+        Initialize the sequence predictor with the exported NumPy weights
+        """
+        try:
+            current_dir = os.path.dirname(os.path.abspath(__file__))
+            model_path = model_path or os.path.join(current_dir, 'sequence_model.npz')
+
+            if not os.path.exists(model_path):
+                raise FileNotFoundError(f"Model file not found: {model_path}")
+
+            self.model = LSTMClassifier.load(model_path)
+            meta = self.model.meta
+            self.pipeline = FeaturePipeline.from_spec(meta['feature_pipeline'])
+            self.mean = np.asarray(meta['mean'], dtype=np.float32)
+            self.std = np.asarray(meta['std'], dtype=np.float32)
+            self.classes = meta['classes']
+            self.buffer = StationWindowBuffer(meta['time_steps'], len(self.pipeline.features),
+                                              meta.get('step_seconds', STEP_SECONDS))
+
+            print("Sequence cyclone predictor initialized successfully")
+            print(f"Model features: {self.pipeline.features} x {meta['time_steps']} steps")
+            print(f"Model classes: {self.classes}")
+
+        except Exception as e:
+            print(f"Error loading sequence model: {e}")
+            # Create a mock predictor for development
+            self.model = None
+            self.pipeline = FeaturePipeline(SEQUENCE_FEATURES)
+            self.mean = np.zeros(len(SEQUENCE_FEATURES), dtype=np.float32)
+            self.std = np.ones(len(SEQUENCE_FEATURES), dtype=np.float32)
+            self.classes = ['NORMAL', 'CYCLONE']
+            self.buffer = StationWindowBuffer(TIME_STEPS, len(SEQUENCE_FEATURES))
+            print("Warning: Using mock sequence predictor - predictions will be random")
+
+    @staticmethod
+    def station_key(observation):
+        if observation.get('station_id') is not None:
+            return observation['station_id']
+        if observation.get('lat') is not None and observation.get('lon') is not None:
+            return (observation['lat'], observation['lon'])
+        return 'default'
+
+    def observe(self, observation, buffer=None):
+        """
+        Push one observation into its station's buffer (self.buffer unless given)
+
+        Returns:
+            The station's model-ready window (time_steps x features, scaled)
+        """
+        # transform_one hands back this thread's row buffer; scale it in place
+        row = self.pipeline.transform_one(observation)[0]
+        row -= self.mean
+        row /= self.std
+        buffer = self.buffer if buffer is None else buffer
+        return buffer.push(self.station_key(observation), row, observation_timestamp(observation))
+
+    def predict(self, input_data, record=False):
+        """
+        Make a prediction on one new observation
+        Handles both direct input and wrapped input (with 'data' field)
+        """
+        if isinstance(input_data, dict) and 'data' in input_data:
+            input_data = input_data['data']
+
+        try:
+            if isinstance(input_data, dict):
+                return self.predict_batch([input_data], record)[0]
+            return self.predict_batch(input_data, record)[-1]
+        except Exception as e:
+            return {"error": str(e)}
+
+    def predict_batch(self, input_data, record=False):
+        """
+        Score many observations, each on its station's window, in one model call
+
+        Args:
+            input_data: DataFrame or list of dictionaries, one row per observation,
+                in time order within each station
+            record: Keep the observations as their stations' readings (the
+                monitoring pipeline); otherwise the buffers are left unchanged
+
+        Returns:
+            List of prediction dictionaries in input order
+        """
+        records = input_data.to_dict('records') if isinstance(input_data, pd.DataFrame) else list(input_data)
+        # Unrecorded observations go into a scratch copy of their stations' windows
+        buffer = self.buffer if record else self.buffer.copy({self.station_key(r) for r in records})
+        windows = np.stack([self.observe(observation, buffer) for observation in records])
+
+        if self.model is None:
+            cyclone = np.random.random(len(records))
+            probabilities = np.column_stack([1 - cyclone, cyclone])
+        else:
+            probabilities = self.model.predict_proba(windows)
+
+        cyclone_index = self.classes.index("CYCLONE")
+        results = []
+        for row in probabilities:
+            probability = float(row[cyclone_index])
+            results.append({
+                "probability": probability,
+                "classification": self.classes[int(row.argmax())],
+                "confidence": abs(probability - 0.5) * 2,
+                "all_probabilities": {cls: float(prob) for cls, prob in zip(self.classes, row)}
+            })
+        return results
+
+
+# Create a singleton instance
+sequence_predictor = SequencePredictor()
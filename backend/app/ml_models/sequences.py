@@ -0,0 +1,235 @@
+# app/ml_models/sequences.py
+
+import json
+import threading
+import time
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.special import expit
+
+# Readings the sequence model sees per prediction
+TIME_STEPS = 24
+
+# Seconds per step when a model doesn't record its own; trained models store
+# the median reading interval of their training data (median_step_seconds)
+STEP_SECONDS = 3600.0
+
+SEQUENCE_FEATURES = ['wind_speed', 'pressure', 'wave_height', 'water_level', 'day_of_year', 'month']
+
+
+def make_windows(X, time_steps=TIME_STEPS, groups=None):
+    """
+    Every time_steps-long window over the rows of X (rows x features).
+
+    Returns (windows, starts): windows is a read-only strided view of shape
+    (rows - time_steps + 1, time_steps, features), so nothing is copied, and
+    starts are the window indices that have a target row (the row right
+    after the window) in the same group. `groups` (e.g. station ids) must be
+    contiguous; windows straddling two groups are left out of starts.
+    """
+    X = np.ascontiguousarray(X)
+    windows = sliding_window_view(X, time_steps, axis=0).transpose(0, 2, 1)
+    starts = np.arange(len(X) - time_steps)
+    if groups is not None:
+        groups = np.asarray(groups)
+        starts = starts[groups[starts] == groups[starts + time_steps]]
+    return windows, starts
+
+
+def median_step_seconds(dates, groups=None):
+    """
+    Median time between consecutive readings of the same group, in seconds
+    (STEP_SECONDS if there are no two such readings). Rows must be in time
+    order within each contiguous group, as for make_windows.
+    """
+    seconds = np.asarray(dates, dtype='datetime64[ns]').astype(np.int64) / 1e9
+    steps = np.diff(seconds)
+    if groups is not None:
+        groups = np.asarray(groups)
+        steps = steps[groups[1:] == groups[:-1]]
+    steps = steps[steps > 0]
+    return float(np.median(steps)) if len(steps) else STEP_SECONDS
+
+
+def iter_window_batches(windows, targets, starts, batch_size=32, rng=None):
+    """
+    Yield (windows, targets) training batches for the given window starts.
+
+    Only the batch being yielded is copied out of the window view. Targets
+    are per row: window i is labelled with targets[i + time_steps]. Pass a
+    NumPy generator as rng to shuffle.
+    """
+    time_steps = windows.shape[1]
+    order = rng.permutation(starts) if rng is not None else starts
+    for i in range(0, len(order), batch_size):
+        batch = order[i:i + batch_size]
+        yield windows[batch], targets[batch + time_steps]
+
+
+def fit_scaler(X):
+    """Per-feature mean and std for standardizing; constant features get std 1."""
+    mean = X.mean(axis=0)
+    std = X.std(axis=0)
+    return mean.astype(np.float32), np.where(std > 0, std, 1.0).astype(np.float32)
+
+
+def fold_batch_norm(kernel, bias, gamma, beta, moving_mean, moving_variance, epsilon):
+    """
+    Fold an inference-mode batch normalization that feeds a layer into that
+    layer's input kernel and bias: BN(x) @ kernel + bias == x @ kernel' + bias'.
+    """
+    scale = gamma / np.sqrt(moving_variance + epsilon)
+    shift = beta - moving_mean * scale
+    return scale[:, None] * kernel, bias + shift @ kernel
+
+
+class StationWindowBuffer:
+    """
+    The last time_steps (scaled) readings of each station, as ring buffers.
+
+    Each station's readings are written twice, at p and p + time_steps of a
+    (2 x time_steps) x features array, so the current window is always the
+    contiguous slice [p, p + time_steps): a new reading costs O(features)
+    and never shifts the window.
+
+    Readings are bucketed into step_seconds steps to match the training
+    cadence: a reading in the same step as the previous one replaces it, and
+    skipped steps are filled with the previous reading. A new station's
+    window starts out filled with its first reading.
+    """
+
+    def __init__(self, time_steps=TIME_STEPS, n_features=len(SEQUENCE_FEATURES), step_seconds=STEP_SECONDS):
+        self.time_steps = time_steps
+        self.n_features = n_features
+        self.step_seconds = step_seconds
+        self._stations = {}  # station -> [buffer, position, step]
+        self._lock = threading.Lock()
+
+    def _write(self, buffer, position, row):
+        buffer[position] = row
+        buffer[position + self.time_steps] = row
+
+    def push(self, station, row, timestamp=None):
+        """
+        Add one reading for a station and return a copy of its current window (time_steps x features).
+
+        timestamp is the reading's epoch time; None means now.
+        """
+        step = int((time.time() if timestamp is None else timestamp) // self.step_seconds)
+        with self._lock:
+            state = self._stations.get(station)
+            if state is None:
+                buffer = np.empty((2 * self.time_steps, self.n_features), dtype=np.float32)
+                buffer[:] = row
+                state = self._stations[station] = [buffer, 0, step]
+            else:
+                buffer, position, last_step = state
+                if step <= last_step:
+                    self._write(buffer, (position - 1) % self.time_steps, row)
+                else:
+                    previous = buffer[position + self.time_steps - 1].copy()
+                    for _ in range(min(step - last_step - 1, self.time_steps)):
+                        self._write(buffer, position, previous)
+                        position = (position + 1) % self.time_steps
+                    self._write(buffer, position, row)
+                    state[1] = (position + 1) % self.time_steps
+                    state[2] = step
+            position = state[1]
+            return buffer[position:position + self.time_steps].copy()
+
+    def copy(self, stations):
+        """A new buffer holding copies of these stations' windows, for scoring without changing this one."""
+        scratch = StationWindowBuffer(self.time_steps, self.n_features, self.step_seconds)
+        with self._lock:
+            for station in stations:
+                state = self._stations.get(station)
+                if state is not None:
+                    scratch._stations[station] = [state[0].copy(), state[1], state[2]]
+        return scratch
+
+    def window(self, station):
+        """Copy of a station's current window, or None if it has no readings yet."""
+        with self._lock:
+            state = self._stations.get(station)
+            if state is None:
+                return None
+            buffer, position, _ = state
+            return buffer[position:position + self.time_steps].copy()
+
+    def __len__(self):
+        return len(self._stations)
+
+
+class LSTMClassifier:
+    """
+    CPU inference for the exported sequence model: stacked LSTM layers
+    (Keras gate order i, f, c, o; the last returns only its final state)
+    followed by dense layers, with batch normalization already folded into
+    the weights. Plain NumPy, loaded from an .npz file.
+    """
+
+    def __init__(self, lstm_layers, dense_layers, meta):
+        self.lstm_layers = [tuple(np.asarray(w, dtype=np.float32) for w in layer) for layer in lstm_layers]
+        self.dense_layers = [(np.asarray(kernel, dtype=np.float32), np.asarray(bias, dtype=np.float32), activation)
+                             for kernel, bias, activation in dense_layers]
+        self.meta = meta
+
+    def save(self, path):
+        arrays = {}
+        for k, (kernel, recurrent_kernel, bias) in enumerate(self.lstm_layers):
+            arrays[f'lstm{k}_kernel'], arrays[f'lstm{k}_recurrent_kernel'], arrays[f'lstm{k}_bias'] = \
+                kernel, recurrent_kernel, bias
+        for k, (kernel, bias, _) in enumerate(self.dense_layers):
+            arrays[f'dense{k}_kernel'], arrays[f'dense{k}_bias'] = kernel, bias
+        meta = {**self.meta, 'activations': [activation for _, _, activation in self.dense_layers]}
+        np.savez(path, meta=json.dumps(meta), **arrays)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            meta = json.loads(str(data['meta']))
+            lstm_layers = []
+            while f'lstm{len(lstm_layers)}_kernel' in data:
+                k = len(lstm_layers)
+                lstm_layers.append((data[f'lstm{k}_kernel'], data[f'lstm{k}_recurrent_kernel'], data[f'lstm{k}_bias']))
+            dense_layers = [(data[f'dense{k}_kernel'], data[f'dense{k}_bias'], activation)
+                            for k, activation in enumerate(meta.pop('activations'))]
+        return cls(lstm_layers, dense_layers, meta)
+
+    def predict_proba(self, windows):
+        """Class probabilities (windows x classes) for scaled windows (windows x time_steps x features)."""
+        sequence = np.asarray(windows, dtype=np.float32)
+        for k, (kernel, recurrent_kernel, bias) in enumerate(self.lstm_layers):
+            last = k == len(self.lstm_layers) - 1
+            n, steps = sequence.shape[:2]
+            units = recurrent_kernel.shape[0]
+            # Input projections for every step at once; only the recurrence is sequential
+            projected = sequence @ kernel + bias
+            h = np.zeros((n, units), dtype=np.float32)
+            c = np.zeros((n, units), dtype=np.float32)
+            outputs = None if last else np.empty((n, steps, units), dtype=np.float32)
+            for t in range(steps):
+                z = projected[:, t] + h @ recurrent_kernel
+                i = expit(z[:, :units])
+                f = expit(z[:, units:2 * units])
+                g = np.tanh(z[:, 2 * units:3 * units])
+                o = expit(z[:, 3 * units:])
+                c = f * c + i * g
+                h = o * np.tanh(c)
+                if outputs is not None:
+                    outputs[:, t] = h
+            sequence = h if last else outputs
+
+        x = sequence
+        for kernel, bias, activation in self.dense_layers:
+            x = x @ kernel + bias
+            if activation == 'relu':
+                x = np.maximum(x, 0)
+            elif activation == 'sigmoid':
+                x = expit(x)
+            elif activation == 'softmax':
+                x = np.exp(x - x.max(axis=1, keepdims=True))
+                x /= x.sum(axis=1, keepdims=True)
+        # A single sigmoid unit is P(positive class)
+        return np.hstack([1 - x, x]) if x.shape[1] == 1 else x
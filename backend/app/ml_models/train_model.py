@@ -2,49 +2,95 @@
 
 import pandas as pd
 import numpy as np
-from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import LabelEncoder
 from sklearn.metrics import accuracy_score
 import xgboost as xgb
 import pickle
 import os
+import argparse
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from dataset import FLOAT_COLUMNS, dataset_path, iter_batches, load_dataset
+from features import FeaturePipeline
+
+DATA_FILE = "historical_data_labeled.csv"
+
+# Columns prepare_data uses; nothing else is read
+LOAD_COLUMNS = ['date'] + FLOAT_COLUMNS + ['label']
+
+FEATURES = ['day_of_year', 'wind_speed', 'pressure', 'wave_height', 'water_level']
 
 # Load the historical data
-def load_data():
-    """Loads the labeled dataset from CSV."""
-    file_path = "historical_data_labeled.csv"
-    df = pd.read_csv(file_path)
-    return df
+def load_data(stations=None, years=None):
+    """
+    Loads the labeled dataset.
+
+    Reads the partitioned Parquet dataset built by dataset.py when present
+    (only the needed columns, and only the requested stations/years), and
+    falls back to the CSV otherwise, filtered to the same stations/years.
+    Raises ValueError if stations are requested from a CSV without a
+    station column.
+    """
+    parquet_dir = dataset_path(DATA_FILE)
+    if os.path.isdir(parquet_dir):
+        return load_dataset(parquet_dir, columns=LOAD_COLUMNS, stations=stations, years=years)
+    columns = LOAD_COLUMNS
+    if stations is not None:
+        if 'station' not in pd.read_csv(DATA_FILE, nrows=0).columns:
+            raise ValueError(f"{DATA_FILE} has no station column to filter stations on")
+        columns = LOAD_COLUMNS + ['station']
+    df = pd.read_csv(DATA_FILE, usecols=columns, parse_dates=['date'])
+    keep = pd.Series(True, index=df.index)
+    if stations is not None:
+        keep &= df['station'].astype(str).isin([str(station) for station in stations])
+    if years is not None:
+        keep &= df['date'].dt.year.isin([int(year) for year in years])
+    return df.loc[keep, LOAD_COLUMNS].reset_index(drop=True)
 
 def prepare_data(df):
     """
     Prepares the data for training.
-    - Converts dates to a numerical feature (day of year)
+    - Fits the feature pipeline (the same one CyclonePredictor runs) and
+      builds the float32 feature matrix with it
     - Encodes the target labels ('NORMAL', 'CYCLONE') into numbers
-    - Selects feature columns
     """
-    # Convert date to datetime and extract the day of the year (1-365)
-    df['date'] = pd.to_datetime(df['date'])
-    df['day_of_year'] = df['date'].dt.dayofyear
-
-    # Define features (X) and target (y)
-    features = ['day_of_year', 'wind_speed', 'pressure', 'wave_height', 'water_level']
-    X = df[features]
-    y = df['label']  # This is our target: 'NORMAL', 'CYCLONE', 'FLOOD'
+    pipeline = FeaturePipeline(FEATURES).fit(df)
+    X = pipeline.transform(df)
+    y = df['label'].astype(str)  # This is our target: 'NORMAL', 'CYCLONE', 'FLOOD'
 
     # Encode the target labels into numbers (e.g., NORMAL->0, CYCLONE->1, FLOOD->2)
     le = LabelEncoder()
     y_encoded = le.fit_transform(y)
 
-    return X, y_encoded, le, features
+    return X, y_encoded, le, pipeline
 
-def train_xgboost_model(X, y):
+def objective_params(n_classes):
+    """
+    XGBoost objective for n_classes labels, the same in both training modes:
+    logistic for up to two classes (a single class included), softprob with
+    num_class for more. Both give probabilities, which the predictors need.
+    """
+    if n_classes <= 2:
+        return {'objective': 'binary:logistic'}
+    return {'objective': 'multi:softprob', 'num_class': n_classes}
+
+def holdout_cutoff(first, last, holdout_fraction=0.2):
+    """Start of the held-out time range: the last holdout_fraction of [first, last]."""
+    return first + (last - first) * (1 - holdout_fraction)
+
+def train_xgboost_model(X, y, dates):
     """Trains an XGBoost classifier and returns the model."""
-    # Split the data into training and testing sets
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    # Hold out the most recent 20% of the time range (rows come station by station,
+    # so a row-count split wouldn't be the most recent); a random split leaks the future
+    dates = pd.Series(dates)
+    test = (dates >= holdout_cutoff(dates.min(), dates.max())).to_numpy()
+    X_train, X_test, y_train, y_test = X[~test], X[test], y[~test], y[test]
 
     # Create and train the model
-    model = xgb.XGBClassifier(objective='multi:softmax', num_class=3, random_state=42)
+    model = xgb.XGBClassifier(**objective_params(len(np.unique(y))), random_state=42)
     model.fit(X_train, y_train)
 
     # Check the model's accuracy
@@ -54,28 +100,162 @@ def train_xgboost_model(X, y):
 
     return model, X_test, y_test
 
-def save_model(model, label_encoder, features):
-    """Saves the trained model and label encoder to disk for later use."""
-    # Create a dictionary of everything to save
+def save_model(model, label_encoder, pipeline):
+    """Saves the trained model, label encoder and feature pipeline to disk for later use."""
+    # Create a dictionary of everything to save; the pipeline is stored as
+    # plain data so loading it doesn't depend on how this script was imported
     model_package = {
         'model': model,
         'label_encoder': label_encoder,
-        'features': features
+        'features': pipeline.features,
+        'feature_pipeline': pipeline.to_spec()
     }
     with open('model.pkl', 'wb') as f:
         pickle.dump(model_package, f)
     print("Model saved as 'model.pkl'.")
 
+class ChunkIter(xgb.DataIter):
+    """
+    Feeds XGBoost one chunk at a time from disk.
+
+    Each pass over the data re-reads the source batch by batch, so only one
+    chunk is held in memory while XGBoost builds its paged external-memory
+    cache under cache_prefix.
+    """
+
+    def __init__(self, source, label_encoder, pipeline, batch_size, cache_prefix, keep=None):
+        self.source = source
+        self.label_encoder = label_encoder
+        self.pipeline = pipeline
+        self.batch_size = batch_size
+        self.keep = keep
+        self._batches = None
+        super().__init__(cache_prefix=cache_prefix)
+
+    def next(self, input_data):
+        if self._batches is None:
+            self._batches = iter_batches(self.source, LOAD_COLUMNS, self.batch_size)
+        for df in self._batches:
+            if self.keep is not None:
+                df = df[self.keep(df)]
+            if len(df):
+                input_data(data=self.pipeline.transform(df),
+                           label=self.label_encoder.transform(df['label'].astype(str)))
+                return 1
+        return 0
+
+    def reset(self):
+        self._batches = None
+
+def scan_source(source, batch_size):
+    """One streaming pass: classes, time range and the feature pipeline's fill values (column means)."""
+    labels = set()
+    first = last = None
+    sums = pd.Series(0.0, index=FLOAT_COLUMNS)
+    counts = pd.Series(0, index=FLOAT_COLUMNS)
+    for df in iter_batches(source, LOAD_COLUMNS, batch_size):
+        labels.update(df['label'].astype(str).unique())
+        first = df['date'].min() if first is None else min(first, df['date'].min())
+        last = df['date'].max() if last is None else max(last, df['date'].max())
+        sums += df[FLOAT_COLUMNS].astype('float64').sum()
+        counts += df[FLOAT_COLUMNS].count()
+    pipeline = FeaturePipeline(FEATURES, fill_values=(sums / counts).dropna().to_dict())
+    return sorted(labels), first, last, pipeline
+
+def train_external_memory(source, batch_size=1_000_000, holdout_fraction=0.2, num_rounds=100):
+    """
+    Trains out of core: chunks stream from disk into an external-memory
+    DMatrix and the hist tree method builds trees on all cores. The last
+    holdout_fraction of the time range is held out for evaluation.
+    """
+    classes, first, last, pipeline = scan_source(source, batch_size)
+    label_encoder = LabelEncoder().fit(classes)
+    cutoff = holdout_cutoff(first, last, holdout_fraction)
+
+    cache_dir = tempfile.mkdtemp(prefix='xgb_cache_')
+    train = test = None
+    try:
+        train = xgb.DMatrix(ChunkIter(source, label_encoder, pipeline, batch_size,
+                                      os.path.join(cache_dir, 'train'), keep=lambda df: df['date'] < cutoff))
+        test = xgb.DMatrix(ChunkIter(source, label_encoder, pipeline, batch_size,
+                                     os.path.join(cache_dir, 'test'), keep=lambda df: df['date'] >= cutoff))
+        params = {
+            **objective_params(len(classes)),
+            'tree_method': 'hist',
+            'nthread': os.cpu_count(),
+            'seed': 42
+        }
+        booster = xgb.train(params, train, num_boost_round=num_rounds)
+
+        if test.num_row():
+            y_pred = booster.predict(test).reshape(test.num_row(), -1)
+            y_pred = (y_pred[:, 0] > 0.5).astype(int) if y_pred.shape[1] == 1 else y_pred.argmax(axis=1)
+            accuracy = accuracy_score(test.get_label(), y_pred)
+            print(f"Model trained with accuracy: {accuracy:.2f} (held out from {cutoff})")
+    finally:
+        # XGBoost removes its cache pages when the matrices are freed
+        del train, test
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    return booster, label_encoder, pipeline
+
+def peak_memory_mb():
+    """Peak resident memory of this process (ru_maxrss is KB on Linux, bytes on macOS); NaN on Windows."""
+    try:
+        import resource
+    except ImportError:
+        return float('nan')
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def compare_modes(source, batch_size):
+    """Runs both training modes in fresh processes and reports wall-clock time and peak memory."""
+    print(f"{'mode':<10} {'seconds':>10} {'peak MB':>10}")
+    for mode in ('memory', 'external'):
+        result = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--mode', mode, '--data', source,
+             '--batch-size', str(batch_size), '--no-save'],
+            capture_output=True, text=True
+        )
+        stats = [line for line in result.stdout.splitlines() if line.startswith('STATS')]
+        if result.returncode or not stats:
+            print(f"{mode:<10} failed: {result.stderr.strip().splitlines()[-1:]}")
+            continue
+        _, seconds, peak = stats[-1].split()
+        print(f"{mode:<10} {float(seconds):>10.1f} {float(peak):>10.0f}")
+
 # Main execution
 if __name__ == "__main__":
-    print("Loading and preparing data...")
-    df = load_data()
-    X, y_encoded, label_encoder, features = prepare_data(df)
+    parser = argparse.ArgumentParser(description='Train the cyclone classifier')
+    parser.add_argument('--mode', choices=['memory', 'external'], default='memory',
+                        help='Load everything into memory, or stream chunks through an external-memory DMatrix')
+    parser.add_argument('--data', default=None, help='CSV file or partitioned dataset directory')
+    parser.add_argument('--batch-size', type=int, default=1_000_000)
+    parser.add_argument('--compare', action='store_true', help='Time both modes and report peak memory')
+    parser.add_argument('--no-save', action='store_true')
+    args = parser.parse_args()
+
+    source = args.data or (dataset_path(DATA_FILE) if os.path.isdir(dataset_path(DATA_FILE)) else DATA_FILE)
+    if args.compare:
+        compare_modes(source, args.batch_size)
+        sys.exit(0)
+
+    started = time.perf_counter()
+    if args.mode == 'external':
+        print("Training XGBoost model out of core...")
+        model, label_encoder, pipeline = train_external_memory(source, args.batch_size)
+    else:
+        print("Loading and preparing data...")
+        df = load_dataset(source, columns=LOAD_COLUMNS) if os.path.isdir(source) else \
+            pd.read_csv(source, usecols=LOAD_COLUMNS, parse_dates=['date'])
+        X, y_encoded, label_encoder, pipeline = prepare_data(df)
 
-    print("Training XGBoost model...")
-    model, X_test, y_test = train_xgboost_model(X, y_encoded)
+        print("Training XGBoost model...")
+        model, X_test, y_test = train_xgboost_model(X, y_encoded, df['date'])
+    print(f"STATS {time.perf_counter() - started:.2f} {peak_memory_mb():.1f}")
 
-    print("Saving model...")
-    save_model(model, label_encoder, features)
+    if not args.no_save:
+        print("Saving model...")
+        save_model(model, label_encoder, pipeline)
 
-    print("\nTraining complete!")
\ No newline at end of file
+    print("\nTraining complete!")
@@ -1,143 +1,165 @@
-# import pandas as pd
-# import numpy as np
-# from sklearn.preprocessing import StandardScaler, LabelEncoder
-# from sklearn.metrics import classification_report, roc_auc_score, confusion_matrix
-# from sklearn.utils.class_weight import compute_class_weight
-# import matplotlib.pyplot as plt
-# import seaborn as sns
-# import tensorflow as tf
-# from tensorflow.keras.models import Sequential
-# from tensorflow.keras.layers import LSTM, Dense, Dropout, BatchNormalization
-# from tensorflow.keras.optimizers import Adam
-# from tensorflow.keras.callbacks import EarlyStopping, ReduceLROnPlateau
-
-# # Load the data
-# df = pd.read_csv('buoy_labeled.csv')
-
-# # 1. Preprocess the data with time series structure
-# df['date'] = pd.to_datetime(df['date'])
-# df['hour'] = df['date'].dt.hour
-# df['day_of_year'] = df['date'].dt.dayofyear
-# df['month'] = df['date'].dt.month
-
-# # Encode the target variable
-# df['label_encoded'] = df['label'].map({'NORMAL': 0, 'CYCLONE': 1})
-
-# # Select features and target
-# features = ['wind_speed', 'pressure', 'wave_height', 'water_level', 'hour', 'day_of_year', 'month']
-# X = df[features]
-# y = df['label_encoded']
-
-# # Scale the features
-# scaler = StandardScaler()
-# X_scaled = scaler.fit_transform(X)
-
-# # 2. Create time series sequences
-# def create_sequences(X, y, time_steps=24):
-#     Xs, ys = [], []
-#     for i in range(len(X) - time_steps):
-#         Xs.append(X[i:(i + time_steps)])
-#         ys.append(y[i + time_steps])
-#     return np.array(Xs), np.array(ys)
-
-# TIME_STEPS = 24  # Use 24 hours of data to predict next label
-# X_sequences, y_sequences = create_sequences(X_scaled, y.values, TIME_STEPS)
-
-# # 3. Split the data respecting time order
-# train_size = int(0.7 * len(X_sequences))
-# val_size = int(0.15 * len(X_sequences))
-
-# X_train, X_temp, y_train, y_temp = X_sequences[:train_size], X_sequences[train_size:], y_sequences[:train_size], y_sequences[train_size:]
-# X_val, X_test, y_val, y_test = X_temp[:val_size], X_temp[val_size:], y_temp[:val_size], y_temp[val_size:]
-
-# print(f"Training set size: {len(X_train)}")
-# print(f"Validation set size: {len(X_val)}")
-# print(f"Test set size: {len(X_test)}")
-# print(f"Class distribution in training set: {np.bincount(y_train)}")
-
-# # 4. Calculate class weights for imbalanced data
-# class_weights = compute_class_weight('balanced', classes=np.unique(y_train), y=y_train)
-# class_weight_dict = {i: class_weights[i] for i in range(len(class_weights))}
-
-# # 5. Build LSTM model
-# model = Sequential([
-#     LSTM(64, return_sequences=True, input_shape=(X_train.shape[1], X_train.shape[2])),
-#     BatchNormalization(),
-#     Dropout(0.3),
-    
-#     LSTM(32, return_sequences=False),
-#     BatchNormalization(),
-#     Dropout(0.3),
-    
-#     Dense(16, activation='relu'),
-#     Dropout(0.2),
-#     Dense(1, activation='sigmoid')
-# ])
-
-# model.compile(
-#     optimizer=Adam(learning_rate=0.001),
-#     loss='binary_crossentropy',
-#     metrics=['accuracy', tf.keras.metrics.AUC(name='auc')]
-# )
-
-# # 6. Define callbacks
-# early_stopping = EarlyStopping(monitor='val_auc', patience=10, restore_best_weights=True, mode='max')
-# reduce_lr = ReduceLROnPlateau(monitor='val_auc', factor=0.5, patience=5, min_lr=1e-7, mode='max')
-
-# # 7. Train the model
-# history = model.fit(
-#     X_train, y_train,
-#     batch_size=32,
-#     epochs=50,
-#     validation_data=(X_val, y_val),
-#     class_weight=class_weight_dict,
-#     callbacks=[early_stopping, reduce_lr],
-#     verbose=1
-# )
-
-# # 8. Evaluate on validation set
-# y_val_pred = (model.predict(X_val) > 0.5).astype(int)
-# y_val_prob = model.predict(X_val)
-
-# print("Validation Set Performance:")
-# print(classification_report(y_val, y_val_pred))
-# print(f"Validation ROC-AUC: {roc_auc_score(y_val, y_val_prob):.4f}")
-
-# # 9. Final evaluation on test set
-# y_test_pred = (model.predict(X_test) > 0.5).astype(int)
-# y_test_prob = model.predict(X_test)
-
-# print("\nTest Set Performance:")
-# print(classification_report(y_test, y_test_pred))
-# print(f"Test ROC-AUC: {roc_auc_score(y_test, y_test_prob):.4f}")
-
-# # 10. Confusion matrix
-# cm = confusion_matrix(y_test, y_test_pred)
-# plt.figure(figsize=(8, 6))
-# sns.heatmap(cm, annot=True, fmt='d', cmap='Blues', 
-#             xticklabels=['NORMAL', 'CYCLONE'], 
-#             yticklabels=['NORMAL', 'CYCLONE'])
-# plt.title('Confusion Matrix')
-# plt.ylabel('True Label')
-# plt.xlabel('Predicted Label')
-# plt.show()
-
-# # 11. Plot training history
-# plt.figure(figsize=(12, 4))
-# plt.subplot(1, 2, 1)
-# plt.plot(history.history['accuracy'], label='Training Accuracy')
-# plt.plot(history.history['val_accuracy'], label='Validation Accuracy')
-# plt.title('Model Accuracy')
-# plt.xlabel('Epoch')
-# plt.ylabel('Accuracy')
-# plt.legend()
-
-# plt.subplot(1, 2, 2)
-# plt.plot(history.history['loss'], label='Training Loss')
-# plt.plot(history.history['val_loss'], label='Validation Loss')
-# plt.title('Model Loss')
-# plt.xlabel('Epoch')
-# plt.ylabel('Loss')
-# plt.legend()
-# plt.tight_layout()
-# plt.show()
\ No newline at end of file
+# app/ml_models/trainedModel_realData.py
+#
+# Trains the 24-step LSTM on the labeled buoy data and exports it as NumPy
+# weights for SequencePredictor. Training needs TensorFlow; serving doesn't.
+
+import argparse
+import math
+
+import numpy as np
+import pandas as pd
+import tensorflow as tf
+from sklearn.metrics import classification_report, confusion_matrix, roc_auc_score
+from sklearn.utils.class_weight import compute_class_weight
+from tensorflow.keras.callbacks import EarlyStopping, ReduceLROnPlateau
+from tensorflow.keras.layers import LSTM, BatchNormalization, Dense, Dropout
+from tensorflow.keras.models import Sequential
+from tensorflow.keras.optimizers import Adam
+
+from features import FeaturePipeline
+from sequences import (LSTMClassifier, SEQUENCE_FEATURES, TIME_STEPS, fit_scaler, fold_batch_norm,
+                       iter_window_batches, make_windows, median_step_seconds)
+
+CLASSES = ['NORMAL', 'CYCLONE']
+
+
+def build_model(time_steps, n_features):
+    model = Sequential([
+        LSTM(64, return_sequences=True, input_shape=(time_steps, n_features)),
+        BatchNormalization(),
+        Dropout(0.3),
+
+        LSTM(32, return_sequences=False),
+        BatchNormalization(),
+        Dropout(0.3),
+
+        Dense(16, activation='relu'),
+        Dropout(0.2),
+        Dense(1, activation='sigmoid')
+    ])
+    model.compile(
+        optimizer=Adam(learning_rate=0.001),
+        loss='binary_crossentropy',
+        metrics=['accuracy', tf.keras.metrics.AUC(name='auc')]
+    )
+    return model
+
+
+def export_model(model, meta):
+    """NumPy copy of a trained Keras model, with batch normalization folded into the following layer."""
+    lstm_layers, dense_layers = [], []
+    pending = None
+    for layer in model.layers:
+        weights = layer.get_weights()
+        if isinstance(layer, BatchNormalization):
+            pending = (*weights, layer.epsilon)
+        elif isinstance(layer, (LSTM, Dense)):
+            kernel, bias = weights[0], weights[-1]
+            if pending is not None:
+                kernel, bias = fold_batch_norm(kernel, bias, *pending)
+                pending = None
+            if isinstance(layer, LSTM):
+                lstm_layers.append((kernel, weights[1], bias))
+            else:
+                dense_layers.append((kernel, bias, layer.activation.__name__))
+    return LSTMClassifier(lstm_layers, dense_layers, meta)
+
+
+def repeat_batches(windows, targets, starts, batch_size, seed):
+    """Shuffled training batches, epoch after epoch, for Keras."""
+    rng = np.random.default_rng(seed)
+    while True:
+        yield from iter_window_batches(windows, targets, starts, batch_size, rng)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Train the sequence cyclone model')
+    parser.add_argument('--data', default='buoy_labeled.csv')
+    parser.add_argument('--output', default='sequence_model.npz')
+    parser.add_argument('--epochs', type=int, default=50)
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    # 1. Load the data, each station's readings contiguous and in time order
+    df = pd.read_csv(args.data, parse_dates=['date'])
+    if 'station' in df.columns:
+        df = df.sort_values(['station', 'date'], kind='stable').reset_index(drop=True)
+    groups = df['station'].to_numpy() if 'station' in df.columns else None
+    y = df['label'].map({label: i for i, label in enumerate(CLASSES)}).to_numpy()
+    # Serving buckets live readings at the cadence the model was trained on
+    step_seconds = median_step_seconds(df['date'], groups)
+    print(f"Reading interval: {step_seconds / 3600:g} h")
+
+    # 2. Build windows over the scaled features (views, not copies)
+    pipeline = FeaturePipeline(SEQUENCE_FEATURES).fit(df)
+    X = pipeline.transform(df)
+    train_rows = int(0.7 * len(X))
+    mean, std = fit_scaler(X[:train_rows])
+    X_scaled = (X - mean) / std
+    windows, starts = make_windows(X_scaled, TIME_STEPS, groups)
+
+    # 3. Split the windows respecting time order
+    train_size = int(0.7 * len(starts))
+    val_size = int(0.15 * len(starts))
+    train_starts = starts[:train_size]
+    val_starts = starts[train_size:train_size + val_size]
+    test_starts = starts[train_size + val_size:]
+    X_val, y_val = windows[val_starts], y[val_starts + TIME_STEPS]
+    X_test, y_test = windows[test_starts], y[test_starts + TIME_STEPS]
+    y_train = y[train_starts + TIME_STEPS]
+
+    print(f"Training set size: {len(train_starts)}")
+    print(f"Validation set size: {len(val_starts)}")
+    print(f"Test set size: {len(test_starts)}")
+    print(f"Class distribution in training set: {np.bincount(y_train, minlength=len(CLASSES))}")
+
+    # 4. Class weights for imbalanced data
+    present = np.unique(y_train)
+    class_weights = compute_class_weight('balanced', classes=present, y=y_train)
+    class_weight_dict = {int(c): w for c, w in zip(present, class_weights)}
+
+    # 5. Train
+    tf.keras.utils.set_random_seed(args.seed)
+    model = build_model(TIME_STEPS, len(SEQUENCE_FEATURES))
+    model.fit(
+        repeat_batches(windows, y, train_starts, args.batch_size, args.seed),
+        steps_per_epoch=math.ceil(len(train_starts) / args.batch_size),
+        epochs=args.epochs,
+        validation_data=(X_val, y_val),
+        class_weight=class_weight_dict,
+        callbacks=[
+            EarlyStopping(monitor='val_auc', patience=10, restore_best_weights=True, mode='max'),
+            ReduceLROnPlateau(monitor='val_auc', factor=0.5, patience=5, min_lr=1e-7, mode='max')
+        ],
+        verbose=1
+    )
+
+    # 6. Export, and check the NumPy model matches Keras before evaluating it
+    exported = export_model(model, {
+        'version': 1,
+        'time_steps': TIME_STEPS,
+        'step_seconds': step_seconds,
+        'feature_pipeline': pipeline.to_spec(),
+        'mean': mean.tolist(),
+        'std': std.tolist(),
+        'classes': CLASSES
+    })
+    keras_prob = model.predict(X_test, verbose=0).ravel()
+    y_test_prob = exported.predict_proba(X_test)[:, 1]
+    print(f"Max |Keras - NumPy| probability difference: {np.abs(keras_prob - y_test_prob).max():.2e}")
+
+    y_test_pred = (y_test_prob > 0.5).astype(int)
+    print("\nTest Set Performance:")
+    print(classification_report(y_test, y_test_pred, labels=range(len(CLASSES)), target_names=CLASSES,
+                                zero_division=0))
+    if len(np.unique(y_test)) > 1:
+        print(f"Test ROC-AUC: {roc_auc_score(y_test, y_test_prob):.4f}")
+    print(confusion_matrix(y_test, y_test_pred, labels=range(len(CLASSES))))
+
+    exported.save(args.output)
+    print(f"Sequence model saved as '{args.output}'.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+# app/ml_models/tune_model.py
+
+import argparse
+import itertools
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from sklearn.metrics import accuracy_score, recall_score
+from sklearn.model_selection import TimeSeriesSplit
+
+from dataset import load_dataset
+from train_model import LOAD_COLUMNS, load_data, prepare_data, save_model
+
+# Search space; trials are sampled from the full grid
+PARAM_GRID = {
+    'max_depth': [2, 3, 4, 6],
+    'learning_rate': [0.05, 0.1, 0.3],
+    'min_child_weight': [1, 5],
+    'subsample': [0.8, 1.0],
+}
+
+MAX_ROUNDS = 400
+EARLY_STOPPING_ROUNDS = 20
+
+# Share of each training fold held back for early stopping
+EARLY_STOPPING_FRACTION = 0.1
+
+# Set once per worker process so the data isn't pickled for every trial
+_X = None
+_y = None
+_splits = None
+
+
+def _init_worker(X, y, splits):
+    global _X, _y, _splits
+    _X, _y, _splits = X, y, splits
+
+
+def _fit_stop_split(train_index):
+    """A fold's training window, split into the rows it fits on and the early-stopping slice"""
+    stop = max(1, int(len(train_index) * (1 - EARLY_STOPPING_FRACTION)))
+    return train_index[:stop], train_index[stop:]
+
+
+def usable_splits(splits, y, n_classes):
+    """
+    The folds whose fitting rows contain every class. Early folds of a
+    series whose first cyclone comes late have none, and XGBoost can't fit
+    a multi-class model on them ("Invalid classes inferred").
+    """
+    usable = []
+    for train_index, test_index in splits:
+        fit_index, _ = _fit_stop_split(train_index)
+        if len(np.unique(y[fit_index])) == n_classes:
+            usable.append((train_index, test_index))
+    return usable
+
+
+def _classifier(params, n_classes, n_estimators=MAX_ROUNDS, early_stopping=True):
+    return xgb.XGBClassifier(
+        objective='multi:softprob', num_class=n_classes, tree_method='hist',
+        n_estimators=n_estimators, n_jobs=1, random_state=42,
+        early_stopping_rounds=EARLY_STOPPING_ROUNDS if early_stopping else None,
+        **params
+    )
+
+
+def evaluate_params(params, n_classes, positive_class):
+    """
+    Time-series cross-validation of one parameter set (runs in a worker).
+
+    Each fold trains on the past only, early-stops on the most recent slice
+    of its training window and is scored on the following window. CYCLONE
+    recall is averaged over the folds whose test window has cyclones.
+    """
+    accuracies, recalls, rounds = [], [], []
+    model = None
+    for train_index, test_index in _splits:
+        fit_index, stop_index = _fit_stop_split(train_index)
+        model = _classifier(params, n_classes)
+        model.fit(_X[fit_index], _y[fit_index], eval_set=[(_X[stop_index], _y[stop_index])], verbose=False)
+
+        y_pred = model.predict_proba(_X[test_index]).argmax(axis=1)
+        accuracies.append(accuracy_score(_y[test_index], y_pred))
+        if positive_class is not None:
+            if (_y[test_index] == positive_class).any():
+                recalls.append(recall_score(_y[test_index] == positive_class, y_pred == positive_class,
+                                            zero_division=0))
+        else:
+            recalls.append(recall_score(_y[test_index], y_pred, average='macro', zero_division=0))
+        rounds.append(model.best_iteration + 1)
+
+    return {
+        'params': params,
+        'accuracy': float(np.mean(accuracies)),
+        'recall': float(np.mean(recalls)) if recalls else 0.0,
+        'rounds': int(np.median(rounds)),
+        # The last fold's model, for latency measurement in the parent process
+        'booster': bytes(model.get_booster().save_raw(raw_format='ubj'))
+    }
+
+
+def measure_latency(booster_raw, X, repeats=200):
+    """Median single-row latency (ms) and batch throughput (rows/s) of a trained booster."""
+    booster = xgb.Booster()
+    booster.load_model(bytearray(booster_raw))
+    booster.set_param({'nthread': 1})
+    row = X[:1]
+    booster.inplace_predict(row)
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        booster.inplace_predict(row)
+        timings.append(time.perf_counter() - started)
+    batch = X[:min(len(X), 10_000)]
+    started = time.perf_counter()
+    booster.inplace_predict(batch)
+    throughput = len(batch) / max(time.perf_counter() - started, 1e-9)
+    nodes = sum(dump.count('\n') for dump in booster.get_dump())
+    return float(np.median(timings) * 1000), throughput, nodes
+
+
+def sample_params(trials, seed):
+    grid = [dict(zip(PARAM_GRID, values)) for values in itertools.product(*PARAM_GRID.values())]
+    random.Random(seed).shuffle(grid)
+    return grid[:trials]
+
+
+def select_model(results, recall_target):
+    """
+    Cheapest model meeting the recall target (lowest single-row latency,
+    then highest accuracy); if none does, the one with the best recall.
+    """
+    passing = [r for r in results if r['recall'] >= recall_target]
+    if passing:
+        return min(passing, key=lambda r: (r['latency_ms'], -r['accuracy']))
+    return max(results, key=lambda r: (r['recall'], r['accuracy']))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Time-series CV hyperparameter search for the cyclone model')
+    parser.add_argument('--data', default=None, help='CSV file or partitioned dataset directory')
+    parser.add_argument('--trials', type=int, default=24)
+    parser.add_argument('--splits', type=int, default=5)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--recall-target', type=float, default=0.9,
+                        help='Minimum mean CYCLONE recall across folds')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--no-save', action='store_true')
+    args = parser.parse_args()
+
+    print("Loading and preparing data...")
+    if args.data is None:
+        df = load_data()
+    elif os.path.isdir(args.data):
+        df = load_dataset(args.data, columns=LOAD_COLUMNS)
+    else:
+        df = pd.read_csv(args.data, usecols=LOAD_COLUMNS, parse_dates=['date'])
+    # Folds must follow time, across all stations
+    df = df.sort_values('date', kind='stable').reset_index(drop=True)
+    X, y, label_encoder, pipeline = prepare_data(df)
+    classes = list(label_encoder.classes_)
+    positive_class = classes.index('CYCLONE') if 'CYCLONE' in classes else None
+    splits = usable_splits(TimeSeriesSplit(n_splits=args.splits).split(X), y, len(classes))
+    if len(splits) < args.splits:
+        print(f"Skipping {args.splits - len(splits)} early fold(s) whose training window lacks a class")
+    if not splits:
+        raise SystemExit("No fold has every class in its training window; use fewer --splits or more data")
+
+    candidates = sample_params(args.trials, args.seed)
+    print(f"Evaluating {len(candidates)} parameter sets x {len(splits)} folds on {args.workers} processes...")
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker, initargs=(X, y, splits)) as pool:
+        results = list(pool.map(evaluate_params, candidates, itertools.repeat(len(classes)),
+                                itertools.repeat(positive_class)))
+    print(f"Search took {time.perf_counter() - started:.1f}s")
+
+    for result in results:
+        result['latency_ms'], result['throughput'], result['nodes'] = measure_latency(result.pop('booster'), X)
+
+    print(f"{'depth':>5} {'lr':>5} {'mcw':>4} {'sub':>4} {'rounds':>6} {'acc':>6} {'recall':>6} "
+          f"{'nodes':>6} {'ms/row':>7} {'rows/s':>9}")
+    for result in sorted(results, key=lambda r: (-r['recall'], r['latency_ms'])):
+        p = result['params']
+        print(f"{p['max_depth']:>5} {p['learning_rate']:>5} {p['min_child_weight']:>4} {p['subsample']:>4} "
+              f"{result['rounds']:>6} {result['accuracy']:>6.3f} {result['recall']:>6.3f} "
+              f"{result['nodes']:>6} {result['latency_ms']:>7.3f} {result['throughput']:>9.0f}")
+
+    best = select_model(results, args.recall_target)
+    met = "meets" if best['recall'] >= args.recall_target else "does NOT meet"
+    print(f"Selected {best['params']} with {best['rounds']} rounds: recall {best['recall']:.3f} ({met} "
+          f"{args.recall_target}), accuracy {best['accuracy']:.3f}, {best['latency_ms']:.3f} ms/row")
+
+    if not args.no_save:
+        print("Refitting on all data...")
+        model = _classifier(best['params'], len(classes), n_estimators=best['rounds'], early_stopping=False)
+        model.set_params(n_jobs=os.cpu_count())
+        model.fit(X, y)
+        save_model(model, label_encoder, pipeline)
+
+
+if __name__ == "__main__":
+    main()
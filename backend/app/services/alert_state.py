@@ -0,0 +1,242 @@
+# backend/app/services/alert_state.py
+import json
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Set, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Alert levels in escalation order; a zone with no active alert is CLEAR
+LEVEL_RANK = {"CLEAR": 0, "HIGH": 1, "EXTREME": 2}
+
+# Decisions returned by AlertStateMachine.evaluate
+SEND = "send"
+ESCALATE = "escalate"
+REMIND = "remind"
+RETRY = "retry"
+ALL_CLEAR = "all_clear"
+SUPPRESS = "suppress"
+NOOP = "noop"
+
+
+def zone_key(prediction: Dict) -> str:
+    """Identify the area a prediction is about (station, named location, or rounded coordinates)"""
+    if prediction.get('station_id'):
+        return str(prediction['station_id'])
+    surge = prediction.get('storm_surge') or {}
+    if surge.get('location'):
+        return str(surge['location'])
+    if surge.get('lat') is not None and surge.get('lon') is not None:
+        return f"{float(surge['lat']):.2f},{float(surge['lon']):.2f}"
+    return "default"
+
+
+def alert_level(prediction: Dict, alert_worthy: bool) -> str:
+    """Reduce a prediction to CLEAR, HIGH or EXTREME"""
+    if not alert_worthy:
+        return "CLEAR"
+    surge_level = str((prediction.get('storm_surge') or {}).get('threat_level', '')).upper()
+    if "EXTREME" in (surge_level, str(prediction.get('overall_threat', '')).upper()):
+        return "EXTREME"
+    return "HIGH"
+
+
+class AlertStateStore:
+    """
+    Persists zone alert states to the `alert_states` table, falling back to a
+    local JSON file when the database is unavailable.
+    """
+
+    def __init__(self, supabase, path: Optional[str] = None):
+        self.supabase = supabase
+        self.path = Path(path or settings.ALERT_STATE_FILE)
+
+    def load(self) -> Dict[str, Dict]:
+        if self.supabase:
+            try:
+                response = self.supabase.table('alert_states').select('*').execute()
+                return {row['zone']: row for row in response.data or []}
+            except Exception as e:
+                logger.warning(f"Could not load alert states from database, using local file: {e}")
+        try:
+            return json.loads(self.path.read_text())
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.error(f"Could not read alert state file {self.path}: {e}")
+            return {}
+
+    def save(self, zone: str, state: Dict, states: Dict[str, Dict]) -> None:
+        # The file always holds the full picture so a restart without the database still works
+        try:
+            temp_path = self.path.with_suffix('.tmp')
+            temp_path.write_text(json.dumps(states))
+            temp_path.replace(self.path)
+        except Exception as e:
+            logger.error(f"Could not write alert state file {self.path}: {e}")
+        if self.supabase:
+            try:
+                self.supabase.table('alert_states').upsert({"zone": zone, **state}).execute()
+            except Exception as e:
+                logger.warning(f"Could not persist alert state for {zone} to database: {e}")
+
+
+class AlertStateMachine:
+    """
+    Per-zone alert state: CLEAR -> HIGH -> EXTREME -> (after a quiet period) CLEAR.
+
+    A zone is alerted once when its threat starts. After that only
+    escalations are sent, plus one reminder per suppression window if the
+    threat is still active. An alert that missed users (or failed outright)
+    still counts as sent; the users it missed are retried with backoff up to
+    ALERT_MAX_ATTEMPTS times. The all-clear goes out once the threat has stayed
+    below the alert threshold for ALERT_ALL_CLEAR_MINUTES; a failed one is
+    retried the same way. State is
+    written only on transitions, so a tick that changes nothing costs a
+    dictionary lookup.
+    """
+
+    def __init__(self, store: AlertStateStore):
+        self.store = store
+        self._states: Optional[Dict[str, Dict]] = None
+        # zone -> (failed all-clear attempts, epoch time of the next one); kept in memory only
+        self._all_clear_retries: Dict[str, Tuple[int, float]] = {}
+        # zone -> pending resend of an alert that missed users (prediction, users already
+        # reached, attempts, retry_at); kept in memory only
+        self._send_retries: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def _get_states(self) -> Dict[str, Dict]:
+        if self._states is None:
+            self._states = self.store.load()
+            logger.info(f"Loaded alert state for {len(self._states)} zones")
+        return self._states
+
+    def evaluate(self, zone: str, level: str, now: Optional[float] = None) -> str:
+        """
+        Decide what to do for this tick
+
+        Args:
+            zone: Zone key the prediction is about
+            level: CLEAR, HIGH or EXTREME
+            now: Current epoch time (defaults to time.time())
+
+        Returns:
+            One of send, escalate, remind, retry, all_clear, suppress or noop
+        """
+        now = now if now is not None else time.time()
+        with self._lock:
+            state = self._get_states().get(zone)
+            current = state["level"] if state else "CLEAR"
+
+            if level == "CLEAR":
+                if current == "CLEAR":
+                    return NOOP
+                if state.get("clear_since") is None:
+                    self._update(zone, {**state, "clear_since": now})
+                    return SUPPRESS
+                if now - state["clear_since"] < settings.ALERT_ALL_CLEAR_MINUTES * 60:
+                    return SUPPRESS
+                _, retry_at = self._all_clear_retries.get(zone, (0, 0.0))
+                return ALL_CLEAR if now >= retry_at else SUPPRESS
+
+            if current == "CLEAR":
+                return SEND
+            if LEVEL_RANK[level] > LEVEL_RANK[current]:
+                return ESCALATE
+            if state.get("clear_since") is not None:
+                # Threat came back before the all-clear; keep the zone in its alert state
+                self._all_clear_retries.pop(zone, None)
+                self._update(zone, {**state, "clear_since": None})
+            if now - state["last_sent_at"] >= settings.ALERT_SUPPRESSION_MINUTES * 60:
+                return REMIND
+            retry = self._send_retries.get(zone)
+            if retry and now >= retry["retry_at"]:
+                return RETRY
+            return SUPPRESS
+
+    def record_sent(self, zone: str, level: str, notification_id: Optional[str] = None,
+                    affected_area: Optional[Dict] = None, now: Optional[float] = None) -> None:
+        """Record an alert (or the all-clear, with level CLEAR) that went out for a zone"""
+        now = now if now is not None else time.time()
+        with self._lock:
+            self._all_clear_retries.pop(zone, None)
+            self._send_retries.pop(zone, None)
+            previous = self._get_states().get(zone) or {}
+            if level == "CLEAR":
+                state = {"level": "CLEAR", "last_sent_at": now, "clear_since": None,
+                         "notification_id": notification_id, "affected_area": None}
+            else:
+                # A reminder keeps the higher of the two levels
+                if LEVEL_RANK.get(previous.get("level"), 0) > LEVEL_RANK[level]:
+                    level = previous["level"]
+                state = {"level": level, "last_sent_at": now, "clear_since": None,
+                         "notification_id": notification_id,
+                         "affected_area": affected_area or previous.get("affected_area")}
+            self._update(zone, state)
+
+    def record_send_result(self, zone: str, prediction: Dict, delivered_user_ids: Set[str],
+                           complete: bool, now: Optional[float] = None) -> None:
+        """
+        Schedule a resend, with backoff, to the users an alert (or its retry) did not reach
+
+        Call after record_sent for a new alert. Once the alert is complete, or
+        after the last attempt, the zone has no pending resend.
+        """
+        now = now if now is not None else time.time()
+        with self._lock:
+            if complete:
+                self._send_retries.pop(zone, None)
+                return
+            attempts = self._send_retries.get(zone, {}).get("attempts", 0) + 1
+            if attempts >= settings.ALERT_MAX_ATTEMPTS:
+                logger.error(f"Alert for {zone} still missed users after {attempts} attempts; giving up on them")
+                self._send_retries.pop(zone, None)
+                return
+            self._send_retries[zone] = {
+                "prediction": prediction,
+                "delivered_user_ids": delivered_user_ids,
+                "attempts": attempts,
+                "retry_at": now + settings.ALERT_RETRY_SECONDS * 2 ** (attempts - 1)
+            }
+
+    def pending_send(self, zone: str) -> Optional[Dict]:
+        """The resend scheduled for a zone, if any"""
+        with self._lock:
+            retry = self._send_retries.get(zone)
+            return dict(retry) if retry else None
+
+    def record_all_clear_failed(self, zone: str, now: Optional[float] = None) -> None:
+        """Back off before retrying a zone's all-clear; give up and clear the zone after the last attempt"""
+        now = now if now is not None else time.time()
+        with self._lock:
+            attempts = self._all_clear_retries.get(zone, (0, 0.0))[0] + 1
+            if attempts < settings.ALERT_MAX_ATTEMPTS:
+                self._all_clear_retries[zone] = (
+                    attempts, now + settings.ALERT_RETRY_SECONDS * 2 ** (attempts - 1)
+                )
+                return
+            logger.error(f"All-clear for {zone} failed {attempts} times; clearing the zone without it")
+            self._all_clear_retries.pop(zone, None)
+            self._send_retries.pop(zone, None)
+            previous = self._get_states().get(zone) or {}
+            self._update(zone, {"level": "CLEAR", "last_sent_at": previous.get("last_sent_at"), "clear_since": None,
+                                "notification_id": None, "affected_area": None})
+
+    def get(self, zone: str) -> Optional[Dict]:
+        with self._lock:
+            state = self._get_states().get(zone)
+            return dict(state) if state else None
+
+    def get_all(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {zone: dict(state) for zone, state in self._get_states().items()}
+
+    def _update(self, zone: str, state: Dict) -> None:
+        states = self._get_states()
+        states[zone] = state
+        self.store.save(zone, state, states)
@@ -2,14 +2,30 @@
 import logging
 from datetime import datetime
 from app.services.notification_service import notification_service
+from app.services.alert_state import (
+    AlertStateMachine, AlertStateStore, alert_level, zone_key,
+    SEND, ESCALATE, REMIND, RETRY, ALL_CLEAR, SUPPRESS
+)
 
 logger = logging.getLogger(__name__)
 
+# Per-zone alert state, shared by every tick; persisted on transitions only
+alert_state = AlertStateMachine(AlertStateStore(notification_service.supabase))
+
 def check_and_send_alerts(prediction, weather_data):
     """
     Check if prediction requires sending alerts and send them
+    
+    Returns:
+        The alert state decision for this prediction (send, escalate, remind,
+        retry, all_clear, suppress or noop), or None if nothing was evaluated
     """
     try:
+        # A failed detection says nothing about the threat; leave the zone state alone
+        if prediction.get('error') or prediction.get('overall_threat') == 'UNKNOWN':
+            logger.info("Skipping alert check: threat detection unavailable")
+            return None
+        
         alerts = []
         
         # Check cyclone threat
@@ -36,29 +52,83 @@ def check_and_send_alerts(prediction, weather_data):
         
         # Check overall threat level
         overall_threat = prediction.get('overall_threat', 'low')
-        if overall_threat in ["HIGH", "high", "extreme"] and alerts:
+        alert_worthy = overall_threat in ["HIGH", "high", "extreme"] and bool(alerts)
+        
+        # Only new threats, escalations, reminders and all-clears reach users
+        zone = zone_key(prediction)
+        level = alert_level(prediction, alert_worthy)
+        decision = alert_state.evaluate(zone, level)
+        
+        if decision == RETRY:
+            # Resend the earlier alert to the users it missed
+            retry = alert_state.pending_send(zone)
+            logger.warning(f"🚨 Retrying evacuation alert for {zone} (attempt {retry['attempts'] + 1})")
+            delivered_user_ids = retry["delivered_user_ids"]
+            notification_result = notification_service.send_evacuation_alert(
+                retry["prediction"], delivered_user_ids=delivered_user_ids
+            )
+            complete = notification_result["success"] and not notification_result.get("results", {}).get("undelivered")
+            alert_state.record_send_result(zone, retry["prediction"], delivered_user_ids, complete)
+            if complete:
+                logger.warning(f"✅ EVACUATION ALERT RETRY SENT: {notification_result['message']}")
+            else:
+                logger.error(f"❌ EVACUATION ALERT RETRY INCOMPLETE: {notification_result['message']}")
+        elif decision in (SEND, ESCALATE, REMIND):
             # Send evacuation alerts to users
-            logger.warning(f"🚨 HIGH THREAT DETECTED: Sending evacuation alerts to users")
+            logger.warning(f"🚨 {level} THREAT DETECTED for {zone} ({decision}): Sending evacuation alerts to users")
             
-            # Send evacuation notification to all users
-            notification_result = notification_service.send_evacuation_alert(prediction)
+            delivered_user_ids = set()
+            notification_result = notification_service.send_evacuation_alert(
+                prediction, delivered_user_ids=delivered_user_ids
+            )
+            complete = notification_result["success"] and not notification_result.get("results", {}).get("undelivered")
             
-            if notification_result["success"]:
+            # A partial or failed send still counts as sent; the users it missed are retried with backoff
+            alert_state.record_sent(
+                zone, level,
+                notification_id=notification_result.get("results", {}).get("notification_id"),
+                affected_area=prediction.get('affected_area')
+            )
+            alert_state.record_send_result(zone, prediction, delivered_user_ids, complete)
+            if complete:
                 logger.warning(f"✅ EVACUATION ALERTS SENT: {notification_result['message']}")
             else:
-                logger.error(f"❌ FAILED TO SEND EVACUATION ALERTS: {notification_result['message']}")
+                logger.error(f"❌ EVACUATION ALERTS INCOMPLETE, retrying missed users: {notification_result['message']}")
             
             # Also send traditional alerts
             for alert in alerts:
                 send_alert(alert, weather_data)
             logger.warning(f"ALERTS SENT: {len(alerts)} alerts triggered")
+        elif decision == ALL_CLEAR:
+            logger.warning(f"✅ Threat for {zone} has passed: sending all-clear")
+            previous = alert_state.get(zone) or {}
+            notification_result = notification_service.send_all_clear({
+                "timestamp": datetime.now().isoformat(),
+                "overall_threat": "ALL_CLEAR",
+                "zone": zone,
+                "affected_area": previous.get("affected_area")
+            })
+            if notification_result["success"]:
+                alert_state.record_sent(
+                    zone, "CLEAR", notification_id=notification_result.get("results", {}).get("notification_id")
+                )
+            else:
+                logger.error(f"❌ FAILED TO SEND ALL-CLEAR: {notification_result['message']}")
+                alert_state.record_all_clear_failed(zone)
+        elif decision == SUPPRESS and level == "CLEAR":
+            logger.info(f"Threat for {zone} below threshold; all-clear pending")
+        elif decision == SUPPRESS:
+            logger.info(f"Alert for {zone} already sent at level {level}; suppressing repeat")
         elif alerts:
             logger.info(f"Threats detected but below threshold: {[a['type'] for a in alerts]}")
         else:
             logger.info("No threats detected")
+        
+        return decision
             
     except Exception as e:
         logger.error(f"Error in alert system: {e}")
+        return None
 
 def send_alert(alert_data, weather_data):
     """
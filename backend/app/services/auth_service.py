@@ -6,8 +6,10 @@ from datetime import datetime, timedelta
 from typing import Dict, Optional, Tuple
 from supabase import create_client, Client
 from app.core.config import settings
+from app.core.phone import to_e164
 from app.core.ssl_utils import configure_ssl, create_supabase_client_options
-from app.core.utils import clean_profile_data, serialize_datetime
+from app.core.utils import clean_profile_data, serialize_datetime, table_has_columns
+from app.services.recipient_index import recipient_index
 
 logger = logging.getLogger(__name__)
 
@@ -81,10 +83,13 @@ class AuthService:
                     "location": location,
                     "role": "community"
                 }
+                if table_has_columns(self.supabase, 'profiles', 'phone_e164'):
+                    profile_data["phone_e164"] = to_e164(phone)
                 
                 profile_response = self.supabase.table('profiles').insert(profile_data).execute()
                 
                 if profile_response.data:
+                    recipient_index.upsert_profile(user_id, profile_data)
                     logger.info(f"User registered successfully: {email}")
                     return {
                         "success": True,
@@ -238,9 +243,14 @@ class AuthService:
             if 'id' in profile_data:
                 del profile_data['id']
             
+            # Keep the normalized number in step with the raw one (where the column exists)
+            if 'phone' in profile_data and table_has_columns(self.supabase, 'profiles', 'phone_e164'):
+                profile_data['phone_e164'] = to_e164(profile_data['phone'])
+            
             response = self.supabase.table('profiles').update(profile_data).eq('id', user_id).execute()
             
             if response.data:
+                recipient_index.upsert_profile(user_id, profile_data)
                 logger.info(f"User profile updated successfully: {user_id}")
                 return {"success": True, "message": "Profile updated successfully"}
             else:
@@ -288,6 +298,7 @@ class AuthService:
             
             # Delete profile record
             self.supabase.table('profiles').delete().eq('id', user_id).execute()
+            recipient_index.remove_profile(user_id)
             
             # Delete user sessions
             self.supabase.table('user_sessions').delete().eq('user_id', user_id).execute()
@@ -0,0 +1,252 @@
+# backend/app/services/backfill.py
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+from urllib.parse import urlencode, urlparse
+
+import requests
+
+from app.services.rate_limiter import THROTTLE_STATUS_CODES, ProviderLimiter
+
+logger = logging.getLogger(__name__)
+
+# Query parameters that carry credentials: left out of cache keys and never written to disk
+SECRET_PARAMS = {"appid", "key", "api_key", "apikey", "token"}
+
+# (url, params, headers, timeout) -> (status code, body, headers)
+Transport = Callable[[str, Dict[str, Any], Dict[str, str], float], Tuple[int, str, Dict[str, str]]]
+
+
+@dataclass
+class FetchTask:
+    """One historical request; `key` names its result and its checkpoint entry"""
+    key: str
+    url: str
+    params: Dict[str, Any] = field(default_factory=dict)
+    headers: Dict[str, str] = field(default_factory=dict)
+
+
+@dataclass
+class BackfillResult:
+    results: Dict[str, Any]
+    failed: Dict[str, str]
+    stats: Dict[str, Any]
+
+
+def requests_transport(session: Optional[requests.Session] = None) -> Transport:
+    """Live HTTP through a shared requests session (connection reuse across workers)"""
+    session = session or requests.Session()
+
+    def transport(url, params, headers, timeout):
+        response = session.get(url, params=params, headers=headers, timeout=timeout)
+        return response.status_code, response.text, dict(response.headers)
+
+    return transport
+
+
+def fixture_name(url: str, params: Optional[Dict[str, Any]] = None) -> str:
+    """File name a fixture for this request is looked up under: the URL path and public params, slugged"""
+    public = sorted((k, v) for k, v in (params or {}).items() if k not in SECRET_PARAMS)
+    name = urlparse(url).path.strip("/") + (f"?{urlencode(public)}" if public else "")
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", name)
+
+
+def fixture_transport(fixtures_dir: str) -> Transport:
+    """
+    Serve requests from local files instead of the network
+
+    A request maps to fixture_name(url, params), with or without a .html or
+    .json extension, falling back to the last segment of the URL path
+    (e.g. "2015_North_Indian_Ocean_cyclone_season.html"). Missing fixtures
+    are 404s.
+    """
+    def transport(url, params, headers, timeout):
+        basename = os.path.basename(urlparse(url).path)
+        for name in (fixture_name(url, params), basename):
+            for extension in ("", ".html", ".json"):
+                path = os.path.join(fixtures_dir, name + extension)
+                if name and os.path.isfile(path):
+                    with open(path, encoding="utf-8") as f:
+                        return 200, f.read(), {}
+        return 404, "", {}
+
+    return transport
+
+
+class BackfillEngine:
+    """
+    Concurrent, rate-limited, cached and resumable historical fetching.
+
+    - Requests run on a thread pool, all drawing from one provider-wide
+      token bucket; 429 and 5xx replies back the whole engine off and are
+      retried, other non-2xx replies fail the task.
+    - Successful response bodies are cached on disk, so a rerun is served
+      from the cache without touching the network or the rate limit.
+    - run() appends each parsed result to a JSON-lines checkpoint as it
+      completes; a rerun with the same checkpoint skips finished tasks.
+    - The transport is pluggable: fixture_transport() serves local HTML/JSON
+      files, and offline=True fails cache misses instead of fetching.
+    """
+
+    def __init__(self, name: str, cache_dir: Optional[str] = None, rate: float = 2.0,
+                 burst: Optional[float] = None, max_workers: int = 4,
+                 transport: Optional[Transport] = None, offline: bool = False,
+                 retries: int = 3, timeout: float = 10.0):
+        self.name = name
+        self.cache_dir = cache_dir
+        self.limiter = ProviderLimiter(name, rate, burst)
+        self.max_workers = max_workers
+        self.transport = transport or requests_transport()
+        self.offline = offline
+        self.retries = retries
+        self.timeout = timeout
+        self.cache_hits = 0
+        self.fetched = 0
+        self._lock = threading.Lock()
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def cache_key(task: FetchTask) -> str:
+        public = sorted((k, str(v)) for k, v in task.params.items() if k not in SECRET_PARAMS)
+        return hashlib.sha1(json.dumps([task.url, public]).encode()).hexdigest()
+
+    def _cache_path(self, task: FetchTask) -> Optional[str]:
+        return os.path.join(self.cache_dir, f"{self.cache_key(task)}.json") if self.cache_dir else None
+
+    def _read_cache(self, task: FetchTask) -> Optional[str]:
+        path = self._cache_path(task)
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)["body"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _write_cache(self, task: FetchTask, body: str) -> None:
+        path = self._cache_path(task)
+        if not path:
+            return
+        public = {k: v for k, v in task.params.items() if k not in SECRET_PARAMS}
+        # Write then rename, so an interrupted run never leaves a truncated entry
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"url": task.url, "params": public, "fetched_at": time.time(), "body": body}, f)
+        os.replace(temp_path, path)
+
+    def fetch(self, task: FetchTask) -> Optional[str]:
+        """
+        Response body for a task, from the cache or the transport
+
+        Returns:
+            The body of a 2xx response
+        Raises:
+            RuntimeError on a non-2xx status, the last error if every attempt
+            failed, or LookupError offline on a cache miss
+        """
+        body = self._read_cache(task)
+        if body is not None:
+            with self._lock:
+                self.cache_hits += 1
+            return body
+        if self.offline:
+            raise LookupError(f"{task.key} is not cached")
+
+        error: Optional[Exception] = None
+        for _ in range(max(1, self.retries)):
+            self.limiter.acquire()
+            try:
+                status, body, headers = self.transport(task.url, task.params, task.headers, self.timeout)
+            except Exception as e:
+                error = e
+                self.limiter.record_throttle()
+                continue
+            if status in THROTTLE_STATUS_CODES or status >= 500:
+                retry_after = headers.get("Retry-After")
+                self.limiter.record_throttle(float(retry_after) if retry_after and retry_after.isdigit() else None)
+                error = RuntimeError(f"{task.url} returned {status}")
+                continue
+            self.limiter.record_success()
+            with self._lock:
+                self.fetched += 1
+            if not 200 <= status < 300:
+                # Not cached or checkpointed, so a rerun tries it again
+                raise RuntimeError(f"{task.url} returned {status}")
+            self._write_cache(task, body)
+            return body
+        raise error
+
+    @staticmethod
+    def _load_checkpoint(checkpoint_file: Optional[str]) -> Dict[str, Any]:
+        done = {}
+        if checkpoint_file and os.path.exists(checkpoint_file):
+            with open(checkpoint_file, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # a line cut short by an interrupted run
+                    done[entry["key"]] = entry["result"]
+        return done
+
+    def run(self, tasks: Iterable[FetchTask], parse: Callable[[FetchTask, str], Any],
+            checkpoint_file: Optional[str] = None) -> BackfillResult:
+        """
+        Fetch and parse every task concurrently
+
+        Args:
+            tasks: Requests to make; keys must be unique
+            parse: (task, body) -> JSON-serializable result, run on the worker; tasks
+                whose fetch or parse raises are reported in failed and not checkpointed
+            checkpoint_file: JSON-lines file of finished results, appended as tasks complete
+
+        Returns:
+            Results by key (checkpointed and new, in task order), failures by key, and stats
+        """
+        tasks = list(tasks)
+        started = time.perf_counter()
+        done = self._load_checkpoint(checkpoint_file)
+        pending = [task for task in tasks if task.key not in done]
+        failed: Dict[str, str] = {}
+        logger.info(f"{self.name}: {len(tasks)} tasks, {len(tasks) - len(pending)} already checkpointed")
+
+        def work(task: FetchTask) -> Any:
+            return parse(task, self.fetch(task))
+
+        checkpoint = open(checkpoint_file, "a", encoding="utf-8") if checkpoint_file else None
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, self.max_workers)) as executor:
+                futures = {executor.submit(work, task): task for task in pending}
+                for future in as_completed(futures):
+                    task = futures[future]
+                    try:
+                        done[task.key] = future.result()
+                    except Exception as e:
+                        logger.error(f"{self.name}: {task.key} failed: {e}")
+                        failed[task.key] = str(e)
+                        continue
+                    if checkpoint:
+                        checkpoint.write(json.dumps({"key": task.key, "result": done[task.key]}) + "\n")
+                        checkpoint.flush()
+        finally:
+            if checkpoint:
+                checkpoint.close()
+
+        return BackfillResult(
+            results={task.key: done[task.key] for task in tasks if task.key in done},
+            failed=failed,
+            stats={**self.get_stats(), "tasks": len(tasks), "resumed": len(tasks) - len(pending),
+                   "seconds": round(time.perf_counter() - started, 3)}
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"fetched": self.fetched, "cache_hits": self.cache_hits, **self.limiter.get_stats()}
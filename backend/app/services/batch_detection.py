@@ -0,0 +1,218 @@
+# backend/app/services/batch_detection.py
+import logging
+import math
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from app.core.config import settings
+from app.services.data_fetcher import fetch_weather_data
+from app.services.storm_surge_predictor import storm_surge_predictor
+from app.services.threat_detection import determine_overall_threat, generate_recommendations, get_cyclone_model
+
+logger = logging.getLogger(__name__)
+
+# For picking the worst station in a cycle
+THREAT_ORDER = {"UNKNOWN": -1, "LOW": 0, "MEDIUM": 1, "HIGH": 2}
+
+
+@dataclass
+class Station:
+    station_id: str
+    latitude: float
+    longitude: float
+
+
+def parse_stations(spec: str) -> List[Station]:
+    """Parse MONITORING_STATIONS ("id:lat:lon,...")"""
+    stations = []
+    for entry in spec.split(","):
+        parts = [part.strip() for part in entry.split(":")]
+        if len(parts) != 3 or not parts[0]:
+            if entry.strip():
+                logger.error(f"Ignoring malformed station entry: {entry!r}")
+            continue
+        try:
+            stations.append(Station(parts[0], float(parts[1]), float(parts[2])))
+        except ValueError:
+            logger.error(f"Ignoring station with invalid coordinates: {entry!r}")
+    return stations
+
+
+def fetch_station_observation(station: Station) -> Dict[str, Any]:
+    """Weather and tide for one station, tagged with its id and coordinates"""
+    weather = fetch_weather_data(station.latitude, station.longitude)
+    tide = storm_surge_predictor.get_tidal_data(station.latitude, station.longitude)
+    return {
+        **weather,
+        "station_id": station.station_id,
+        "lat": station.latitude,
+        "lon": station.longitude,
+        "tidal_height": tide.get('current_height', 0)
+    }
+
+
+def fetch_observations(stations: List[Station], max_workers: Optional[int] = None,
+                       fetch: Callable[[Station], Dict[str, Any]] = fetch_station_observation) -> List[Dict[str, Any]]:
+    """
+    Fetch every station's observation, partitioned across a worker pool
+
+    Each worker takes a contiguous slice of stations, so a thousand stations
+    cost a handful of tasks rather than a thousand.
+
+    Returns:
+        Observations in station order
+    """
+    if not stations:
+        return []
+    workers = max(1, min(max_workers or settings.DETECTION_MAX_WORKERS, len(stations)))
+    chunk_size = math.ceil(len(stations) / workers)
+    chunks = [stations[i:i + chunk_size] for i in range(0, len(stations), chunk_size)]
+
+    def fetch_chunk(chunk: List[Station]) -> List[Dict[str, Any]]:
+        observations = []
+        for station in chunk:
+            try:
+                observations.append(fetch(station))
+            except Exception as e:
+                logger.error(f"Error fetching observation for {station.station_id}: {e}")
+                observations.append({"valid": False, "error": str(e), "lat": station.latitude, "lon": station.longitude})
+        return observations
+
+    with ThreadPoolExecutor(max_workers=len(chunks)) as executor:
+        return [observation for chunk in executor.map(fetch_chunk, chunks) for observation in chunk]
+
+
+def predict_cyclones(batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Cyclone predictions for a batch in one model call; if that call fails,
+    each observation is scored on its own so one bad row can't fail them all
+
+    The observations are recorded as their stations' readings (used by the
+    sequence model), so this is for the monitoring pipeline only.
+    """
+    model = get_cyclone_model()
+    try:
+        return model.predict_batch(batch, record=True)
+    except Exception as e:
+        logger.error(f"Batch cyclone prediction failed, scoring {len(batch)} observations one by one: {e}")
+    results = []
+    for observation in batch:
+        try:
+            results.append(model.predict(observation, record=True))
+        except Exception as e:
+            results.append({"error": str(e)})
+    return results
+
+
+def predict_surges(batch: List[Dict[str, Any]], locations: List[str],
+                   tide_heights: List[float]) -> List[Dict[str, Any]]:
+    """Vectorized storm surge predictions, falling back to one row at a time like predict_cyclones"""
+    try:
+        return storm_surge_predictor.predict_storm_surge_batch(batch, locations, tide_heights)
+    except Exception as e:
+        logger.error(f"Batch storm surge prediction failed, computing {len(batch)} stations one by one: {e}")
+    results = []
+    for observation, location, tide_height in zip(batch, locations, tide_heights):
+        try:
+            results.extend(storm_surge_predictor.predict_storm_surge_batch([observation], [location], [tide_height]))
+        except Exception as e:
+            results.append({"error": str(e)})
+    return results
+
+
+def assess_observations(stations: List[Station], observations: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Threat assessment for many stations: one cyclone model call and one
+    vectorized surge computation for the whole batch, redone row by row if
+    either fails, so only the stations whose own rows fail come back UNKNOWN
+
+    Returns:
+        One threat_data dictionary per station, shaped like run_threat_detection's
+    """
+    if not stations:
+        return []
+
+    usable = [i for i, observation in enumerate(observations) if not observation.get("error")]
+    results: List[Dict[str, Any]] = [None] * len(stations)
+    errors: Dict[int, str] = {}
+    timestamp = datetime.now().isoformat()
+
+    if usable:
+        batch = [observations[i] for i in usable]
+        cyclone_results = predict_cyclones(batch)
+        tide_heights = [
+            observation["tidal_height"] if observation.get("tidal_height") is not None
+            else storm_surge_predictor.get_tidal_data(observation["lat"], observation["lon"]).get('current_height', 0)
+            for observation in batch
+        ]
+        surge_results = predict_surges(batch, [stations[i].station_id for i in usable], tide_heights)
+        for i, cyclone_data, surge_data in zip(usable, cyclone_results, surge_results):
+            if "error" in cyclone_data or "error" in surge_data:
+                errors[i] = cyclone_data.get("error") or surge_data["error"]
+                continue
+            threat_level = determine_overall_threat(cyclone_data, surge_data)
+            results[i] = {
+                "timestamp": timestamp,
+                "weather_data": observations[i],
+                "cyclone": cyclone_data,
+                "storm_surge": surge_data,
+                "overall_threat": threat_level,
+                "recommendations": generate_recommendations(threat_level),
+                "station_id": stations[i].station_id
+            }
+
+    for i, result in enumerate(results):
+        if result is None:
+            results[i] = {
+                "timestamp": timestamp,
+                "error": errors.get(i) or observations[i].get("error", "Observation unavailable"),
+                "overall_threat": "UNKNOWN",
+                "recommendations": ["System temporarily unavailable. Please try again later."],
+                "station_id": stations[i].station_id
+            }
+    return results
+
+
+def run_threat_detection_batch(stations: Optional[List[Station]] = None,
+                               max_workers: Optional[int] = None,
+                               fetch: Callable[[Station], Dict[str, Any]] = fetch_station_observation) -> Dict[str, Any]:
+    """
+    Run one detection cycle over every station and merge the results
+
+    Args:
+        stations: Stations to assess (defaults to MONITORING_STATIONS)
+        max_workers: Fetch workers
+        fetch: Observation source, replaceable for benchmarks
+
+    Returns:
+        Threat snapshot: per-station threat data, a summary and cycle timings
+    """
+    stations = stations if stations is not None else parse_stations(settings.MONITORING_STATIONS)
+    started = time.perf_counter()
+
+    observations = fetch_observations(stations, max_workers, fetch)
+    fetched = time.perf_counter()
+
+    threats = assess_observations(stations, observations)
+    assessed = time.perf_counter()
+
+    by_threat = Counter(threat["overall_threat"] for threat in threats)
+    logger.info(f"Detection cycle: {len(stations)} stations in {assessed - started:.2f}s {dict(by_threat)}")
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "stations": {threat["station_id"]: threat for threat in threats},
+        "summary": {
+            "total_stations": len(stations),
+            "by_threat": dict(by_threat),
+            "highest_threat": max(by_threat, key=lambda level: THREAT_ORDER.get(level, -1)) if by_threat else None
+        },
+        "timings": {
+            "fetch_seconds": round(fetched - started, 4),
+            "assess_seconds": round(assessed - fetched, 4),
+            "cycle_seconds": round(assessed - started, 4)
+        }
+    }
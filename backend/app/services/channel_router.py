@@ -0,0 +1,280 @@
+# backend/app/services/channel_router.py
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Callable, Dict, List, Optional
+
+from app.core.config import settings
+from app.services.rate_limiter import set_acquire_hook
+
+logger = logging.getLogger(__name__)
+
+# Priors used until a user has history on a channel: (latency seconds, success rate)
+CHANNEL_PRIORS = {
+    "push": (1.0, 0.85),
+    "sms": (3.0, 0.95),
+    "email": (5.0, 0.9)
+}
+DEFAULT_PRIOR = (5.0, 0.8)
+
+
+class ChannelHistory:
+    """
+    Per-user, per-channel delivery history kept as exponentially weighted
+    averages of latency and success. Bounded LRU so memory stays flat.
+    """
+
+    def __init__(self, max_users: int = 100000, smoothing: float = 0.3):
+        self.max_users = max_users
+        self.smoothing = smoothing
+        self._history: "OrderedDict[str, Dict[str, Dict[str, float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def record(self, user_id: str, channel: str, success: bool, latency: float) -> None:
+        with self._lock:
+            channels = self._history.pop(user_id, {})
+            prior_latency, prior_success = CHANNEL_PRIORS.get(channel, DEFAULT_PRIOR)
+            stats = channels.setdefault(channel, {"latency": prior_latency, "success": prior_success})
+            stats["latency"] += self.smoothing * (latency - stats["latency"])
+            stats["success"] += self.smoothing * ((1.0 if success else 0.0) - stats["success"])
+            self._history[user_id] = channels
+            while len(self._history) > self.max_users:
+                self._history.popitem(last=False)
+
+    def expected_time(self, user_id: str, channel: str) -> float:
+        """Expected time to a successful receipt on this channel (latency / success rate)"""
+        with self._lock:
+            stats = self._history.get(user_id, {}).get(channel)
+        if stats is None:
+            latency, success = CHANNEL_PRIORS.get(channel, DEFAULT_PRIOR)
+        else:
+            latency, success = stats["latency"], stats["success"]
+        return latency / max(success, 0.01)
+
+    def get(self, user_id: str) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {channel: dict(stats) for channel, stats in self._history.get(user_id, {}).items()}
+
+
+class _Attempt:
+    """
+    One channel send running on the router's executor. Its clock starts when
+    the send gets its rate-limit token (or finishes without one), so time
+    queued or throttled doesn't count against the channel timeout.
+    """
+
+    def __init__(self, executor: ThreadPoolExecutor, channel: str, sender: Callable[[], bool]):
+        self.channel = channel
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self._acquired = threading.Event()
+        self.future = executor.submit(self._run, sender)
+        self.future.add_done_callback(self._done)
+
+    def _start_clock(self) -> None:
+        if self.started is None:
+            self.started = time.monotonic()
+        self._acquired.set()
+
+    def _run(self, sender: Callable[[], bool]):
+        set_acquire_hook(self._start_clock)
+        try:
+            return sender()
+        finally:
+            set_acquire_hook(None)
+
+    def _done(self, future) -> None:
+        self._start_clock()
+        self.finish()
+
+    def finish(self) -> float:
+        # Waiters can wake before the done callback runs, so whichever comes first stamps the end
+        if self.finished is None:
+            self.finished = time.monotonic()
+        return self.finished
+
+    def result(self, timeout: float):
+        """The sender's return value, waiting at most timeout once the send has started"""
+        self._acquired.wait()
+        return self.future.result(timeout=max(0.0, self.started + timeout - time.monotonic()))
+
+    def succeeded_late(self) -> bool:
+        """Whether this (timed-out) send has since finished successfully"""
+        future = self.future
+        return future.done() and not future.cancelled() and future.exception() is None and bool(future.result())
+
+    def late_result(self) -> Dict:
+        """Attempt result for a send that succeeded after its timeout"""
+        sent = self.future.result()
+        return {
+            "channel": self.channel,
+            "success": True,
+            "latency": round(self.finish() - self.started, 3),
+            "error": None,
+            "provider_message_id": sent if isinstance(sent, str) else None
+        }
+
+
+class _LateSuccesses:
+    """
+    Where a timed-out send that succeeds anyway is counted: deliver() takes it
+    while it is still running (and then sends no further channels); after
+    deliver() returns it goes to on_late_success. One lock orders the two, so
+    each late success is counted exactly once.
+    """
+
+    def __init__(self, on_late_success: Optional[Callable[[Dict], None]]):
+        self.on_late_success = on_late_success
+        self.timed_out: List = []  # (attempt, result) pairs deliver() may still take
+        self._returned = False
+        self._lock = threading.Lock()
+
+    def take(self, close: bool = False) -> bool:
+        """Mark timed-out attempts that have since succeeded as successful; True if any were"""
+        taken = False
+        with self._lock:
+            for attempt, result in self.timed_out:
+                if not result["success"] and attempt.succeeded_late():
+                    result.update(attempt.late_result())
+                    taken = True
+            self._returned = self._returned or close
+        return taken
+
+    def report(self, attempt: "_Attempt") -> bool:
+        """Hand a late success to on_late_success if deliver() has returned without taking it"""
+        with self._lock:
+            if not self._returned or any(a is attempt and r["success"] for a, r in self.timed_out):
+                return False
+        if self.on_late_success is not None:
+            self.on_late_success(attempt.late_result())
+        return True
+
+
+class ChannelRouter:
+    """
+    Delivers to one recipient on the channel most likely to reach them fastest,
+    failing over to the next channel on error or timeout. Only the highest
+    threat levels fan out to every channel, all sent at once.
+    """
+
+    def __init__(self, history: Optional[ChannelHistory] = None):
+        self.history = history or ChannelHistory()
+        self.timeout = settings.CHANNEL_TIMEOUT_SECONDS
+        self.redundant_levels = {
+            level.strip().upper() for level in settings.REDUNDANT_CHANNEL_THREAT_LEVELS.split(",") if level.strip()
+        }
+        # Attempts run here so a slow provider can be abandoned without blocking failover
+        self._executor = ThreadPoolExecutor(
+            max_workers=settings.NOTIFICATION_MAX_WORKERS * 2, thread_name_prefix="channel"
+        )
+
+    def is_redundant(self, threat_data: Dict) -> bool:
+        """Whether this threat warrants sending on every available channel"""
+        levels = {
+            str(threat_data.get('overall_threat', '')).upper(),
+            str(threat_data.get('storm_surge', {}).get('threat_level', '')).upper()
+        }
+        return bool(levels & self.redundant_levels)
+
+    def order_channels(self, user_id: str, channels: List[str]) -> List[str]:
+        return sorted(channels, key=lambda channel: self.history.expected_time(user_id, channel))
+
+    def deliver(self, user_id: str, senders: Dict[str, Callable[[], bool]], redundant: bool = False,
+                on_late_success: Optional[Callable[[Dict], None]] = None) -> Dict:
+        """
+        Deliver to one user
+
+        Args:
+            user_id: Recipient id used to look up channel history
+            senders: Channel name -> zero-argument send function returning success, or the
+                provider message id (a non-empty string) when the provider returns one
+            redundant: Send on every channel instead of stopping at the first success
+            on_late_success: Called with the attempt result when a send that timed out
+                succeeds after this call has returned
+
+        Returns:
+            Dictionary with the channel that delivered first and every attempt made. A send
+            that timed out but succeeded before failover (or before returning) counts as
+            delivered, with its attempt marked successful.
+        """
+        outcome = {"delivered_via": None, "attempts": []}
+        channels = self.order_channels(user_id, list(senders))
+        late = _LateSuccesses(on_late_success)
+
+        if redundant:
+            # Every channel at once; the first to succeed is the one that delivered
+            attempts = [_Attempt(self._executor, channel, senders[channel]) for channel in channels]
+            for attempt in attempts:
+                outcome["attempts"].append(self._collect(user_id, attempt, late))
+            late.take(close=True)
+            delivered = [
+                (attempt.finished, result["channel"])
+                for attempt, result in zip(attempts, outcome["attempts"]) if result["success"]
+            ]
+            outcome["delivered_via"] = min(delivered)[1] if delivered else None
+            return outcome
+
+        for channel in channels:
+            # A slow send that has succeeded by now makes failover unnecessary
+            if late.take():
+                break
+            result = self._collect(user_id, _Attempt(self._executor, channel, senders[channel]), late)
+            outcome["attempts"].append(result)
+            if result["success"]:
+                outcome["delivered_via"] = channel
+                break
+
+        late.take(close=True)
+        if outcome["delivered_via"] is None:
+            outcome["delivered_via"] = next(
+                (result["channel"] for result in outcome["attempts"] if result["success"]), None
+            )
+        return outcome
+
+    def _collect(self, user_id: str, attempt: _Attempt, late: _LateSuccesses) -> Dict:
+        """Wait for one attempt (up to the channel timeout) and record it in the history"""
+        message_id = None
+        try:
+            sent = attempt.result(self.timeout)
+            success = bool(sent)
+            message_id = sent if isinstance(sent, str) else None
+            error = None if success else "send_failed"
+        except FutureTimeoutError:
+            success, error = False, "timeout"
+            if not attempt.future.cancel():
+                # Still sending: learn from it when it ends; a success counts as delivered
+                # if deliver() is still running, else it is reported when it lands
+                attempt.future.add_done_callback(lambda f, attempt=attempt: self._record_late(user_id, attempt, late))
+        except Exception as e:
+            success, error = False, type(e).__name__
+        latency = (time.monotonic() if error == "timeout" else attempt.finish()) - attempt.started
+
+        if error != "timeout":
+            self.history.record(user_id, attempt.channel, success, latency)
+        result = {
+            "channel": attempt.channel,
+            "success": success,
+            "latency": round(latency, 3),
+            "error": error,
+            "provider_message_id": message_id
+        }
+        if error == "timeout":
+            late.timed_out.append((attempt, result))
+        return result
+
+    def _record_late(self, user_id: str, attempt: _Attempt, late: _LateSuccesses) -> None:
+        success = attempt.succeeded_late()
+        self.history.record(user_id, attempt.channel, success, attempt.finish() - attempt.started)
+        if not success:
+            return
+        try:
+            if late.report(attempt):
+                logger.warning(f"{attempt.channel} send to {user_id} succeeded after its timeout")
+        except Exception as e:
+            logger.error(f"Error recording late {attempt.channel} success for {user_id}: {e}")
+
+
+# Create a global instance
+channel_router = ChannelRouter()
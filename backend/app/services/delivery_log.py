@@ -0,0 +1,329 @@
+# backend/app/services/delivery_log.py
+import json
+import logging
+import queue
+import re
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from app.core.config import settings
+from app.core.utils import serialize_datetime
+
+logger = logging.getLogger(__name__)
+
+# Only a handful of raw error strings are kept on the event row for debugging
+MAX_ERROR_SAMPLES = 10
+
+_HTTP_STATUS_PATTERN = re.compile(r"error: (\d{3})")
+
+# Every DeliveryLog in the process shares the spill file
+_spill_lock = threading.Lock()
+
+
+def classify_error(message: Optional[str]) -> str:
+    """
+    Reduce a free-text send error to a short code for aggregation
+
+    Args:
+        message: Error message returned by a provider call
+
+    Returns:
+        Error code such as "http_429", "timeout" or "invalid_phone"
+    """
+    if not message:
+        return "send_failed"
+    lowered = message.lower()
+    match = _HTTP_STATUS_PATTERN.search(lowered)
+    if match:
+        return f"http_{match.group(1)}"
+    if "not configured" in lowered:
+        return "not_configured"
+    if "invalid phone" in lowered:
+        return "invalid_phone"
+    if "no phone" in lowered:
+        return "no_phone"
+    if "timeout" in lowered or "timed out" in lowered:
+        return "timeout"
+    if re.fullmatch(r"[a-z_]+", lowered):
+        return lowered
+    return "send_failed"
+
+
+def summarize_threat(threat_data: Dict) -> Dict:
+    """
+    Small, fixed-size summary of the threat stored on the event row instead
+    of the full threat payload
+    """
+    cyclone = threat_data.get('cyclone', {}) or {}
+    surge = threat_data.get('storm_surge', {}) or {}
+    return serialize_datetime({
+        "overall_threat": threat_data.get('overall_threat'),
+        "timestamp": threat_data.get('timestamp'),
+        "cyclone_probability": cyclone.get('probability'),
+        "cyclone_classification": cyclone.get('classification'),
+        "surge_threat_level": surge.get('threat_level'),
+        "total_water_level": surge.get('total_water_level'),
+        "location": surge.get('location')
+    })
+
+
+class DeliveryEvent:
+    """
+    Running totals for one alert fan-out; per-recipient rows go to the log
+    """
+
+    def __init__(self, event_id: str):
+        self.event_id = event_id
+        self.errors_by_code: Counter = Counter()
+        self.error_samples: List[str] = []
+        self._lock = threading.Lock()
+
+    def add_error(self, code: str, message: Optional[str] = None) -> None:
+        with self._lock:
+            self.errors_by_code[code] += 1
+            if message and len(self.error_samples) < MAX_ERROR_SAMPLES:
+                self.error_samples.append(message)
+
+
+class DeliveryLog:
+    """
+    Normalized delivery log: one row per alert in `notifications` plus one row
+    per recipient/channel attempt in `notification_deliveries`.
+
+    Rows are buffered and written by a background thread in multi-row inserts,
+    so recording a delivery never waits on the database. The write queue is
+    bounded: when it is full, or a write still fails after its retries, the
+    write is appended to DELIVERY_LOG_SPILL_FILE and replayed once the writer
+    is idle. An event row is always written before its deliveries (they
+    reference it), retrying it first if its own insert failed.
+    """
+
+    def __init__(self, supabase, batch_size: Optional[int] = None, spill_path: Optional[str] = None):
+        self.supabase = supabase
+        self.batch_size = batch_size or settings.DELIVERY_LOG_BATCH_SIZE
+        self.spill_path = Path(spill_path or settings.DELIVERY_LOG_SPILL_FILE)
+        self._buffer: List[Dict] = []
+        self._buffer_lock = threading.Lock()
+        self._writes: "queue.Queue" = queue.Queue(maxsize=settings.DELIVERY_LOG_QUEUE_SIZE)
+        # event id -> event row, until the row is in the database
+        self._unwritten_events: Dict[str, Dict] = {}
+        self._writer = threading.Thread(target=self._write_loop, daemon=True, name="delivery-log")
+        self._writer.start()
+
+    def start_event(self, threat_type: str, threat_level: Optional[str], threat_data: Dict) -> DeliveryEvent:
+        """
+        Open an event row for an alert; its id is generated locally so sends can start immediately
+        """
+        event = DeliveryEvent(str(uuid.uuid4()))
+        row = {
+            "id": event.event_id,
+            "timestamp": datetime.now().isoformat(),
+            "threat_level": threat_level,
+            "threat_type": threat_type,
+            "threat_data": summarize_threat(threat_data)
+        }
+        self._unwritten_events[event.event_id] = row
+        self._enqueue(("insert", "notifications", [row]))
+        return event
+
+    def record(self, event: DeliveryEvent, user_id: Optional[str], channel: str, success: bool,
+               error: Optional[str] = None, latency: Optional[float] = None,
+               provider_message_id: Optional[str] = None) -> None:
+        """
+        Buffer one delivery attempt; thread-safe and non-blocking
+        """
+        error_code = None
+        if not success:
+            error_code = classify_error(error)
+            event.add_error(error_code, f"User {user_id}: {error}" if error else None)
+
+        row = self._row(event, user_id, channel, success, error_code, latency, provider_message_id)
+        with self._buffer_lock:
+            self._buffer.append(row)
+            if len(self._buffer) < self.batch_size:
+                return
+            batch, self._buffer = self._buffer, []
+        self._enqueue(("insert", "notification_deliveries", batch))
+
+    def record_late(self, event: DeliveryEvent, user_id: Optional[str], channel: str,
+                    latency: Optional[float] = None, provider_message_id: Optional[str] = None) -> None:
+        """
+        Log a send that succeeded after its timeout (its failed attempt is already logged)
+
+        Written on its own rather than buffered, since the event may have finished already
+        """
+        row = self._row(event, user_id, channel, True, None, latency, provider_message_id)
+        self._enqueue(("insert", "notification_deliveries", [row]))
+
+    @staticmethod
+    def _row(event: DeliveryEvent, user_id: Optional[str], channel: str, success: bool,
+             error_code: Optional[str], latency: Optional[float], provider_message_id: Optional[str]) -> Dict:
+        return {
+            "notification_id": event.event_id,
+            "user_id": user_id,
+            "channel": channel,
+            "status": "sent" if success else "failed",
+            "error_code": error_code,
+            "latency_ms": int(latency * 1000) if latency is not None else None,
+            "provider_message_id": provider_message_id,
+            "created_at": datetime.now().isoformat()
+        }
+
+    def finish_event(self, event: DeliveryEvent, totals: Dict) -> None:
+        """
+        Flush the event's remaining deliveries and write its aggregate counts
+        """
+        self._flush_buffer()
+        summary = {key: value for key, value in totals.items() if isinstance(value, (int, float, bool))}
+        self._enqueue(("update", "notifications", event.event_id, {
+            "total_users": totals.get("total_users", 0),
+            "email_sent": totals.get("email_sent", 0),
+            "sms_sent": totals.get("sms_sent", 0),
+            "push_sent": totals.get("push_sent", 0),
+            "failed": totals.get("failed", 0),
+            "results": {
+                **summary,
+                "errors_by_code": dict(event.errors_by_code),
+                "error_samples": event.error_samples
+            }
+        }))
+
+    def write_receipts(self, receipts: List[Dict]) -> None:
+        """
+        Upsert a batch of provider delivery receipts in one call
+
+        Called from the receipt buffer's flush thread; raises so the batch is retried
+        """
+        if not self.supabase:
+            raise RuntimeError("Supabase not available")
+        self.supabase.rpc('ingest_delivery_receipts', {'receipts': receipts}).execute()
+        logger.info(f"Upserted {len(receipts)} delivery receipts")
+
+    def get_delivered_rate(self, event_id: str) -> List[Dict]:
+        """Per-channel delivered rate for one alert, from provider receipts"""
+        if not self.supabase:
+            return []
+        response = self.supabase.rpc('get_delivered_rate', {'notification_id_param': event_id}).execute()
+        return response.data or []
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        """Block until everything recorded so far has been written (or spilled)"""
+        self._flush_buffer()
+        done = threading.Event()
+        try:
+            self._writes.put(("barrier", done), timeout=timeout)
+        except queue.Full:
+            return
+        done.wait(timeout)
+
+    def _flush_buffer(self) -> None:
+        with self._buffer_lock:
+            batch, self._buffer = self._buffer, []
+        if batch:
+            self._enqueue(("insert", "notification_deliveries", batch))
+
+    def _enqueue(self, operation) -> None:
+        """Queue a write for the background thread, spilling it to disk if the queue is full"""
+        try:
+            self._writes.put_nowait(operation)
+        except queue.Full:
+            if self.supabase:
+                logger.warning("Delivery log write queue is full; spilling to disk")
+                self._spill([operation])
+
+    def _write_loop(self) -> None:
+        while True:
+            try:
+                operation = self._writes.get(timeout=settings.DELIVERY_LOG_RETRY_SECONDS)
+            except queue.Empty:
+                self._replay_spill()
+                continue
+            if operation[0] == "barrier":
+                operation[1].set()
+            elif not self.supabase:
+                logger.warning("Supabase not available, skipping delivery log write")
+            elif not self._write_with_retries(operation):
+                self._spill([operation])
+
+    def _write_with_retries(self, operation) -> bool:
+        attempts = settings.DELIVERY_LOG_WRITE_ATTEMPTS
+        for attempt in range(attempts):
+            try:
+                self._write(operation)
+                return True
+            except Exception as e:
+                logger.error(f"Error writing delivery log (attempt {attempt + 1} of {attempts}): {e}")
+                if attempt + 1 < attempts:
+                    time.sleep(settings.DELIVERY_LOG_RETRY_SECONDS * 2 ** attempt)
+        return False
+
+    def _write(self, operation) -> None:
+        """Apply one write, inserting any event row it depends on first; raises on failure"""
+        if operation[0] == "insert" and operation[1] == "notifications":
+            self._insert_events(operation[2])
+            return
+        if operation[0] == "insert":
+            _, table, rows = operation
+            self._insert_events([self._unwritten_events[event_id]
+                                 for event_id in {row["notification_id"] for row in rows}
+                                 if event_id in self._unwritten_events])
+            self.supabase.table(table).insert(rows).execute()
+            logger.info(f"Wrote {len(rows)} rows to {table}")
+        elif operation[0] == "update":
+            _, table, row_id, values = operation
+            if row_id in self._unwritten_events:
+                self._insert_events([self._unwritten_events[row_id]])
+            self.supabase.table(table).update(values).eq('id', row_id).execute()
+
+    def _insert_events(self, rows: List[Dict]) -> None:
+        if not rows:
+            return
+        # An event row can be written twice (retried ahead of its deliveries, then replayed)
+        self.supabase.table('notifications').upsert(rows, ignore_duplicates=True).execute()
+        for row in rows:
+            self._unwritten_events.pop(row["id"], None)
+
+    def _spill(self, operations: List) -> None:
+        try:
+            with _spill_lock, open(self.spill_path, 'a') as f:
+                for operation in operations:
+                    f.write(json.dumps(list(operation)) + "\n")
+        except Exception as e:
+            logger.error(f"Could not spill delivery log writes to {self.spill_path}, dropping them: {e}")
+
+    def _replay_spill(self) -> None:
+        """Write spilled operations in order, stopping (and keeping the rest) at the first failure"""
+        if not self.supabase or not self.spill_path.exists():
+            return
+        # Named per writer thread: each DeliveryLog replays on its own thread
+        replaying = self.spill_path.with_name(f"{self.spill_path.name}.{threading.get_ident()}.replay")
+        with _spill_lock:
+            try:
+                self.spill_path.replace(replaying)
+            except FileNotFoundError:
+                return
+        operations = [tuple(json.loads(line)) for line in replaying.read_text().splitlines() if line.strip()]
+        written = 0
+        for operation in operations:
+            try:
+                self._write(operation)
+            except Exception as e:
+                logger.error(f"Error replaying spilled delivery log writes, {len(operations) - written} left: {e}")
+                break
+            written += 1
+        with _spill_lock:
+            # Unwritten operations go back ahead of anything spilled meanwhile
+            remaining = [json.dumps(list(operation)) + "\n" for operation in operations[written:]]
+            if remaining:
+                spilled_meanwhile = self.spill_path.read_text() if self.spill_path.exists() else ""
+                replaying.write_text("".join(remaining) + spilled_meanwhile)
+                replaying.replace(self.spill_path)
+            else:
+                replaying.unlink()
+        if written:
+            logger.info(f"Replayed {written} spilled delivery log writes")
@@ -0,0 +1,192 @@
+# backend/app/services/delivery_receipts.py
+import logging
+import threading
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Provider statuses reduced to what the delivery log tracks
+RECEIPT_STATUSES = {
+    # Twilio
+    "accepted": "queued",
+    "queued": "queued",
+    "sending": "queued",
+    "sent": "sent",
+    "delivered": "delivered",
+    "read": "delivered",
+    "undelivered": "failed",
+    "failed": "failed",
+    # Nexmo (Vonage)
+    "buffered": "queued",
+    "expired": "failed",
+    "rejected": "failed",
+    # SNS delivery status logs
+    "success": "delivered",
+    "failure": "failed",
+    # Push receipts
+    "ok": "delivered",
+    "error": "failed"
+}
+
+# Later receipts for a message never move it back to an earlier state
+STATUS_RANK = {"queued": 0, "sent": 1, "delivered": 2, "failed": 2}
+
+
+def webhook_url(provider: str) -> str:
+    """Status callback URL for a provider, including the shared token the webhook routes require"""
+    url = f"{settings.WEBHOOK_BASE_URL.rstrip('/')}/api/v1/webhooks/{provider}"
+    return f"{url}?token={settings.WEBHOOK_SECRET}" if settings.WEBHOOK_SECRET else url
+
+
+def response_message_id(response, *keys: str) -> Optional[str]:
+    """Provider message id from a JSON send response, if it carries one"""
+    try:
+        payload = response.json()
+    except ValueError:
+        return None
+    if not isinstance(payload, dict):
+        return None
+    for key in keys or ("message_id", "id"):
+        if payload.get(key):
+            return str(payload[key])
+    return None
+
+
+def normalize_receipt_status(status: Optional[str]) -> Optional[str]:
+    """Map a provider status string to queued, sent, delivered or failed"""
+    if not status:
+        return None
+    return RECEIPT_STATUSES.get(str(status).strip().lower())
+
+
+class ReceiptBuffer:
+    """
+    In-memory buffer for provider delivery receipts.
+
+    Webhook handlers only add to a dictionary keyed by provider message id, so
+    repeated callbacks for one message collapse into its latest state. A
+    background thread flushes the buffer in batched upserts every
+    RECEIPT_FLUSH_INTERVAL_SECONDS, or sooner once RECEIPT_BATCH_SIZE is reached.
+    """
+
+    def __init__(self, batch_size: Optional[int] = None, flush_interval: Optional[float] = None,
+                 max_pending: Optional[int] = None):
+        self.batch_size = batch_size or settings.RECEIPT_BATCH_SIZE
+        self.flush_interval = flush_interval or settings.RECEIPT_FLUSH_INTERVAL_SECONDS
+        self.max_pending = max_pending or settings.RECEIPT_BUFFER_MAX
+        self._pending: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._writer: Optional[Callable[[List[Dict]], None]] = None
+        self._thread: Optional[threading.Thread] = None
+        self.stats = {"received": 0, "written": 0, "dropped": 0, "ignored": 0, "write_errors": 0}
+
+    def set_writer(self, writer: Callable[[List[Dict]], None]) -> None:
+        """Register the callable that persists a batch of receipt rows"""
+        self._writer = writer
+
+    def add(self, provider: str, provider_message_id: Optional[str], status: Optional[str],
+            error_code: Optional[str] = None) -> bool:
+        """
+        Buffer one receipt; cheap enough to call inline from a request handler
+
+        Returns:
+            False if the receipt was ignored (no id, unknown status) or dropped
+        """
+        normalized = normalize_receipt_status(status)
+        if not provider_message_id or normalized is None:
+            with self._lock:
+                self.stats["ignored"] += 1
+            return False
+
+        row = {
+            "provider_message_id": str(provider_message_id),
+            "provider": provider,
+            "status": normalized,
+            "status_rank": STATUS_RANK[normalized],
+            "error_code": str(error_code) if error_code else None,
+            "received_at": datetime.now().isoformat()
+        }
+        with self._lock:
+            self.stats["received"] += 1
+            current = self._pending.get(row["provider_message_id"])
+            if current is not None and current["status_rank"] > row["status_rank"]:
+                return True
+            if current is None and len(self._pending) >= self.max_pending:
+                self.stats["dropped"] += 1
+                return False
+            self._pending[row["provider_message_id"]] = row
+            pending = len(self._pending)
+
+        self._ensure_started()
+        if pending >= self.batch_size:
+            self._wakeup.set()
+        return True
+
+    def flush(self) -> int:
+        """Write everything buffered so far; returns the number of rows written"""
+        with self._lock:
+            batch, self._pending = list(self._pending.values()), {}
+        if not batch:
+            return 0
+        if self._writer is None:
+            logger.warning("No receipt writer registered, dropping receipts")
+            with self._lock:
+                self.stats["dropped"] += len(batch)
+            return 0
+
+        written = 0
+        for start in range(0, len(batch), self.batch_size):
+            chunk = batch[start:start + self.batch_size]
+            try:
+                self._writer(chunk)
+                written += len(chunk)
+            except Exception as e:
+                logger.error(f"Error writing delivery receipts: {e}")
+                with self._lock:
+                    self.stats["write_errors"] += 1
+                self._requeue(batch[start:])
+                break
+        with self._lock:
+            self.stats["written"] += written
+        return written
+
+    def _requeue(self, rows: List[Dict]) -> None:
+        # Keep failed rows for the next flush unless a later state arrived meanwhile
+        with self._lock:
+            for row in rows:
+                key = row["provider_message_id"]
+                current = self._pending.get(key)
+                if current is not None:
+                    if current["status_rank"] < row["status_rank"]:
+                        self._pending[key] = row
+                    continue
+                if len(self._pending) >= self.max_pending:
+                    self.stats["dropped"] += 1
+                    continue
+                self._pending[key] = row
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._flush_loop, daemon=True, name="delivery-receipts")
+                self._thread.start()
+
+    def _flush_loop(self) -> None:
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {**self.stats, "pending": len(self._pending)}
+
+
+# Create a global instance
+receipt_buffer = ReceiptBuffer()
@@ -0,0 +1,139 @@
+# backend/app/services/delivery_scheduler.py
+import logging
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from app.core.utils import haversine_km
+
+logger = logging.getLogger(__name__)
+
+# Lane 0 is drained first; every worker that frees up takes the best lane waiting
+ZONE_THREAT_LANES = {
+    "extreme": 0,
+    "high": 0,
+    "medium": 1,
+    "moderate": 1,
+    "low": 2
+}
+UNZONED_LANE = 3
+LANE_NAMES = {0: "critical", 1: "elevated", 2: "standard", 3: "unzoned"}
+
+
+def assign_priority(user_zones: List[Dict], surge_point: Optional[Tuple[float, float]],
+                    surge_radius_km: float) -> Tuple[int, float]:
+    """
+    Work out the delivery lane and in-lane ordering key for one recipient
+
+    Args:
+        user_zones: Evacuation zones the user is assigned to (zone_name, threat_level, coordinates)
+        surge_point: (lat, lon) of the predicted surge, if known
+        surge_radius_km: Zones closer than this to the surge are promoted to the critical lane
+
+    Returns:
+        Tuple of (lane, distance_km); lower values are delivered first
+    """
+    lane = UNZONED_LANE
+    distance = float("inf")
+
+    for zone in user_zones:
+        zone_lane = ZONE_THREAT_LANES.get(str(zone.get("threat_level", "low")).lower(), 2)
+        coordinates = zone.get("coordinates") or {}
+        lat = coordinates.get("lat")
+        lon = coordinates.get("lng", coordinates.get("lon"))
+        if surge_point and lat is not None and lon is not None:
+            zone_distance = haversine_km(surge_point[0], surge_point[1], float(lat), float(lon))
+            distance = min(distance, zone_distance)
+            if zone_distance <= surge_radius_km:
+                zone_lane = 0
+        lane = min(lane, zone_lane)
+
+    return lane, distance
+
+
+class PriorityDeliveryScheduler:
+    """
+    Runs deliveries on a fixed worker pool, always picking the highest-priority
+    recipient waiting. Workers start on the first recipients while the rest are
+    still being read, and a bounded queue (max_pending) applies backpressure to
+    streamed recipient sources so memory stays flat.
+    """
+
+    def __init__(self, max_workers: int, max_pending: int = 0):
+        self.max_workers = max(1, max_workers)
+        self.lane_stats: Dict[str, Dict[str, Any]] = {}
+        self.submitted = 0
+        self.source_error: Optional[Exception] = None
+        self._queue: "queue.PriorityQueue" = queue.PriorityQueue(maxsize=max(0, max_pending))
+        self._stats_lock = threading.Lock()
+
+    def run(self, recipients: Iterable[Tuple[int, float, Dict]], handler: Callable[[Dict], Any],
+            on_result: Optional[Callable[[Any], None]] = None) -> List[Any]:
+        """
+        Deliver to every recipient and return the handler results
+
+        Args:
+            recipients: Iterable of (lane, distance_km, user) tuples; may be a lazy stream
+            handler: Called once per user from a worker thread
+            on_result: If given, each result is passed here (serialized) instead of being collected
+
+        Returns:
+            List of handler results in completion order (empty when on_result is used)
+
+        If reading recipients fails part way (e.g. a page query error), the
+        users already read are still delivered and the error is kept in
+        source_error instead of being raised.
+        """
+        results: List[Any] = []
+        results_lock = threading.Lock()
+        started_at = time.monotonic()
+
+        def worker():
+            while True:
+                lane, _, _, user = self._queue.get()
+                if user is None:
+                    break
+                try:
+                    result = handler(user)
+                except Exception as e:
+                    logger.error(f"Delivery handler failed for user {user.get('id')}: {e}")
+                    result = None
+                self._record(lane, time.monotonic() - started_at)
+                if result is not None:
+                    with results_lock:
+                        if on_result is not None:
+                            on_result(result)
+                        else:
+                            results.append(result)
+
+        workers = [threading.Thread(target=worker, daemon=True) for _ in range(self.max_workers)]
+        for thread in workers:
+            thread.start()
+
+        sequence = 0
+        try:
+            for lane, distance, user in recipients:
+                # The sequence number keeps equal-priority users in arrival order
+                self._queue.put((lane, distance, sequence, user))
+                sequence += 1
+        except Exception as e:
+            logger.error(f"Reading recipients failed after {sequence} users: {e}")
+            self.source_error = e
+        finally:
+            self.submitted = sequence
+            # Sentinels sort after every real lane so they are picked up last
+            for _ in workers:
+                self._queue.put((UNZONED_LANE + 1, 0.0, sequence, None))
+                sequence += 1
+            for thread in workers:
+                thread.join()
+
+        return results
+
+    def _record(self, lane: int, elapsed: float) -> None:
+        name = LANE_NAMES.get(lane, str(lane))
+        with self._stats_lock:
+            stats = self.lane_stats.setdefault(name, {"delivered": 0, "time_to_notify_s": 0.0})
+            stats["delivered"] += 1
+            stats["time_to_notify_s"] = round(max(stats["time_to_notify_s"], elapsed), 3)
@@ -0,0 +1,228 @@
+# backend/app/services/geo_index.py
+import math
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from app.core.utils import haversine_km
+
+# Length of one degree of latitude; longitude degrees shrink by cos(latitude)
+KM_PER_DEGREE = 111.32
+
+Point = Tuple[float, float]
+
+
+def parse_point(coordinates) -> Optional[Point]:
+    """
+    Extract a representative (lat, lon) from stored coordinates
+
+    Accepts {"lat", "lng"/"lon"} dictionaries (evacuation_zones.coordinates),
+    GeoJSON Point/Polygon geometries and [lat, lon] pairs. Polygons are
+    represented by the mean of their outer ring.
+    """
+    if not coordinates:
+        return None
+    try:
+        if isinstance(coordinates, dict):
+            if coordinates.get("lat") is not None:
+                lon = coordinates.get("lng", coordinates.get("lon"))
+                return (float(coordinates["lat"]), float(lon)) if lon is not None else None
+            geometry_type = coordinates.get("type")
+            if geometry_type == "Point":
+                lon, lat = coordinates["coordinates"][:2]
+                return float(lat), float(lon)
+            if geometry_type == "Polygon":
+                ring = coordinates["coordinates"][0]
+                return (
+                    sum(float(vertex[1]) for vertex in ring) / len(ring),
+                    sum(float(vertex[0]) for vertex in ring) / len(ring)
+                )
+            return None
+        lat, lon = coordinates[:2]
+        return float(lat), float(lon)
+    except (KeyError, IndexError, TypeError, ValueError, ZeroDivisionError):
+        return None
+
+
+def radius_box(lat: float, lon: float, radius_km: float) -> Tuple[float, float, float, float]:
+    """(min_lat, min_lon, max_lat, max_lon) enclosing a circle"""
+    d_lat = radius_km / KM_PER_DEGREE
+    d_lon = radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(lat)), 0.01))
+    return lat - d_lat, lon - d_lon, lat + d_lat, lon + d_lon
+
+
+def area_bounds(polygon: Optional[Sequence[Point]] = None, center: Optional[Point] = None,
+                radius_km: Optional[float] = None,
+                track: Optional[Sequence[Point]] = None) -> Optional[Tuple[float, float, float, float]]:
+    """Bounding box (min_lat, min_lon, max_lat, max_lon) of every area given, or None if there is none"""
+    boxes = []
+    if polygon and len(polygon) >= 3:
+        boxes.append((min(p[0] for p in polygon), min(p[1] for p in polygon),
+                      max(p[0] for p in polygon), max(p[1] for p in polygon)))
+    if center and radius_km:
+        boxes.append(radius_box(center[0], center[1], radius_km))
+    if track and radius_km:
+        boxes.extend(radius_box(lat, lon, radius_km) for lat, lon in track)
+    if not boxes:
+        return None
+    return (min(b[0] for b in boxes), min(b[1] for b in boxes), max(b[2] for b in boxes), max(b[3] for b in boxes))
+
+
+def point_in_polygon(lat: float, lon: float, polygon: Sequence[Point]) -> bool:
+    """Ray-casting test; polygon is a ring of (lat, lon) vertices, closed or not"""
+    inside = False
+    j = len(polygon) - 1
+    for i in range(len(polygon)):
+        lat_i, lon_i = polygon[i]
+        lat_j, lon_j = polygon[j]
+        if (lat_i > lat) != (lat_j > lat):
+            crossing = lon_i + (lat - lat_i) * (lon_j - lon_i) / (lat_j - lat_i)
+            if lon < crossing:
+                inside = not inside
+        j = i
+    return inside
+
+
+def distance_to_segment_km(lat: float, lon: float, start: Point, end: Point) -> float:
+    """Distance from a point to a track segment, on a local flat projection"""
+    scale = math.cos(math.radians(lat)) * KM_PER_DEGREE
+    ax, ay = (start[1] - lon) * scale, (start[0] - lat) * KM_PER_DEGREE
+    bx, by = (end[1] - lon) * scale, (end[0] - lat) * KM_PER_DEGREE
+    dx, dy = bx - ax, by - ay
+    length_sq = dx * dx + dy * dy
+    t = 0.0 if length_sq == 0 else max(0.0, min(1.0, -(ax * dx + ay * dy) / length_sq))
+    return math.hypot(ax + t * dx, ay + t * dy)
+
+
+class GeoGridIndex:
+    """
+    Uniform lat/lon grid over point locations (a fixed-precision geohash).
+
+    Queries only visit the cells overlapping the query's bounding box and test
+    the points inside them exactly, so cost follows the affected population
+    rather than the total number of points.
+    """
+
+    def __init__(self, cell_km: float = 5.0):
+        self.cell_deg = cell_km / KM_PER_DEGREE
+        self._cells: Dict[Tuple[int, int], Dict[str, Point]] = {}
+        self._points: Dict[str, Point] = {}
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._points)
+
+    def __contains__(self, item_id: str) -> bool:
+        with self._lock:
+            return item_id in self._points
+
+    def _cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        return math.floor(lat / self.cell_deg), math.floor(lon / self.cell_deg)
+
+    def build(self, points: Iterable[Tuple[str, float, float]]) -> None:
+        """Replace the contents with (item_id, lat, lon) points"""
+        cells: Dict[Tuple[int, int], Dict[str, Point]] = {}
+        all_points: Dict[str, Point] = {}
+        for item_id, lat, lon in points:
+            all_points[item_id] = (lat, lon)
+            cells.setdefault(self._cell(lat, lon), {})[item_id] = (lat, lon)
+        with self._lock:
+            self._cells = cells
+            self._points = all_points
+
+    def insert(self, item_id: str, lat: float, lon: float) -> None:
+        with self._lock:
+            self.remove(item_id)
+            self._points[item_id] = (lat, lon)
+            self._cells.setdefault(self._cell(lat, lon), {})[item_id] = (lat, lon)
+
+    def remove(self, item_id: str) -> None:
+        with self._lock:
+            point = self._points.pop(item_id, None)
+            if point is None:
+                return
+            cell = self._cell(*point)
+            members = self._cells.get(cell, {})
+            members.pop(item_id, None)
+            if not members:
+                self._cells.pop(cell, None)
+
+    def _in_box(self, min_lat: float, min_lon: float, max_lat: float, max_lon: float) -> List[Tuple[str, Point]]:
+        min_row, min_col = self._cell(min_lat, min_lon)
+        max_row, max_col = self._cell(max_lat, max_lon)
+        with self._lock:
+            # A sparse index can hold fewer cells than a large box covers
+            if (max_row - min_row + 1) * (max_col - min_col + 1) > len(self._cells):
+                cells = [
+                    members for (row, col), members in self._cells.items()
+                    if min_row <= row <= max_row and min_col <= col <= max_col
+                ]
+            else:
+                cells = [
+                    self._cells[(row, col)]
+                    for row in range(min_row, max_row + 1)
+                    for col in range(min_col, max_col + 1)
+                    if (row, col) in self._cells
+                ]
+            return [item for members in cells for item in members.items()]
+
+    def within_radius(self, lat: float, lon: float, radius_km: float) -> Set[str]:
+        """Items within radius_km of (lat, lon)"""
+        candidates = self._in_box(*radius_box(lat, lon, radius_km))
+        return {
+            item_id for item_id, (p_lat, p_lon) in candidates
+            if haversine_km(lat, lon, p_lat, p_lon) <= radius_km
+        }
+
+    def within_polygon(self, polygon: Sequence[Point]) -> Set[str]:
+        """Items inside a (lat, lon) polygon ring"""
+        if len(polygon) < 3:
+            return set()
+        lats = [vertex[0] for vertex in polygon]
+        lons = [vertex[1] for vertex in polygon]
+        candidates = self._in_box(min(lats), min(lons), max(lats), max(lons))
+        return {
+            item_id for item_id, (p_lat, p_lon) in candidates
+            if point_in_polygon(p_lat, p_lon, polygon)
+        }
+
+    def near_track(self, track: Sequence[Point], radius_km: float) -> Set[str]:
+        """Items within radius_km of a storm track given as a (lat, lon) polyline"""
+        if len(track) == 1:
+            return self.within_radius(track[0][0], track[0][1], radius_km)
+
+        matches: Set[str] = set()
+        for start, end in zip(track, track[1:]):
+            start_box = radius_box(start[0], start[1], radius_km)
+            end_box = radius_box(end[0], end[1], radius_km)
+            candidates = self._in_box(
+                min(start_box[0], end_box[0]), min(start_box[1], end_box[1]),
+                max(start_box[2], end_box[2]), max(start_box[3], end_box[3])
+            )
+            matches.update(
+                item_id for item_id, (p_lat, p_lon) in candidates
+                if item_id not in matches and distance_to_segment_km(p_lat, p_lon, start, end) <= radius_km
+            )
+        return matches
+
+    def query(self, polygon: Optional[Sequence[Point]] = None, center: Optional[Point] = None,
+              radius_km: Optional[float] = None, track: Optional[Sequence[Point]] = None) -> Set[str]:
+        """
+        Union of every area given
+
+        Args:
+            polygon: Inundation polygon as (lat, lon) vertices
+            center: Centre point for a radius query
+            radius_km: Radius around center, and buffer around track
+            track: Storm track as (lat, lon) points
+
+        Returns:
+            Set of matching item ids
+        """
+        matches: Set[str] = set()
+        if polygon:
+            matches |= self.within_polygon(polygon)
+        if center is not None and radius_km:
+            matches |= self.within_radius(center[0], center[1], radius_km)
+        if track and radius_km:
+            matches |= self.near_track(track, radius_km)
+        return matches
@@ -2,18 +2,39 @@
 import logging
 import os
 import smtplib
+import threading
+import time
+import itertools
 import requests
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import Callable, Iterable, Iterator, List, Dict, Optional, Set, Union
 from supabase import create_client, Client
 from app.core.config import settings
 from app.core.ssl_utils import configure_ssl, create_supabase_client_options
-from app.core.utils import clean_profile_data, serialize_datetime
+from app.core.phone import to_e164
+from app.core.utils import clean_profile_data, serialize_datetime, table_has_columns
+from app.services.rate_limiter import rate_limiter, SMTP_THROTTLE_CODES
+from app.services.delivery_scheduler import PriorityDeliveryScheduler, assign_priority
+from app.services.channel_router import channel_router
+from app.services.delivery_log import DeliveryLog
+from app.services.delivery_receipts import receipt_buffer, response_message_id
+from app.services.recipient_index import recipient_index, RecipientIndex
+from app.services.geo_index import area_bounds, parse_point
 
 logger = logging.getLogger(__name__)
 
+# Only the profile columns the notifier actually uses
+NOTIFIER_COLUMNS = "id, email, full_name, phone, location, device_token"
+
+# Profile columns added by the optional setup scripts, selected only once detected
+GEO_COLUMNS = "latitude, longitude"  # supabase_geo_setup.sql
+OPTIONAL_NOTIFIER_COLUMNS = (
+    "phone_e164",  # supabase_phone_e164_setup.sql
+    GEO_COLUMNS,
+)
+
 class NotificationService:
     def __init__(self):
         """Initialize notification service with configuration"""
@@ -68,28 +89,75 @@ class NotificationService:
         self.push_api_key = settings.PUSH_API_KEY
         self.push_api_url = settings.PUSH_API_URL
         
+        # Normalized per-recipient delivery log, written in background batches
+        self.delivery_log = DeliveryLog(self.supabase)
+        
+        # Provider delivery receipts from the webhooks are flushed through the same log
+        receipt_buffer.set_writer(self.delivery_log.write_receipts)
+        
+        # Cached user -> evacuation zone assignments used for delivery priority
+        self._zone_map: Dict[str, List[Dict]] = {}
+        self._zone_map_loaded_at = 0.0
+        self._zone_map_lock = threading.Lock()
+        
+        # The recipient index rebuilds itself from this service's profile and zone queries
+        recipient_index.set_loader(self._load_recipient_index)
+        
         logger.info(f"Notification service initialized - Email: {'Configured' if self.smtp_username else 'Not configured'}, SMS: {'Configured' if self.sms_api_key else 'Not configured'}, Push: {'Configured' if self.push_api_key else 'Not configured'}")
 
+    def notifier_columns(self) -> str:
+        """NOTIFIER_COLUMNS plus whichever optional columns this database has"""
+        optional = [columns for columns in OPTIONAL_NOTIFIER_COLUMNS
+                    if table_has_columns(self.supabase, 'profiles', columns)]
+        return ", ".join([NOTIFIER_COLUMNS, *optional])
+
+    def iter_users(self, columns: Optional[str] = None, page_size: Optional[int] = None,
+                   where: Optional[Callable] = None) -> Iterator[Dict]:
+        """
+        Stream profiles page by page using keyset pagination on id
+        
+        Args:
+            columns: Columns to select (defaults to notifier_columns())
+            page_size: Rows per round trip
+            where: Narrows each page query, e.g. lambda query: query.is_('latitude', 'null')
+            
+        Yields:
+            Raw profile rows, in id order
+        """
+        if not self.supabase:
+            logger.error("Supabase client not initialized")
+            return
+        
+        columns = columns or self.notifier_columns()
+        page_size = page_size or settings.RECIPIENT_PAGE_SIZE
+        last_id = None
+        while True:
+            query = self.supabase.table('profiles').select(columns).order('id').limit(page_size)
+            if last_id is not None:
+                query = query.gt('id', last_id)
+            if where is not None:
+                query = where(query)
+            rows = query.execute().data or []
+            
+            yield from rows
+            
+            if len(rows) < page_size:
+                return
+            last_id = rows[-1]['id']
+
     def get_all_users(self) -> List[Dict]:
         """
         Get all registered users from the database
         """
         try:
-            if not self.supabase:
-                logger.error("Supabase client not initialized")
-                return []
+            # Clean profile data to avoid datetime serialization issues
+            cleaned_users = [clean_profile_data(user) for user in self.iter_users(columns='*')]
             
-            # Fetch users from profiles table
-            response = self.supabase.table('profiles').select('*').execute()
-            
-            if response.data:
-                logger.info(f"Retrieved {len(response.data)} users")
-                # Clean profile data to avoid datetime serialization issues
-                cleaned_users = [clean_profile_data(user) for user in response.data]
-                return cleaned_users
+            if cleaned_users:
+                logger.info(f"Retrieved {len(cleaned_users)} users")
             else:
                 logger.warning("No users found in database")
-                return []
+            return cleaned_users
                 
         except Exception as e:
             logger.error(f"Error fetching users: {e}")
@@ -100,6 +168,13 @@ class NotificationService:
         Get users by specific location/zone
         """
         try:
+            # Serve from the in-memory index when it is built
+            recipient_index.ensure_fresh()
+            if recipient_index.ready:
+                users = recipient_index.lookup(zone=location)
+                logger.info(f"Retrieved {len(users)} users from location: {location} (index)")
+                return users
+            
             if not self.supabase:
                 return []
             
@@ -119,67 +194,314 @@ class NotificationService:
             logger.error(f"Error fetching users by location: {e}")
             return []
 
-    def send_evacuation_alert(self, threat_data: Dict, target_users: Optional[List[Dict]] = None) -> Dict:
+    def get_users_in_area(self, polygon: Optional[List] = None, center: Optional[tuple] = None,
+                          radius_km: Optional[float] = None, track: Optional[List] = None,
+                          include_unlocated: Optional[bool] = None) -> List[Dict]:
+        """
+        Get users inside a predicted inundation polygon, a radius, or a storm track buffer
+        
+        Users with no coordinates and no located zone can't be placed; they are
+        included (flagged "unlocated") unless include_unlocated is False, which
+        defaults to AREA_ALERT_INCLUDE_UNLOCATED. Either way their count is logged.
+        """
+        if include_unlocated is None:
+            include_unlocated = settings.AREA_ALERT_INCLUDE_UNLOCATED
+        try:
+            recipient_index.ensure_fresh()
+            if recipient_index.ready or recipient_index.wait_ready(settings.RECIPIENT_INDEX_WAIT_SECONDS):
+                source = "index"
+                users = recipient_index.lookup_area(polygon, center, radius_km, track, include_unlocated=True)
+            else:
+                source = "bounding box query"
+                users = self._query_area(polygon, center, radius_km, track, include_unlocated)
+            
+            unlocated = sum(1 for user in users if user.get('unlocated'))
+            if unlocated and include_unlocated:
+                logger.warning(f"{unlocated} users have no location data; alerting them with the area")
+            elif unlocated:
+                logger.warning(f"{unlocated} users have no location data and are left out of the area")
+                users = [user for user in users if not user.get('unlocated')]
+            logger.info(f"Retrieved {len(users)} users in affected area ({source})")
+            return users
+            
+        except Exception as e:
+            logger.error(f"Error fetching users in area: {e}")
+            return []
+
+    def _query_area(self, polygon: Optional[List] = None, center: Optional[tuple] = None,
+                    radius_km: Optional[float] = None, track: Optional[List] = None,
+                    include_unlocated: bool = True) -> List[Dict]:
+        """
+        Area lookup while the shared index is still building: only profiles inside
+        the area's bounding box, plus users of zones inside it, are read, then
+        matched with the index's rules. Users that can't be placed are read too
+        (profiles without coordinates) when include_unlocated is set.
+        """
+        bounds = area_bounds(polygon, center, radius_km, track)
+        if bounds is None or not self.supabase:
+            return []
+        min_lat, min_lon, max_lat, max_lon = bounds
+        columns = self.notifier_columns()
+        has_geo = table_has_columns(self.supabase, 'profiles', GEO_COLUMNS)
+        
+        profiles = []
+        if has_geo:
+            profiles = self.supabase.table('profiles').select(columns) \
+                .gte('latitude', min_lat).lte('latitude', max_lat) \
+                .gte('longitude', min_lon).lte('longitude', max_lon).execute().data or []
+        
+        zone_pairs, zone_points = self._zone_assignments()
+        in_box = {
+            name for name, (lat, lon) in zone_points.items()
+            if min_lat <= lat <= max_lat and min_lon <= lon <= max_lon
+        }
+        missing = sorted({user_id for user_id, name in zone_pairs if name in in_box} - {p['id'] for p in profiles})
+        page_size = settings.RECIPIENT_PAGE_SIZE
+        for start in range(0, len(missing), page_size):
+            profiles.extend(self.supabase.table('profiles').select(columns)
+                            .in_('id', missing[start:start + page_size]).execute().data or [])
+        
+        if include_unlocated:
+            # Without the geo columns nobody has coordinates of their own
+            read = {profile['id'] for profile in profiles}
+            where = (lambda query: query.is_('latitude', 'null')) if has_geo else None
+            profiles.extend(profile for profile in self.iter_users(columns, where=where) if profile['id'] not in read)
+        
+        scan = RecipientIndex()
+        scan.build(profiles, zone_pairs, zone_points)
+        return scan.lookup_area(polygon, center, radius_km, track, include_unlocated=include_unlocated)
+
+    def _zone_assignments(self):
+        """(user_id, zone_name) pairs and zone name -> (lat, lon) from the cached zone map"""
+        zone_pairs = []
+        zone_points = {}
+        for user_id, zones in self.get_user_zone_map().items():
+            for zone in zones:
+                if not zone.get('zone_name'):
+                    continue
+                zone_pairs.append((user_id, zone['zone_name']))
+                point = parse_point(zone.get('coordinates'))
+                if point:
+                    zone_points[zone['zone_name']] = point
+        return zone_pairs, zone_points
+
+    def _load_recipient_index(self):
+        """
+        Source data for the recipient index: streamed profiles, (user_id, zone_name)
+        pairs and zone locations
+        """
+        zone_pairs, zone_points = self._zone_assignments()
+        return self.iter_users(), zone_pairs, zone_points
+
+    def _get_affected_area(self, threat_data: Dict) -> Optional[Dict]:
+        """
+        Area geometry carried by the threat data, if any
+        
+        Recognises an explicit "affected_area" ({polygon, center, radius_km, track}),
+        storm_surge.inundation_polygon and a top-level storm_track. Points may be
+        [lat, lon] pairs or {"lat", "lon"} dictionaries.
+        """
+        def points(raw) -> List[tuple]:
+            return [point for point in (parse_point(vertex) for vertex in raw or []) if point]
+        
+        area = dict(threat_data.get('affected_area') or {})
+        surge = threat_data.get('storm_surge') or {}
+        polygon = points(area.get('polygon') or surge.get('inundation_polygon'))
+        track = points(area.get('track') or threat_data.get('storm_track'))
+        center = parse_point(area.get('center'))
+        radius_km = area.get('radius_km')
+        
+        if track and not radius_km:
+            radius_km = settings.STORM_TRACK_BUFFER_KM
+        if not (polygon or track or (center and radius_km)):
+            return None
+        return {"polygon": polygon or None, "center": center, "radius_km": radius_km, "track": track or None}
+
+    def _get_station_area(self, threat_data: Dict) -> Optional[Dict]:
+        """
+        STATION_ALERT_RADIUS_KM around the station a threat is about: its
+        observation's coordinates, its storm surge location's, or those of its
+        station_id / zone in MONITORING_STATIONS (the all-clear carries only the zone)
+        """
+        center = parse_point(threat_data.get('weather_data')) or parse_point(threat_data.get('storm_surge'))
+        if center is None:
+            from app.services.batch_detection import parse_stations
+            stations = {station.station_id: station for station in parse_stations(settings.MONITORING_STATIONS)}
+            station = stations.get(threat_data.get('station_id') or threat_data.get('zone'))
+            if station is not None:
+                center = (station.latitude, station.longitude)
+            elif threat_data.get('zone'):
+                # Zones keyed by rounded coordinates ("lat,lon")
+                center = parse_point(str(threat_data['zone']).split(','))
+        if center is None:
+            return None
+        return {"polygon": None, "center": center, "radius_km": settings.STATION_ALERT_RADIUS_KM, "track": None}
+
+    def get_user_zone_map(self) -> Dict[str, List[Dict]]:
+        """
+        Get evacuation zone assignments keyed by user id, cached for a short TTL
+        """
+        with self._zone_map_lock:
+            if time.monotonic() - self._zone_map_loaded_at < settings.ZONE_CACHE_TTL_SECONDS:
+                return self._zone_map
+            
+            try:
+                if not self.supabase:
+                    return self._zone_map
+                
+                response = self.supabase.table('user_zones').select(
+                    'user_id, evacuation_zones(zone_name, threat_level, coordinates)'
+                ).execute()
+                
+                zone_map: Dict[str, List[Dict]] = {}
+                for row in response.data or []:
+                    zone = row.get('evacuation_zones')
+                    if zone:
+                        zone_map.setdefault(row['user_id'], []).append(zone)
+                
+                self._zone_map = zone_map
+                logger.info(f"Loaded evacuation zone assignments for {len(zone_map)} users")
+                
+            except Exception as e:
+                logger.error(f"Error fetching user zone assignments: {e}")
+            
+            # Back off for a full TTL even on failure so an outage doesn't add a query per alert
+            self._zone_map_loaded_at = time.monotonic()
+            return self._zone_map
+
+    def _get_surge_point(self, threat_data: Dict) -> Optional[tuple]:
+        """
+        Location of the predicted surge as (lat, lon), if the threat data carries one
+        """
+        for source in (threat_data.get('storm_surge', {}), threat_data.get('weather_data', {})):
+            if source.get('lat') is not None and source.get('lon') is not None:
+                return float(source['lat']), float(source['lon'])
+        if threat_data.get('storm_surge') and 'error' not in threat_data['storm_surge']:
+            return float(settings.DEFAULT_LATITUDE), float(settings.DEFAULT_LONGITUDE)
+        return None
+
+    def send_evacuation_alert(self, threat_data: Dict, target_users: Optional[Iterable[Dict]] = None,
+                              message: Optional[Dict] = None, threat_type: str = "evacuation",
+                              delivered_user_ids: Optional[Set[str]] = None) -> Dict:
         """
         Send evacuation alert to users
+        
+        message and threat_type override the evacuation wording and the event
+        type recorded in the delivery log (used for the all-clear).
+        
+        delivered_user_ids, when given, is updated with every user the alert
+        reaches; users already in it are skipped, so a retry only goes to the
+        users an earlier attempt missed.
+        
+        Without target_users the alert goes to the threat's area, else to users
+        within STATION_ALERT_RADIUS_KM of its station; only a threat with
+        neither streams every profile from the database (page by page, so
+        memory does not grow with user count).
         """
         try:
-            # Get users if not provided
+            # Target the predicted area, else the station's surroundings, else everyone
+            targeting = "provided"
             if target_users is None:
-                target_users = self.get_all_users()
+                area = self._get_affected_area(threat_data)
+                station_area = None if area else self._get_station_area(threat_data)
+                if area or station_area:
+                    targeting = "area" if area else "station"
+                    target_users = self.get_users_in_area(**(area or station_area))
+                else:
+                    logger.warning("Threat has no area or station; alerting every user")
+                    targeting = "all"
+                    target_users = self.iter_users()
             
-            if not target_users:
+            target_users = iter(target_users)
+            if delivered_user_ids:
+                target_users = (user for user in target_users if str(user.get('id')) not in delivered_user_ids)
+            first_user = next(target_users, None)
+            if first_user is None and delivered_user_ids:
+                return {"success": True, "message": "Every user was already alerted", "sent_count": 0}
+            if first_user is None:
                 logger.warning("No users to send evacuation alert to")
                 return {"success": False, "message": "No users found", "sent_count": 0}
+            target_users = itertools.chain([first_user], target_users)
             
             # Prepare evacuation message
-            evacuation_message = self._prepare_evacuation_message(threat_data)
+            evacuation_message = message or self._prepare_evacuation_message(threat_data)
+            
+            # Fastest channel first with failover; every channel only for the highest threats
+            redundant = channel_router.is_redundant(threat_data)
+            
+            # Open the event row up front; deliveries are logged as they happen
+            event = self.delivery_log.start_event(threat_type, threat_data.get('overall_threat'), threat_data)
             
             # Track notification results
             results = {
-                "total_users": len(target_users),
+                "notification_id": event.event_id,
+                "total_users": 0,
                 "email_sent": 0,
                 "sms_sent": 0,
                 "push_sent": 0,
                 "failed": 0,
-                "errors": []
+                "unreachable": 0,
+                "undelivered": 0,
+                "redundant_channels": redundant,
+                "targeting": targeting
             }
             
-            # Send notifications to each user
-            for user in target_users:
-                try:
-                    # Send email notification
-                    if user.get('email'):
-                        if self._send_email_notification(user['email'], evacuation_message):
-                            results["email_sent"] += 1
-                        else:
-                            results["failed"] += 1
-                    
-                    # Send SMS notification (if phone number available)
-                    if user.get('phone'):
-                        if self._send_sms_notification(user['phone'], evacuation_message['sms_text']):
-                            results["sms_sent"] += 1
-                        else:
-                            results["failed"] += 1
-                    
-                    # Send push notification (if device token available)
-                    if user.get('device_token'):
-                        if self._send_push_notification(user['device_token'], evacuation_message):
-                            results["push_sent"] += 1
-                        else:
-                            results["failed"] += 1
-                            
-                except Exception as e:
-                    results["failed"] += 1
-                    results["errors"].append(f"User {user.get('id', 'unknown')}: {str(e)}")
-                    logger.error(f"Error sending notification to user {user.get('id')}: {e}")
+            # Deliver highest-risk zones first; lower lanes get the leftover worker capacity
+            zone_map = self.get_user_zone_map()
+            surge_point = self._get_surge_point(threat_data)
+            prioritized_users = (
+                (*assign_priority(zone_map.get(user.get('id'), []), surge_point, settings.PRIORITY_SURGE_RADIUS_KM), user)
+                for user in target_users
+            )
+            
+            def notify(user: Dict) -> Dict:
+                user_result = self._notify_user(user, evacuation_message, redundant, event)
+                delivered = any(user_result[key] for key in ("email_sent", "sms_sent", "push_sent"))
+                if delivered and delivered_user_ids is not None:
+                    delivered_user_ids.add(str(user.get('id')))
+                # Users whose channels all failed are worth retrying; users with no channel are not
+                user_result["undelivered"] = int(not delivered and user_result["failed"] > 0)
+                return user_result
+            
+            def add_user_result(user_result: Dict) -> None:
+                for key in ("email_sent", "sms_sent", "push_sent", "failed", "unreachable", "undelivered"):
+                    results[key] += user_result[key]
+            
+            scheduler = PriorityDeliveryScheduler(settings.NOTIFICATION_MAX_WORKERS, settings.DELIVERY_QUEUE_SIZE)
+            try:
+                scheduler.run(
+                    prioritized_users,
+                    notify,
+                    on_result=add_user_result
+                )
+                error = scheduler.source_error
+            except Exception as e:
+                error = e
+            results["total_users"] = scheduler.submitted
+            results["lanes"] = scheduler.lane_stats
+            results["errors_by_code"] = dict(event.errors_by_code)
+            results["errors"] = event.error_samples
+            results["partial"] = error is not None
+            if error is not None:
+                results["error"] = str(error)
             
             # Log results
             total_sent = results["email_sent"] + results["sms_sent"] + results["push_sent"]
             logger.info(f"Evacuation alert sent: {total_sent} notifications, {results['failed']} failed")
             
-            # Store notification record in database
-            self._store_notification_record(threat_data, results)
+            # Write aggregate counts to the event row (in the background), partial sends included
+            self.delivery_log.finish_event(event, results)
+            
+            if error is not None:
+                # Not a success, so the alert is retried, but what went out is reported
+                logger.error(f"Evacuation alert stopped after {results['total_users']} users: {error}")
+                return {
+                    "success": False,
+                    "partial": True,
+                    "message": f"Evacuation alert only partially sent ({total_sent} notifications): {error}",
+                    "sent_count": total_sent,
+                    "results": results
+                }
             
             return {
                 "success": True,
@@ -191,6 +513,64 @@ class NotificationService:
             logger.error(f"Error sending evacuation alert: {e}")
             return {"success": False, "message": str(e), "sent_count": 0}
 
+    def send_all_clear(self, threat_data: Dict) -> Dict:
+        """
+        Tell users in a previously alerted area that the threat has passed
+        """
+        return self.send_evacuation_alert(
+            threat_data, message=self._prepare_all_clear_message(threat_data), threat_type="all_clear"
+        )
+
+    def _notify_user(self, user: Dict, evacuation_message: Dict, redundant: bool = False, event=None) -> Dict:
+        """
+        Deliver to a single user on their best channel, failing over to the others
+        """
+        result = {"email_sent": 0, "sms_sent": 0, "push_sent": 0, "failed": 0, "unreachable": 0}
+        user_id = str(user.get('id', 'unknown'))
+        try:
+            senders = {}
+            if user.get('email'):
+                senders["email"] = lambda: self._send_email_notification(user['email'], evacuation_message)
+            phone = user.get('phone_e164') or to_e164(user.get('phone'))
+            if phone:
+                senders["sms"] = lambda: self._send_sms_notification(phone, evacuation_message['sms_text'])
+            if user.get('device_token'):
+                senders["push"] = lambda: self._send_push_notification(user['device_token'], evacuation_message)
+            
+            if not senders:
+                return result
+            
+            on_late_success = None
+            if event is not None:
+                # A send that outlived its timeout is logged when it lands
+                def on_late_success(attempt: Dict) -> None:
+                    self.delivery_log.record_late(event, user_id, attempt["channel"], attempt["latency"],
+                                                  attempt["provider_message_id"])
+            
+            outcome = channel_router.deliver(user_id, senders, redundant, on_late_success)
+            for attempt in outcome["attempts"]:
+                if attempt["success"]:
+                    result[f"{attempt['channel']}_sent"] += 1
+                else:
+                    result["failed"] += 1
+                if event is not None:
+                    self.delivery_log.record(
+                        event, user_id, attempt["channel"], attempt["success"],
+                        error=attempt["error"], latency=attempt["latency"],
+                        provider_message_id=attempt["provider_message_id"]
+                    )
+            
+            if outcome["delivered_via"] is None:
+                result["unreachable"] = 1
+                    
+        except Exception as e:
+            result["failed"] += 1
+            if event is not None:
+                self.delivery_log.record(event, user_id, "all", False, error=str(e))
+            logger.error(f"Error sending notification to user {user.get('id')}: {e}")
+        
+        return result
+
     def _prepare_evacuation_message(self, threat_data: Dict) -> Dict:
         """
         Prepare evacuation message for different channels
@@ -269,6 +649,60 @@ CTAS Alert System"""
             "push_body": push_body
         }
 
+    def _prepare_all_clear_message(self, threat_data: Dict) -> Dict:
+        """
+        Prepare the all-clear message for different channels
+        """
+        area = threat_data.get('zone', 'your area')
+        
+        email_subject = f"✅ All Clear: Coastal Threat Has Passed - {area}"
+        
+        email_body = f"""
+        <html>
+        <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
+            <div style="max-width: 600px; margin: 0 auto; padding: 20px; border: 2px solid #28a745; border-radius: 10px;">
+                <h1 style="color: #28a745; text-align: center;">✅ ALL CLEAR</h1>
+                
+                <div style="background-color: #d4edda; padding: 15px; border-radius: 5px; margin: 20px 0;">
+                    <h2 style="color: #155724; margin-top: 0;">The coastal threat for {area} has passed</h2>
+                    <p style="margin-bottom: 0;"><strong>Time:</strong> {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</p>
+                </div>
+                
+                <div style="background-color: #e7f3ff; padding: 15px; border-radius: 5px; margin: 20px 0;">
+                    <ul style="color: #0c5460;">
+                        <li>Return only when local authorities confirm it is safe</li>
+                        <li>Watch for flooded roads and damaged structures</li>
+                        <li>Keep following official updates</li>
+                    </ul>
+                </div>
+                
+                <p style="text-align: center; color: #666; font-size: 12px;">
+                    This is an automated alert from the Coastal Threat Alert System (CTAS).
+                    Please follow official instructions from emergency services.
+                </p>
+            </div>
+        </body>
+        </html>
+        """
+        
+        sms_text = f"""✅ ALL CLEAR
+The coastal threat for {area} has passed.
+Time: {datetime.now().strftime('%H:%M')}
+
+Return only when authorities confirm it is safe.
+CTAS Alert System"""
+
+        push_title = "✅ All Clear"
+        push_body = f"The coastal threat for {area} has passed. Follow official guidance before returning."
+        
+        return {
+            "email_subject": email_subject,
+            "email_body": email_body,
+            "sms_text": sms_text,
+            "push_title": push_title,
+            "push_body": push_body
+        }
+
     def _send_email_notification(self, email: str, message_data: Dict) -> bool:
         """
         Send email notification
@@ -289,21 +723,32 @@ CTAS Alert System"""
             msg.attach(html_part)
             
             # Send email
-            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
+            rate_limiter.acquire("smtp", sender=self.smtp_username)
+            with smtplib.SMTP(self.smtp_server, self.smtp_port, timeout=settings.CHANNEL_TIMEOUT_SECONDS) as server:
                 server.starttls()
                 server.login(self.smtp_username, self.smtp_password)
                 server.send_message(msg)
             
+            rate_limiter.get("smtp").record_success()
             logger.info(f"Email notification sent to {email}")
             return True
             
+        except smtplib.SMTPResponseException as e:
+            if e.smtp_code in SMTP_THROTTLE_CODES:
+                rate_limiter.get("smtp").record_throttle()
+            logger.error(f"Error sending email to {email}: {e}")
+            return False
         except Exception as e:
             logger.error(f"Error sending email to {email}: {e}")
             return False
 
-    def _send_sms_notification(self, phone: str, message: str) -> bool:
+    def _send_sms_notification(self, phone: str, message: str) -> Union[bool, str]:
         """
         Send SMS notification
+        
+        Returns:
+            The provider message id if the API returns one, True on other
+            successes, False on failure
         """
         try:
             if not all([self.sms_api_key, self.sms_api_url]):
@@ -318,11 +763,13 @@ CTAS Alert System"""
                 "message": message
             }
             
+            rate_limiter.acquire("sms")
             response = requests.post(self.sms_api_url, json=payload, timeout=10)
+            rate_limiter.record_response("sms", response.status_code, response.headers.get("Retry-After"))
             
             if response.status_code == 200:
                 logger.info(f"SMS notification sent to {phone}")
-                return True
+                return response_message_id(response) or True
             else:
                 logger.error(f"SMS API error: {response.status_code} - {response.text}")
                 return False
@@ -331,9 +778,13 @@ CTAS Alert System"""
             logger.error(f"Error sending SMS to {phone}: {e}")
             return False
 
-    def _send_push_notification(self, device_token: str, message_data: Dict) -> bool:
+    def _send_push_notification(self, device_token: str, message_data: Dict) -> Union[bool, str]:
         """
         Send push notification
+        
+        Returns:
+            The provider message id if the API returns one, True on other
+            successes, False on failure
         """
         try:
             if not all([self.push_api_key, self.push_api_url]):
@@ -350,11 +801,13 @@ CTAS Alert System"""
                 "priority": "high"
             }
             
+            rate_limiter.acquire("push")
             response = requests.post(self.push_api_url, json=payload, timeout=10)
+            rate_limiter.record_response("push", response.status_code, response.headers.get("Retry-After"))
             
             if response.status_code == 200:
                 logger.info(f"Push notification sent to device {device_token[:10]}...")
-                return True
+                return response_message_id(response) or True
             else:
                 logger.error(f"Push API error: {response.status_code} - {response.text}")
                 return False
@@ -363,38 +816,5 @@ CTAS Alert System"""
             logger.error(f"Error sending push notification: {e}")
             return False
 
-    def _store_notification_record(self, threat_data: Dict, results: Dict) -> None:
-        """
-        Store notification record in database
-        """
-        try:
-            if not self.supabase:
-                logger.warning("Supabase not available, skipping notification record storage")
-                return
-            
-            notification_record = {
-                "timestamp": datetime.now().isoformat(),
-                "threat_level": threat_data.get('overall_threat'),
-                "threat_type": "evacuation",
-                "total_users": results["total_users"],
-                "email_sent": results["email_sent"],
-                "sms_sent": results["sms_sent"],
-                "push_sent": results["push_sent"],
-                "failed": results["failed"],
-                "threat_data": threat_data,
-                "results": results
-            }
-            
-            # Store in notifications table
-            response = self.supabase.table('notifications').insert(notification_record).execute()
-            
-            if response.data:
-                logger.info("Notification record stored in database")
-            else:
-                logger.warning("Failed to store notification record")
-                
-        except Exception as e:
-            logger.error(f"Error storing notification record: {e}")
-
 # Create a global instance
 notification_service = NotificationService()
@@ -0,0 +1,262 @@
+# backend/app/services/rate_limiter.py
+import logging
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# HTTP status codes that mean "slow down" rather than "this message failed"
+THROTTLE_STATUS_CODES = {429, 503}
+
+# SMTP reply codes used by relays to signal temporary rate limiting
+SMTP_THROTTLE_CODES = {421, 450, 451, 452}
+
+# Per-thread callback run when a send on that thread gets its token (the channel router starts its timeout there)
+_acquire_hook = threading.local()
+
+
+def set_acquire_hook(callback: Optional[Callable[[], None]]) -> None:
+    """Register (or clear, with None) the calling thread's token-acquired callback"""
+    _acquire_hook.callback = callback
+
+
+def _notify_acquired() -> None:
+    callback = getattr(_acquire_hook, "callback", None)
+    if callback is not None:
+        callback()
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket.
+
+    Tokens are reserved up front, so concurrent callers queue fairly behind
+    each other instead of racing: each caller is told how long to wait for
+    its own token and no caller waits when tokens are available.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = float(rate)
+        self.capacity = float(capacity) if capacity else max(1.0, self.rate)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self.updated_at
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+            self.updated_at = now
+
+    def reserve(self) -> float:
+        """
+        Take one token and return the number of seconds to wait before using it
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+    def refund(self) -> None:
+        """Give back a reserved token that was not used"""
+        with self._lock:
+            self.tokens = min(self.capacity, self.tokens + 1)
+
+    def set_rate(self, rate: float) -> None:
+        """Change the refill rate, keeping the tokens accrued so far"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = float(rate)
+
+
+class ProviderLimiter:
+    """
+    Rate limiter for one delivery provider (SMTP relay, SMS gateway, push API).
+
+    Holds a provider-wide bucket plus one bucket per sender identity (e.g. a
+    Twilio phone number), and adapts the provider rate on throttling replies:
+    multiplicative decrease on 429, additive recovery on success.
+    """
+
+    RATE_WINDOW_SECONDS = 10.0
+    MIN_RATE_FRACTION = 0.05
+    RECOVERY_FRACTION = 0.05
+    MAX_BACKOFF_SECONDS = 60.0
+
+    def __init__(self, name: str, rate: float, burst: Optional[float] = None,
+                 per_sender_rate: Optional[float] = None):
+        self.name = name
+        self.base_rate = float(rate)
+        self.per_sender_rate = per_sender_rate
+        self.bucket = TokenBucket(rate, burst)
+        self.sender_buckets: Dict[str, TokenBucket] = {}
+        self.paused_until = 0.0
+        self.consecutive_throttles = 0
+        self.waiting = 0
+        self.sent = 0
+        self.throttled = 0
+        self._recent = deque()
+        self._lock = threading.Lock()
+
+    def _sender_bucket(self, sender: Optional[str]) -> Optional[TokenBucket]:
+        if not sender or not self.per_sender_rate:
+            return None
+        with self._lock:
+            bucket = self.sender_buckets.get(sender)
+            if bucket is None:
+                bucket = TokenBucket(self.per_sender_rate)
+                self.sender_buckets[sender] = bucket
+            return bucket
+
+    def acquire(self, sender: Optional[str] = None, timeout: Optional[float] = None) -> bool:
+        """
+        Block until a send is allowed for this provider/sender.
+        Returns False if the wait would exceed the timeout.
+        """
+        delay = self.bucket.reserve()
+        sender_bucket = self._sender_bucket(sender)
+        if sender_bucket is not None:
+            delay = max(delay, sender_bucket.reserve())
+
+        now = time.monotonic()
+        delay = max(delay, self.paused_until - now)
+
+        if timeout is not None and delay > timeout:
+            self.bucket.refund()
+            if sender_bucket is not None:
+                sender_bucket.refund()
+            return False
+
+        if delay > 0:
+            with self._lock:
+                self.waiting += 1
+            try:
+                time.sleep(delay)
+            finally:
+                with self._lock:
+                    self.waiting -= 1
+
+        with self._lock:
+            self.sent += 1
+            self._recent.append(time.monotonic())
+        _notify_acquired()
+        return True
+
+    def record_success(self) -> None:
+        """Slowly recover towards the configured rate after a throttle"""
+        with self._lock:
+            self.consecutive_throttles = 0
+            if self.bucket.rate >= self.base_rate:
+                return
+            new_rate = min(self.base_rate, self.bucket.rate + self.base_rate * self.RECOVERY_FRACTION)
+        self.bucket.set_rate(new_rate)
+
+    def record_throttle(self, retry_after: Optional[float] = None) -> None:
+        """Halve the rate and pause the provider after a throttling reply"""
+        with self._lock:
+            self.throttled += 1
+            self.consecutive_throttles += 1
+            if retry_after is None:
+                retry_after = min(self.MAX_BACKOFF_SECONDS, 2 ** (self.consecutive_throttles - 1))
+            self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
+            new_rate = max(self.base_rate * self.MIN_RATE_FRACTION, self.bucket.rate / 2)
+        self.bucket.set_rate(new_rate)
+        logger.warning(f"Provider {self.name} throttled us, backing off {retry_after:.1f}s at {new_rate:.2f} msg/s")
+
+    def get_stats(self) -> Dict:
+        """Live send rate, configured rate and current queue depth"""
+        with self._lock:
+            now = time.monotonic()
+            while self._recent and now - self._recent[0] > self.RATE_WINDOW_SECONDS:
+                self._recent.popleft()
+            return {
+                "configured_rate": self.base_rate,
+                "current_rate": round(self.bucket.rate, 3),
+                "live_rate": round(len(self._recent) / self.RATE_WINDOW_SECONDS, 3),
+                "queue_depth": self.waiting,
+                "paused_for": round(max(0.0, self.paused_until - now), 3),
+                "sent": self.sent,
+                "throttled": self.throttled,
+                "senders": len(self.sender_buckets)
+            }
+
+
+class RateLimiter:
+    """
+    Registry of per-provider limiters shared by the notification and SMS services
+    """
+
+    def __init__(self):
+        self._providers: Dict[str, ProviderLimiter] = {}
+        self._lock = threading.Lock()
+        self._defaults = {
+            "smtp": (settings.EMAIL_RATE_LIMIT, None),
+            "push": (settings.PUSH_RATE_LIMIT, None),
+            "sms": (settings.SMS_RATE_LIMIT, None),
+            "twilio": (settings.SMS_RATE_LIMIT, settings.SMS_SENDER_RATE_LIMIT),
+            "nexmo": (settings.SMS_RATE_LIMIT, settings.SMS_SENDER_RATE_LIMIT),
+            "aws_sns": (settings.SMS_RATE_LIMIT, None),
+            "custom": (settings.SMS_RATE_LIMIT, None)
+        }
+
+    def configure(self, provider: str, rate: float, burst: Optional[float] = None,
+                  per_sender_rate: Optional[float] = None) -> ProviderLimiter:
+        """Create or replace the limiter for a provider"""
+        limiter = ProviderLimiter(provider, rate, burst, per_sender_rate)
+        with self._lock:
+            self._providers[provider] = limiter
+        return limiter
+
+    def get(self, provider: str) -> ProviderLimiter:
+        with self._lock:
+            limiter = self._providers.get(provider)
+        if limiter is None:
+            rate, per_sender_rate = self._defaults.get(provider, (settings.SMS_RATE_LIMIT, None))
+            with self._lock:
+                limiter = self._providers.setdefault(
+                    provider, ProviderLimiter(provider, rate, per_sender_rate=per_sender_rate)
+                )
+        return limiter
+
+    def acquire(self, provider: str, sender: Optional[str] = None, timeout: Optional[float] = None) -> bool:
+        return self.get(provider).acquire(sender, timeout)
+
+    def record_response(self, provider: str, status_code: int, retry_after: Optional[str] = None) -> None:
+        """
+        Feed a provider HTTP response back into the limiter
+
+        Args:
+            provider: Provider name
+            status_code: HTTP status code returned by the provider
+            retry_after: Value of the Retry-After header, if any
+        """
+        limiter = self.get(provider)
+        if status_code in THROTTLE_STATUS_CODES:
+            limiter.record_throttle(_parse_retry_after(retry_after))
+        elif status_code < 400:
+            limiter.record_success()
+
+    def get_stats(self) -> Dict[str, Dict]:
+        with self._lock:
+            providers = dict(self._providers)
+        return {name: limiter.get_stats() for name, limiter in providers.items()}
+
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+# Create a global instance
+rate_limiter = RateLimiter()
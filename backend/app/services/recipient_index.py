@@ -0,0 +1,295 @@
+# backend/app/services/recipient_index.py
+import logging
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from app.core.config import settings
+from app.core.phone import to_e164
+from app.services.geo_index import GeoGridIndex, Point, parse_point
+
+logger = logging.getLogger(__name__)
+
+CHANNELS = ("email", "sms", "push")
+
+# Key for "every recipient", alongside ("zone", name) and ("location", value) keys
+ALL_KEY = ("all", "")
+
+
+def _normalize_recipient(profile: Dict) -> Dict:
+    """Keep only delivery fields, with addresses already in canonical form"""
+    email = (profile.get('email') or '').strip().lower() or None
+    point = parse_point((profile.get('latitude'), profile.get('longitude')))
+    return {
+        "id": profile.get('id'),
+        "full_name": profile.get('full_name'),
+        "location": profile.get('location'),
+        "email": email,
+        "phone": profile.get('phone_e164') or to_e164(profile.get('phone')),
+        "device_token": profile.get('device_token') or None,
+        "latitude": point[0] if point else None,
+        "longitude": point[1] if point else None
+    }
+
+
+def _channels_of(recipient: Dict) -> List[str]:
+    channels = []
+    if recipient.get('email'):
+        channels.append("email")
+    if recipient.get('phone'):
+        channels.append("sms")
+    if recipient.get('device_token'):
+        channels.append("push")
+    return channels
+
+
+class RecipientIndex:
+    """
+    In-memory targeting index: (zone or location) -> channel -> user ids, with
+    pre-normalized E.164 phones and lowercased emails.
+
+    Built in the background from a loader and kept current through incremental
+    profile/zone updates, so targeting at alert time is a dictionary lookup.
+    User and zone coordinates sit in grid indexes for area targeting.
+    Each worker process holds its own copy and converges on changes made in
+    other processes at the next scheduled rebuild.
+    """
+
+    def __init__(self):
+        self._recipients: Dict[str, Dict] = {}
+        self._zones_by_user: Dict[str, Set[str]] = {}
+        self._by_key: Dict[Tuple[str, str], Dict[str, Set[str]]] = {}
+        self._users_by_zone: Dict[str, Set[str]] = {}
+        self._user_points = GeoGridIndex(settings.GEO_INDEX_CELL_KM)
+        self._zone_points = GeoGridIndex(settings.GEO_INDEX_CELL_KM)
+        self._lock = threading.RLock()
+        self._loader: Optional[Callable[[], Tuple[Iterable[Dict], Iterable[Tuple[str, str]], Dict[str, Point]]]] = None
+        self._building = False
+        self._built = threading.Event()
+        self.built_at: Optional[float] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.built_at is not None
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        """Block until the index has been built once (or timeout); returns ready"""
+        return self._built.wait(timeout)
+
+    def set_loader(self, loader: Callable[[], Tuple[Iterable[Dict], Iterable[Tuple[str, str]], Dict[str, Point]]]) -> None:
+        """Register the callable that returns (profiles, (user_id, zone_name) pairs, zone points) for rebuilds"""
+        self._loader = loader
+
+    def ensure_fresh(self) -> None:
+        """Start a background rebuild if the index was never built or is older than its TTL"""
+        if self.built_at is not None and time.monotonic() - self.built_at < settings.RECIPIENT_INDEX_TTL_SECONDS:
+            return
+        with self._lock:
+            if self._building or self._loader is None:
+                return
+            self._building = True
+        threading.Thread(target=self._rebuild, daemon=True, name="recipient-index").start()
+
+    def _rebuild(self) -> None:
+        try:
+            profiles, zone_pairs, zone_points = self._loader()
+            self.build(profiles, zone_pairs, zone_points)
+        except Exception as e:
+            logger.error(f"Error building recipient index: {e}")
+        finally:
+            with self._lock:
+                self._building = False
+
+    def build(self, profiles: Iterable[Dict], zone_pairs: Iterable[Tuple[str, str]],
+              zone_points: Optional[Dict[str, Point]] = None) -> None:
+        """
+        Replace the index contents
+
+        Args:
+            profiles: Profile rows (id, email, phone, device_token, location, full_name, latitude, longitude)
+            zone_pairs: (user_id, zone_name) assignments
+            zone_points: Zone name -> (lat, lon), for area targeting of users without coordinates
+        """
+        recipients: Dict[str, Dict] = {}
+        zones_by_user: Dict[str, Set[str]] = {}
+        by_key: Dict[Tuple[str, str], Dict[str, Set[str]]] = {}
+
+        for profile in profiles:
+            recipient = _normalize_recipient(profile)
+            if recipient["id"]:
+                recipients[recipient["id"]] = recipient
+        users_by_zone: Dict[str, Set[str]] = {}
+        for user_id, zone_name in zone_pairs:
+            zones_by_user.setdefault(user_id, set()).add(zone_name)
+            users_by_zone.setdefault(zone_name, set()).add(user_id)
+
+        for user_id, recipient in recipients.items():
+            for key in self._keys_for(recipient, zones_by_user.get(user_id, set())):
+                channels = by_key.setdefault(key, {})
+                for channel in _channels_of(recipient):
+                    channels.setdefault(channel, set()).add(user_id)
+
+        with self._lock:
+            self._recipients = recipients
+            self._zones_by_user = zones_by_user
+            self._users_by_zone = users_by_zone
+            self._by_key = by_key
+            self._user_points.build(
+                (user_id, recipient["latitude"], recipient["longitude"])
+                for user_id, recipient in recipients.items() if recipient["latitude"] is not None
+            )
+            self._zone_points.build((name, lat, lon) for name, (lat, lon) in (zone_points or {}).items())
+            self.built_at = time.monotonic()
+        self._built.set()
+        logger.info(f"Recipient index built: {len(recipients)} recipients, {len(by_key)} targeting keys, "
+                    f"{len(self._user_points)} located users")
+
+    @staticmethod
+    def _keys_for(recipient: Dict, zones: Set[str]) -> List[Tuple[str, str]]:
+        keys = [ALL_KEY] + [("zone", zone) for zone in zones]
+        if recipient.get('location'):
+            keys.append(("location", recipient['location']))
+        return keys
+
+    def _unindex(self, user_id: str) -> None:
+        recipient = self._recipients.get(user_id)
+        if recipient is None:
+            return
+        for key in self._keys_for(recipient, self._zones_by_user.get(user_id, set())):
+            for members in self._by_key.get(key, {}).values():
+                members.discard(user_id)
+        for zone_name in self._zones_by_user.get(user_id, set()):
+            self._users_by_zone.get(zone_name, set()).discard(user_id)
+        self._user_points.remove(user_id)
+
+    def _index(self, user_id: str) -> None:
+        recipient = self._recipients[user_id]
+        for key in self._keys_for(recipient, self._zones_by_user.get(user_id, set())):
+            channels = self._by_key.setdefault(key, {})
+            for channel in _channels_of(recipient):
+                channels.setdefault(channel, set()).add(user_id)
+        for zone_name in self._zones_by_user.get(user_id, set()):
+            self._users_by_zone.setdefault(zone_name, set()).add(user_id)
+        if recipient["latitude"] is not None:
+            self._user_points.insert(user_id, recipient["latitude"], recipient["longitude"])
+
+    def upsert_profile(self, user_id: str, changes: Dict) -> None:
+        """Apply a new or partially updated profile"""
+        with self._lock:
+            if not self.ready:
+                return
+            self._unindex(user_id)
+            merged = {**self._recipients.get(user_id, {}), **changes, "id": user_id}
+            self._recipients[user_id] = _normalize_recipient(merged)
+            self._index(user_id)
+
+    def remove_profile(self, user_id: str) -> None:
+        with self._lock:
+            self._unindex(user_id)
+            self._recipients.pop(user_id, None)
+            self._zones_by_user.pop(user_id, None)
+
+    def assign_zone(self, user_id: str, zone_name: str) -> None:
+        with self._lock:
+            if user_id not in self._recipients:
+                return
+            self._unindex(user_id)
+            self._zones_by_user.setdefault(user_id, set()).add(zone_name)
+            self._index(user_id)
+
+    def unassign_zone(self, user_id: str, zone_name: str) -> None:
+        with self._lock:
+            if user_id not in self._recipients:
+                return
+            self._unindex(user_id)
+            self._zones_by_user.get(user_id, set()).discard(zone_name)
+            self._index(user_id)
+
+    def lookup(self, zone: Optional[str] = None, location: Optional[str] = None,
+               channel: Optional[str] = None) -> List[Dict]:
+        """
+        Recipients for a zone, a profile location, or everyone
+
+        Args:
+            zone: Evacuation zone name (user_zones assignment)
+            location: Free-text profile location
+            channel: Only recipients reachable on this channel (email, sms, push)
+
+        Returns:
+            List of recipient dictionaries with normalized addresses
+        """
+        if zone is not None:
+            key = ("zone", zone)
+        elif location is not None:
+            key = ("location", location)
+        else:
+            key = ALL_KEY
+
+        with self._lock:
+            channels = self._by_key.get(key, {})
+            if channel is not None:
+                user_ids = set(channels.get(channel, ()))
+            else:
+                user_ids = set().union(*channels.values()) if channels else set()
+            return [dict(self._recipients[user_id]) for user_id in user_ids]
+
+    def lookup_area(self, polygon: Optional[Sequence[Point]] = None, center: Optional[Point] = None,
+                    radius_km: Optional[float] = None, track: Optional[Sequence[Point]] = None,
+                    channel: Optional[str] = None, include_unlocated: bool = False) -> List[Dict]:
+        """
+        Recipients inside an inundation polygon, a radius, or a buffer around a storm track
+
+        Users with their own coordinates are matched on them; users without are
+        matched through the evacuation zones they are assigned to. Users with
+        neither can't be placed and never match an area.
+
+        Args:
+            polygon: (lat, lon) vertices of the affected area
+            center: Centre of a radius query
+            radius_km: Radius around center, and buffer width around track
+            track: Storm track as (lat, lon) points
+            channel: Only recipients reachable on this channel (email, sms, push)
+            include_unlocated: Also return the users that can't be placed, flagged
+                "unlocated": True, so the caller can decide whether to alert them
+
+        Returns:
+            List of recipient dictionaries with normalized addresses
+        """
+        with self._lock:
+            user_ids = self._user_points.query(polygon, center, radius_km, track)
+            for zone_name in self._zone_points.query(polygon, center, radius_km, track):
+                user_ids.update(
+                    user_id for user_id in self._users_by_zone.get(zone_name, ())
+                    if self._recipients.get(user_id, {}).get("latitude") is None
+                )
+            unlocated = {user_id for user_id in self._recipients if not self._located(user_id)} \
+                if include_unlocated else set()
+            results = []
+            for user_id in user_ids | unlocated:
+                recipient = self._recipients.get(user_id)
+                if recipient is None or (channel is not None and channel not in _channels_of(recipient)):
+                    continue
+                results.append({**recipient, "unlocated": True} if user_id in unlocated else dict(recipient))
+            return results
+
+    def _located(self, user_id: str) -> bool:
+        """Whether area targeting can place a user: own coordinates or a zone with coordinates"""
+        if self._recipients[user_id]["latitude"] is not None:
+            return True
+        return any(zone_name in self._zone_points for zone_name in self._zones_by_user.get(user_id, ()))
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {
+                "ready": self.ready,
+                "recipients": len(self._recipients),
+                "zones": sum(1 for key in self._by_key if key[0] == "zone"),
+                "locations": sum(1 for key in self._by_key if key[0] == "location"),
+                "located_users": len(self._user_points),
+                "located_zones": len(self._zone_points),
+                "age_seconds": round(time.monotonic() - self.built_at, 1) if self.built_at else None
+            }
+
+
+# Create a global instance
+recipient_index = RecipientIndex()
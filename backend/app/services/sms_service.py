@@ -2,15 +2,25 @@
 import logging
 import requests
 import re
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Optional, Tuple
 from datetime import datetime
 from supabase import create_client, Client
 from app.core.config import settings
+from app.core.phone import is_valid_phone, to_e164
 from app.core.ssl_utils import configure_ssl, create_supabase_client_options
 from app.core.utils import clean_profile_data, serialize_datetime
+from app.services.rate_limiter import rate_limiter
+from app.services.recipient_index import recipient_index
+from app.services.delivery_log import DeliveryLog, DeliveryEvent, classify_error, MAX_ERROR_SAMPLES
+from app.services.delivery_receipts import response_message_id, webhook_url
 
 logger = logging.getLogger(__name__)
 
+_SNS_MESSAGE_ID = re.compile(r'<MessageId>([^<]+)</MessageId>')
+
 class SMSService:
     def __init__(self):
         """Initialize SMS service with configuration"""
@@ -55,6 +65,9 @@ class SMSService:
         self.sms_api_key = settings.SMS_API_KEY
         self.sms_api_url = settings.SMS_API_URL
         
+        # Normalized per-recipient delivery log, written in background batches
+        self.delivery_log = DeliveryLog(self.supabase)
+        
         # Default SMS provider (can be overridden)
         self.sms_provider = "twilio"  # Options: twilio, nexmo, aws_sns, custom
         
@@ -71,6 +84,13 @@ class SMSService:
             List of users with phone numbers
         """
         try:
+            # Serve from the in-memory index when it is built; phones there are already E.164
+            recipient_index.ensure_fresh()
+            if recipient_index.ready:
+                valid_users = recipient_index.lookup(location=location, channel="sms")
+                logger.info(f"Retrieved {len(valid_users)} users with valid phone numbers (index)")
+                return valid_users
+            
             if not self.supabase:
                 logger.error("Supabase client not initialized")
                 return []
@@ -91,8 +111,10 @@ class SMSService:
                 # Filter users with valid phone numbers
                 valid_users = []
                 for user in response.data:
-                    if user.get('phone') and self._is_valid_phone_number(user['phone']):
+                    phone_e164 = user.get('phone_e164') or to_e164(user.get('phone'))
+                    if phone_e164:
                         cleaned_user = clean_profile_data(user)
+                        cleaned_user['phone'] = phone_e164
                         valid_users.append(cleaned_user)
                 
                 logger.info(f"Retrieved {len(valid_users)} users with valid phone numbers")
@@ -115,19 +137,7 @@ class SMSService:
         Returns:
             True if valid, False otherwise
         """
-        if not phone:
-            return False
-        
-        # Remove all non-digit characters
-        digits_only = re.sub(r'\D', '', phone)
-        
-        # Check if it's a valid length (7-15 digits)
-        if len(digits_only) < 7 or len(digits_only) > 15:
-            return False
-        
-        # Basic format validation
-        phone_pattern = re.compile(r'^\+?[\d\s\-\(\)]+$')
-        return bool(phone_pattern.match(phone))
+        return is_valid_phone(phone)
 
     def _format_phone_number(self, phone: str) -> str:
         """
@@ -139,18 +149,12 @@ class SMSService:
         Returns:
             Formatted phone number
         """
-        # Remove all non-digit characters
-        digits_only = re.sub(r'\D', '', phone)
-        
-        # Add country code if not present (assuming India +91)
-        if len(digits_only) == 10:
-            return f"+91{digits_only}"
-        elif len(digits_only) == 12 and digits_only.startswith('91'):
-            return f"+{digits_only}"
-        elif len(digits_only) == 11 and digits_only.startswith('91'):
-            return f"+{digits_only}"
-        else:
-            return f"+{digits_only}"
+        formatted = to_e164(phone)
+        if formatted:
+            return formatted
+        # Invalid numbers keep the old best-effort formatting
+        digits_only = re.sub(r'\D', '', phone or '')
+        return f"+{digits_only}"
 
     def send_sms_alert(self, phone: str, message: str) -> Tuple[bool, str]:
         """
@@ -163,16 +167,28 @@ class SMSService:
         Returns:
             Tuple of (success: bool, error_message: str)
         """
+        success, error_msg, _ = self.send_sms(phone, message)
+        return success, error_msg
+
+    def send_sms(self, phone: str, message: str) -> Tuple[bool, str, Optional[str]]:
+        """
+        Send SMS to a single phone number, keeping the provider's message id
+        
+        Args:
+            phone: Phone number to send SMS to
+            message: SMS message content
+            
+        Returns:
+            Tuple of (success: bool, error_message: str, provider_message_id)
+        """
         try:
             if not self.sms_api_key or not self.sms_api_url:
-                return False, "SMS API not configured"
-            
-            # Format phone number
-            formatted_phone = self._format_phone_number(phone)
+                return False, "SMS API not configured", None
             
-            # Validate phone number
-            if not self._is_valid_phone_number(formatted_phone):
-                return False, f"Invalid phone number format: {phone}"
+            # Validate and format in one cached pass; stored E.164 numbers hit the cache
+            formatted_phone = to_e164(phone)
+            if not formatted_phone:
+                return False, f"Invalid phone number format: {phone}", None
             
             # Send SMS based on provider
             if self.sms_provider == "twilio":
@@ -186,9 +202,9 @@ class SMSService:
                 
         except Exception as e:
             logger.error(f"Error sending SMS to {phone}: {e}")
-            return False, str(e)
+            return False, str(e), None
 
-    def _send_via_twilio(self, phone: str, message: str) -> Tuple[bool, str]:
+    def _send_via_twilio(self, phone: str, message: str) -> Tuple[bool, str, Optional[str]]:
         """Send SMS via Twilio"""
         try:
             # Twilio API endpoint
@@ -204,26 +220,31 @@ class SMSService:
                 "From": settings.TWILIO_PHONE_NUMBER,
                 "Body": message
             }
+            if settings.WEBHOOK_BASE_URL:
+                # Twilio reports final delivery state here (see /webhooks/twilio)
+                payload["StatusCallback"] = webhook_url("twilio")
             
+            rate_limiter.acquire("twilio", sender=settings.TWILIO_PHONE_NUMBER)
             response = requests.post(
                 twilio_url,
                 data=payload,
                 auth=(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN),
                 timeout=10
             )
+            rate_limiter.record_response("twilio", response.status_code, response.headers.get("Retry-After"))
             
             if response.status_code == 201:
                 logger.info(f"Twilio SMS sent successfully to {phone}")
-                return True, "SMS sent successfully"
+                return True, "SMS sent successfully", response_message_id(response, 'sid')
             else:
                 logger.error(f"Twilio API error: {response.status_code} - {response.text}")
-                return False, f"Twilio API error: {response.status_code}"
+                return False, f"Twilio API error: {response.status_code}", None
                 
         except Exception as e:
             logger.error(f"Twilio SMS error: {e}")
-            return False, str(e)
+            return False, str(e), None
 
-    def _send_via_nexmo(self, phone: str, message: str) -> Tuple[bool, str]:
+    def _send_via_nexmo(self, phone: str, message: str) -> Tuple[bool, str, Optional[str]]:
         """Send SMS via Nexmo (Vonage)"""
         try:
             # Nexmo API endpoint
@@ -237,26 +258,28 @@ class SMSService:
                 "text": message
             }
             
+            rate_limiter.acquire("nexmo", sender=settings.NEXMO_PHONE_NUMBER)
             response = requests.post(nexmo_url, data=payload, timeout=10)
+            rate_limiter.record_response("nexmo", response.status_code, response.headers.get("Retry-After"))
             
             if response.status_code == 200:
                 result = response.json()
                 if result.get('messages', [{}])[0].get('status') == '0':
                     logger.info(f"Nexmo SMS sent successfully to {phone}")
-                    return True, "SMS sent successfully"
+                    return True, "SMS sent successfully", result['messages'][0].get('message-id')
                 else:
                     error_msg = result.get('messages', [{}])[0].get('error-text', 'Unknown error')
                     logger.error(f"Nexmo SMS error: {error_msg}")
-                    return False, error_msg
+                    return False, error_msg, None
             else:
                 logger.error(f"Nexmo API error: {response.status_code} - {response.text}")
-                return False, f"Nexmo API error: {response.status_code}"
+                return False, f"Nexmo API error: {response.status_code}", None
                 
         except Exception as e:
             logger.error(f"Nexmo SMS error: {e}")
-            return False, str(e)
+            return False, str(e), None
 
-    def _send_via_aws_sns(self, phone: str, message: str) -> Tuple[bool, str]:
+    def _send_via_aws_sns(self, phone: str, message: str) -> Tuple[bool, str, Optional[str]]:
         """Send SMS via AWS SNS"""
         try:
             # AWS SNS API endpoint
@@ -274,6 +297,7 @@ class SMSService:
             # AWS_SECRET_ACCESS_KEY=your_secret_key
             # AWS_REGION=your_region
             
+            rate_limiter.acquire("aws_sns")
             response = requests.post(
                 sns_url,
                 data=payload,
@@ -283,19 +307,21 @@ class SMSService:
                 },
                 timeout=10
             )
+            rate_limiter.record_response("aws_sns", response.status_code, response.headers.get("Retry-After"))
             
             if response.status_code == 200:
                 logger.info(f"AWS SNS SMS sent successfully to {phone}")
-                return True, "SMS sent successfully"
+                message_id = _SNS_MESSAGE_ID.search(response.text)
+                return True, "SMS sent successfully", message_id.group(1) if message_id else None
             else:
                 logger.error(f"AWS SNS API error: {response.status_code} - {response.text}")
-                return False, f"AWS SNS API error: {response.status_code}"
+                return False, f"AWS SNS API error: {response.status_code}", None
                 
         except Exception as e:
             logger.error(f"AWS SNS SMS error: {e}")
-            return False, str(e)
+            return False, str(e), None
 
-    def _send_via_custom_api(self, phone: str, message: str) -> Tuple[bool, str]:
+    def _send_via_custom_api(self, phone: str, message: str) -> Tuple[bool, str, Optional[str]]:
         """Send SMS via custom API"""
         try:
             payload = {
@@ -305,26 +331,29 @@ class SMSService:
                 "sender": "CTAS"  # Custom sender ID
             }
             
+            rate_limiter.acquire("custom")
             response = requests.post(self.sms_api_url, json=payload, timeout=10)
+            rate_limiter.record_response("custom", response.status_code, response.headers.get("Retry-After"))
             
             if response.status_code == 200:
                 logger.info(f"Custom API SMS sent successfully to {phone}")
-                return True, "SMS sent successfully"
+                return True, "SMS sent successfully", response_message_id(response)
             else:
                 logger.error(f"Custom SMS API error: {response.status_code} - {response.text}")
-                return False, f"Custom SMS API error: {response.status_code}"
+                return False, f"Custom SMS API error: {response.status_code}", None
                 
         except Exception as e:
             logger.error(f"Custom SMS API error: {e}")
-            return False, str(e)
+            return False, str(e), None
 
-    def send_bulk_sms_alert(self, users: List[Dict], message: str) -> Dict:
+    def send_bulk_sms_alert(self, users: List[Dict], message: str, event: Optional[DeliveryEvent] = None) -> Dict:
         """
         Send SMS alerts to multiple users
         
         Args:
             users: List of user dictionaries with phone numbers
             message: SMS message content
+            event: Optional delivery log event to record per-recipient rows against
             
         Returns:
             Dictionary with results summary
@@ -333,29 +362,60 @@ class SMSService:
             "total_users": len(users),
             "successful": 0,
             "failed": 0,
+            "errors_by_code": Counter(),
             "errors": [],
             "timestamp": datetime.now().isoformat()
         }
         
-        for user in users:
-            phone = user.get('phone')
-            if not phone:
-                results["failed"] += 1
-                results["errors"].append(f"No phone number for user {user.get('email', 'Unknown')}")
-                continue
-            
-            success, error_msg = self.send_sms_alert(phone, message)
-            
-            if success:
-                results["successful"] += 1
-                logger.info(f"SMS sent successfully to {user.get('email', 'Unknown')} at {phone}")
-            else:
-                results["failed"] += 1
-                results["errors"].append(f"Failed to send SMS to {user.get('email', 'Unknown')} at {phone}: {error_msg}")
+        # Fan out across a bounded worker pool; provider rate limits pace the sends
+        with ThreadPoolExecutor(max_workers=settings.NOTIFICATION_MAX_WORKERS) as executor:
+            outcomes = executor.map(lambda user: self._send_to_user(user, message, event), users)
+            for success, error in outcomes:
+                if success:
+                    results["successful"] += 1
+                else:
+                    results["failed"] += 1
+                    results["errors_by_code"][classify_error(error)] += 1
+                    if len(results["errors"]) < MAX_ERROR_SAMPLES:
+                        results["errors"].append(error)
         
+        results["errors_by_code"] = dict(results["errors_by_code"])
         logger.info(f"Bulk SMS completed: {results['successful']} successful, {results['failed']} failed")
         return results
 
+    def _send_to_user(self, user: Dict, message: str, event: Optional[DeliveryEvent] = None) -> Tuple[bool, str]:
+        """
+        Send an SMS to one user from a bulk send
+        
+        Args:
+            user: User dictionary with a phone number
+            message: SMS message content
+            event: Optional delivery log event to record the attempt against
+            
+        Returns:
+            Tuple of (success: bool, error_message: str)
+        """
+        phone = user.get('phone')
+        if not phone:
+            error_msg = "No phone number"
+            if event is not None:
+                self.delivery_log.record(event, user.get('id'), "sms", False, error=error_msg)
+            return False, f"{error_msg} for user {user.get('email', 'Unknown')}"
+        
+        started = time.monotonic()
+        success, error_msg, message_id = self.send_sms(phone, message)
+        if event is not None:
+            self.delivery_log.record(
+                event, user.get('id'), "sms", success,
+                error=None if success else error_msg, latency=time.monotonic() - started,
+                provider_message_id=message_id
+            )
+        
+        if success:
+            logger.info(f"SMS sent successfully to {user.get('email', 'Unknown')} at {phone}")
+            return True, ""
+        return False, f"Failed to send SMS to {user.get('email', 'Unknown')} at {phone}: {error_msg}"
+
     def send_high_alert_sms(self, threat_level: str, threat_data: Dict, location: Optional[str] = None) -> Dict:
         """
         Send high alert SMS to all users with phone numbers
@@ -384,15 +444,19 @@ class SMSService:
             # Create SMS message
             sms_message = self._create_high_alert_message(threat_level, threat_data)
             
+            # Open the event row up front; deliveries are logged as they happen
+            event = self.delivery_log.start_event("sms_alert", threat_level, threat_data)
+            
             # Send bulk SMS
-            results = self.send_bulk_sms_alert(users, sms_message)
+            results = self.send_bulk_sms_alert(users, sms_message, event)
             
-            # Store notification record
-            self._store_sms_notification_record(threat_level, threat_data, results)
+            # Write aggregate counts to the event row (in the background)
+            self.delivery_log.finish_event(event, {**results, "sms_sent": results["successful"]})
             
             return {
                 "success": True,
                 "message": f"SMS alerts sent to {results['successful']} users",
+                "notification_id": event.event_id,
                 **results
             }
             
@@ -437,41 +501,5 @@ Storm Surge: {surge_data.get('threat_level', 'Unknown')}"""
         
         return message
 
-    def _store_sms_notification_record(self, threat_level: str, threat_data: Dict, results: Dict) -> None:
-        """
-        Store SMS notification record in database
-        
-        Args:
-            threat_level: Threat level
-            threat_data: Threat data
-            results: SMS results
-        """
-        try:
-            if not self.supabase:
-                logger.warning("Supabase not available, skipping SMS notification record storage")
-                return
-            
-            notification_record = {
-                "timestamp": datetime.now().isoformat(),
-                "threat_level": threat_level,
-                "threat_type": "sms_alert",
-                "total_users": results["total_users"],
-                "sms_sent": results["successful"],
-                "failed": results["failed"],
-                "threat_data": threat_data,
-                "results": results
-            }
-            
-            # Store in notifications table
-            response = self.supabase.table('notifications').insert(notification_record).execute()
-            
-            if response.data:
-                logger.info("SMS notification record stored in database")
-            else:
-                logger.warning("Failed to store SMS notification record")
-                
-        except Exception as e:
-            logger.error(f"Error storing SMS notification record: {e}")
-
 # Create a global instance
 sms_service = SMSService()
@@ -3,11 +3,37 @@ import requests
 import logging
 import os
 import math
+import numpy as np
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
+def surge_inputs(weather_data: Dict[str, Any]) -> Tuple[float, float, float]:
+    """
+    Pressure, wind speed and wind direction of an observation as floats
+
+    Wind direction defaults to 180 (onshore) when absent. Raises ValueError
+    naming every reading that is missing or not a finite number.
+    """
+    readings = {
+        "pressure": weather_data.get('pressure'),
+        "wind_speed": weather_data.get('wind_speed'),
+        "wind_direction": weather_data.get('wind_direction', 180)
+    }
+    readings["wind_direction"] = 180 if readings["wind_direction"] is None else readings["wind_direction"]
+    invalid = []
+    for name, value in readings.items():
+        try:
+            readings[name] = float(value)
+        except (TypeError, ValueError):
+            readings[name] = math.nan
+        if not math.isfinite(readings[name]):
+            invalid.append(name)
+    if invalid:
+        raise ValueError(f"Missing or invalid {', '.join(invalid)}")
+    return readings["pressure"], readings["wind_speed"], readings["wind_direction"]
+
 class StormSurgePredictor:
     def __init__(self):
         self.coastal_bathymetry = self.load_coastal_data()
@@ -38,18 +64,19 @@ class StormSurgePredictor:
         Based on the simplified formula: Surge = f(pressure, wind, coastal_geometry)
         """
         try:
-            # Get current tidal data
-            tidal_data = self.get_tidal_data(
-                weather_data.get('lat', 19.0760),
-                weather_data.get('lon', 72.8777)
-            )
+            latitude = weather_data.get('lat', 19.0760)
+            longitude = weather_data.get('lon', 72.8777)
+            
+            # Get current tidal data (observations from the batch fetch already carry it)
+            if weather_data.get('tidal_height') is not None:
+                tidal_data = {"current_height": weather_data['tidal_height']}
+            else:
+                tidal_data = self.get_tidal_data(latitude, longitude)
             
             # Calculate storm surge components
-            pressure_surge = self.calculate_pressure_component(weather_data['pressure'])
-            wind_surge = self.calculate_wind_component(
-                weather_data['wind_speed'], 
-                weather_data.get('wind_direction', 180)  # Default SW direction
-            )
+            pressure, wind_speed, wind_direction = surge_inputs(weather_data)
+            pressure_surge = float(self.calculate_pressure_component(pressure))
+            wind_surge = float(self.calculate_wind_component(wind_speed, wind_direction))
             
             # Get coastal factors
             coastal_factors = self.coastal_bathymetry.get(location, self.coastal_bathymetry["default"])
@@ -68,6 +95,8 @@ class StormSurgePredictor:
                 "total_water_level": round(total_water_level, 2),
                 "prediction_time": datetime.now().isoformat(),
                 "location": location,
+                "lat": latitude,
+                "lon": longitude,
                 "threat_level": self.assess_threat_level(total_water_level, coastal_factors)
             }
             
@@ -75,6 +104,69 @@ class StormSurgePredictor:
             logger.error(f"Error predicting storm surge: {e}")
             return {"error": str(e)}
     
+    def predict_storm_surge_batch(self, weather_list: List[Dict[str, Any]], locations: List[str],
+                                  tide_heights: Optional[List[float]] = None) -> List[Dict[str, Any]]:
+        """
+        Vectorized predict_storm_surge for many stations at once
+        
+        Args:
+            weather_list: One weather observation per station
+            locations: Coastal profile name per station
+            tide_heights: Current tidal height per station (fetched here if not given)
+        
+        Returns:
+            List of surge predictions in input order, same fields as
+            predict_storm_surge; a station whose pressure or wind is missing
+            or not a finite number gets {"error": ...} instead
+        """
+        latitudes = [weather.get('lat', 19.0760) for weather in weather_list]
+        longitudes = [weather.get('lon', 72.8777) for weather in weather_list]
+        
+        inputs, errors = [], {}
+        for i, weather in enumerate(weather_list):
+            try:
+                inputs.append(surge_inputs(weather))
+            except ValueError as e:
+                errors[i] = str(e)
+                inputs.append((math.nan, math.nan, math.nan))
+        
+        if tide_heights is None:
+            tide_heights = [
+                0 if i in errors else self.get_tidal_data(lat, lon).get('current_height', 0)
+                for i, (lat, lon) in enumerate(zip(latitudes, longitudes))
+            ]
+        
+        pressure, wind_speed, wind_direction = np.array(inputs, dtype=float).reshape(-1, 3).T
+        vulnerability = np.array([
+            self.coastal_bathymetry.get(location, self.coastal_bathymetry["default"])["vulnerability_factor"]
+            for location in locations
+        ])
+        tide = np.array(tide_heights, dtype=float)
+        
+        # The scalar methods take arrays too
+        pressure_surge = self.calculate_pressure_component(pressure)
+        wind_surge = self.calculate_wind_component(wind_speed, wind_direction)
+        total_surge = (pressure_surge + wind_surge) * vulnerability
+        total_water_level = tide + total_surge
+        threat_levels = self.assess_threat_level(total_water_level, {"vulnerability_factor": vulnerability})
+        
+        prediction_time = datetime.now().isoformat()
+        return [
+            {"error": errors[i]} if i in errors else {
+                "pressure_surge": round(float(pressure_surge[i]), 2),
+                "wind_surge": round(float(wind_surge[i]), 2),
+                "total_surge": round(float(total_surge[i]), 2),
+                "tidal_height": round(float(tide[i]), 2),
+                "total_water_level": round(float(total_water_level[i]), 2),
+                "prediction_time": prediction_time,
+                "location": locations[i],
+                "lat": latitudes[i],
+                "lon": longitudes[i],
+                "threat_level": str(threat_levels[i])
+            }
+            for i in range(len(weather_list))
+        ]
+    
     def calculate_pressure_component(self, pressure_hpa: float) -> float:
         """
         Calculate surge component from pressure difference
@@ -82,7 +174,7 @@ class StormSurgePredictor:
         """
         normal_pressure = 1013.25  # Standard atmospheric pressure
         pressure_drop = normal_pressure - pressure_hpa
-        return max(0, pressure_drop * 0.01)  # Convert to meters
+        return np.maximum(0, pressure_drop * 0.01)  # Convert to meters (elementwise for arrays)
     
     def calculate_wind_component(self, wind_speed_kmh: float, wind_direction_deg: float) -> float:
         """
@@ -94,7 +186,7 @@ class StormSurgePredictor:
         
         # Factor based on wind direction (onshore winds cause more surge)
         # Assuming 180° is directly onshore (simplified)
-        direction_factor = max(0, math.cos(math.radians(wind_direction_deg - 180)))
+        direction_factor = np.maximum(0, np.cos(np.radians(wind_direction_deg - 180)))
         
         # Wind stress formula (simplified)
         return (wind_speed_ms ** 2) * direction_factor * 0.0005
@@ -156,14 +248,14 @@ class StormSurgePredictor:
         # Adjust threshold based on coastal vulnerability
         adjusted_threshold = base_threshold * (1 / coastal_factors["vulnerability_factor"])
         
-        if water_level > adjusted_threshold + 1.0:
-            return "extreme"
-        elif water_level > adjusted_threshold:
-            return "high"
-        elif water_level > adjusted_threshold - 0.5:
-            return "moderate"
-        else:
-            return "low"
+        levels = np.select(
+            [water_level > adjusted_threshold + 1.0, water_level > adjusted_threshold,
+             water_level > adjusted_threshold - 0.5],
+            ["extreme", "high", "moderate"],
+            default="low"
+        )
+        # One level for one water level, else an array (predict_storm_surge_batch)
+        return str(levels) if levels.ndim == 0 else levels
 
 # Create a singleton instance
 storm_surge_predictor = StormSurgePredictor()
\ No newline at end of file
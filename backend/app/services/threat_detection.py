@@ -1,27 +1,53 @@
 # backend/app/services/threat_detection.py
 import logging
 from datetime import datetime
+from typing import Dict, Optional
+from app.core.config import settings
 from app.services.data_fetcher import fetch_weather_data
 from app.ml_models.cyclone_predictor import cyclone_predictor
 from app.services.storm_surge_predictor import storm_surge_predictor
 
 logger = logging.getLogger(__name__)
 
-def run_threat_detection():
+def get_cyclone_model():
+    """
+    The model behind cyclone predictions: the XGBoost classifier, or the
+    24-step sequence model when CYCLONE_MODEL is "sequence" (loaded on first use)
+    """
+    if settings.CYCLONE_MODEL == "sequence":
+        from app.ml_models.sequence_predictor import sequence_predictor
+        return sequence_predictor
+    return cyclone_predictor
+
+def run_threat_detection(weather_data: Optional[Dict] = None, latitude: Optional[float] = None,
+                         longitude: Optional[float] = None, location: str = "mumbai",
+                         station_id: Optional[str] = None):
     """
     Run complete threat detection and return results
+    
+    Args:
+        weather_data: Observation to assess; fetched for (latitude, longitude) if not given
+        latitude, longitude: Station coordinates (defaults from settings)
+        location: Coastal profile used by the storm surge model
+        station_id: Monitoring station the observation came from
     """
     try:
         # Fetch current weather data
-        weather_data = fetch_weather_data()
-        logger.info(f"Fetched weather data: {weather_data}")
+        if weather_data is None:
+            weather_data = fetch_weather_data(latitude, longitude)
+            logger.info(f"Fetched weather data: {weather_data}")
+        
+        # Tag the observation with its station so the sequence model keeps its readings
+        # apart from other stations'; fields already in the observation win
+        station = {"station_id": station_id, "lat": latitude, "lon": longitude}
+        weather_data = {**{key: value for key, value in station.items() if value is not None}, **weather_data}
         
         # 1. Cyclone Prediction
-        cyclone_data = cyclone_predictor.predict(weather_data)
+        cyclone_data = get_cyclone_model().predict(weather_data)
         logger.info(f"Cyclone prediction: {cyclone_data}")
         
         # 2. Storm Surge Prediction
-        surge_data = storm_surge_predictor.predict_storm_surge(weather_data)
+        surge_data = storm_surge_predictor.predict_storm_surge(weather_data, location)
         logger.info(f"Storm surge prediction: {surge_data}")
         
         # Determine overall threat level
@@ -36,6 +62,8 @@ def run_threat_detection():
             "overall_threat": threat_level,
             "recommendations": generate_recommendations(threat_level)
         }
+        if station_id:
+            threat_data["station_id"] = station_id
         
         logger.info(f"Threat detection completed: {threat_data}")
         return threat_data
@@ -0,0 +1,202 @@
+# backend/app/services/threat_snapshot.py
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Keys that change on every assessment without the threat changing
+VOLATILE_KEYS = {"timestamp", "prediction_time", "date"}
+
+
+def _json_default(value: Any):
+    # numpy scalars and datetimes from the weather and model layers
+    if hasattr(value, "item"):
+        return value.item()
+    return str(value)
+
+
+def _without_volatile(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {k: _without_volatile(v) for k, v in value.items() if k not in VOLATILE_KEYS}
+    if isinstance(value, list):
+        return [_without_volatile(v) for v in value]
+    return value
+
+
+def threat_etag(threat_data: Dict) -> str:
+    """Content hash of a station's threat, ignoring timestamps"""
+    canonical = json.dumps(_without_volatile(threat_data), sort_keys=True, default=_json_default)
+    return hashlib.sha1(canonical.encode()).hexdigest()[:20]
+
+
+def render_threat_response(threat_data: Dict) -> bytes:
+    """The /threat-detection response body, serialized once per change"""
+    return json.dumps({
+        "status": "success",
+        "data": threat_data,
+        "message": "Threat assessment completed successfully"
+    }, default=_json_default).encode()
+
+
+class ThreatSnapshotStore:
+    """
+    Latest threat assessment per station, ready to serve.
+
+    The pipeline publishes every assessment here. A station's entry (and its
+    pre-rendered response body) is replaced only when the threat content
+    changes, so the version and ETag move only on real changes. The leader
+    also writes the snapshot to THREAT_SNAPSHOT_FILE; other workers on the
+    host reload it when its mtime changes, which costs one stat per read.
+    Only the pipeline publishes, so every worker numbers versions the same
+    way; assessments made elsewhere are served through unpublished().
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = Path(path or settings.THREAT_SNAPSHOT_FILE
+                         or os.path.join(tempfile.gettempdir(), "ctas_threat_snapshot.json"))
+        self.version = 0
+        self._stations: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._file_mtime: Optional[int] = None
+        self._persisted_at = 0.0
+
+    def publish(self, threats: List[Dict]) -> List[str]:
+        """
+        Record new assessments and write the snapshot file for the other workers
+
+        Args:
+            threats: threat_data dictionaries carrying station_id
+
+        Returns:
+            Station ids whose threat changed
+        """
+        # Pick up what another worker (a previous leader) published first, so versions keep increasing
+        self._reload_if_changed()
+        now = time.time()
+        changed = []
+        with self._lock:
+            for threat_data in threats:
+                station_id = threat_data.get("station_id")
+                if not station_id:
+                    continue
+                etag = threat_etag(threat_data)
+                entry = self._stations.get(station_id)
+                if entry is not None and entry["etag"] == etag:
+                    entry["checked_at"] = now
+                    continue
+                self.version += 1
+                self._stations[station_id] = {
+                    "etag": etag, "version": self.version, "updated_at": now, "checked_at": now,
+                    "data": threat_data, "body": render_threat_response(threat_data)
+                }
+                changed.append(station_id)
+
+            # Unchanged checks are written now and then so followers can tell the snapshot is live
+            if changed or (now - self._persisted_at >= settings.THREAT_SNAPSHOT_MAX_AGE_SECONDS / 2):
+                self._write_file(now)
+        return changed
+
+    def unpublished(self, threat_data: Dict) -> Dict[str, Any]:
+        """
+        A servable entry for an assessment made outside the pipeline, left out
+        of the snapshot; it carries the published version only if its content
+        is the published one
+        """
+        etag = threat_etag(threat_data)
+        current = self.get(threat_data.get("station_id"))
+        return {
+            "etag": etag,
+            "version": current["version"] if current is not None and current["etag"] == etag else None,
+            "data": threat_data,
+            "body": render_threat_response(threat_data)
+        }
+
+    def get(self, station_id: str) -> Optional[Dict[str, Any]]:
+        """Entry for a station: etag, version, updated_at, checked_at, data and body"""
+        self._reload_if_changed()
+        with self._lock:
+            return self._stations.get(station_id)
+
+    def get_all(self) -> Dict[str, Any]:
+        self._reload_if_changed()
+        with self._lock:
+            return {
+                "version": self.version,
+                "stations": {
+                    station_id: {k: entry[k] for k in ("etag", "version", "updated_at", "checked_at", "data")}
+                    for station_id, entry in self._stations.items()
+                }
+            }
+
+    def current_version(self) -> int:
+        self._reload_if_changed()
+        return self.version
+
+    def changes_since(self, version: int) -> Dict[str, Any]:
+        """Current version and the entries that changed after `version`"""
+        self._reload_if_changed()
+        with self._lock:
+            return {
+                "version": self.version,
+                "stations": {
+                    station_id: entry for station_id, entry in self._stations.items() if entry["version"] > version
+                }
+            }
+
+    def is_stale(self, entry: Dict[str, Any]) -> bool:
+        return time.time() - entry["checked_at"] > settings.THREAT_SNAPSHOT_MAX_AGE_SECONDS
+
+    def _write_file(self, now: float) -> None:
+        snapshot = {
+            "version": self.version,
+            "stations": {
+                station_id: {k: entry[k] for k in ("etag", "version", "updated_at", "checked_at", "data")}
+                for station_id, entry in self._stations.items()
+            }
+        }
+        try:
+            temp_path = self.path.with_suffix(f".{os.getpid()}.tmp")
+            temp_path.write_text(json.dumps(snapshot, default=_json_default))
+            temp_path.replace(self.path)
+            self._file_mtime = self.path.stat().st_mtime_ns
+            self._persisted_at = now
+        except Exception as e:
+            logger.error(f"Could not write threat snapshot file {self.path}: {e}")
+
+    def _reload_if_changed(self) -> None:
+        try:
+            mtime = self.path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime == self._file_mtime:
+            return
+        try:
+            snapshot = json.loads(self.path.read_text())
+        except Exception as e:
+            logger.warning(f"Could not read threat snapshot file {self.path}: {e}")
+            return
+        with self._lock:
+            self._file_mtime = mtime
+            self.version = max(self.version, snapshot.get("version", 0))
+            for station_id, entry in snapshot.get("stations", {}).items():
+                current = self._stations.get(station_id)
+                if current is not None and current["etag"] == entry["etag"]:
+                    current["checked_at"] = max(current["checked_at"], entry["checked_at"])
+                    continue
+                if current is not None and current["updated_at"] > entry["updated_at"]:
+                    # Published here after the file was written (a previous leader's late write)
+                    continue
+                self._stations[station_id] = {**entry, "body": render_threat_response(entry["data"])}
+
+
+# Create a global instance
+threat_snapshot = ThreatSnapshotStore()
@@ -0,0 +1,110 @@
+# backend/app/services/threat_stream.py
+import asyncio
+import json
+import logging
+from typing import Any, Dict, Optional, Set
+
+from app.core.config import settings
+from app.services.threat_snapshot import threat_snapshot
+
+logger = logging.getLogger(__name__)
+
+
+def compact_threat(entry: Dict[str, Any]) -> Dict[str, Any]:
+    """The fields a dashboard tile needs from a snapshot entry"""
+    data = entry["data"]
+    cyclone = data.get("cyclone") or {}
+    surge = data.get("storm_surge") or {}
+    return {
+        "threat": data.get("overall_threat"),
+        "cyclone_probability": cyclone.get("probability"),
+        "cyclone_classification": cyclone.get("classification"),
+        "surge_level": surge.get("threat_level"),
+        "water_level": surge.get("total_water_level"),
+        "updated_at": entry["updated_at"],
+        "etag": entry["etag"]
+    }
+
+
+def sse_event(event: str, version: int, payload: Dict[str, Any]) -> bytes:
+    """One Server-Sent Event; the id lets a reconnecting client resume with Last-Event-ID"""
+    return f"id: {version}\nevent: {event}\ndata: {json.dumps(payload, separators=(',', ':'))}\n\n".encode()
+
+
+class ThreatBroadcastHub:
+    """
+    Fans threat snapshot changes out to streaming subscribers.
+
+    One task per worker watches the snapshot store and, when the version
+    moves, serializes a single delta event (only the stations that changed)
+    and hands the same bytes to every subscriber. Each subscriber has a
+    small bounded queue; one that falls behind is disconnected rather than
+    buffered without limit, and resumes from its Last-Event-ID on reconnect.
+    The watcher runs only while someone is subscribed.
+    """
+
+    def __init__(self, poll_seconds: Optional[float] = None, queue_size: Optional[int] = None):
+        self.poll_seconds = poll_seconds or settings.STREAM_POLL_SECONDS
+        self.queue_size = queue_size or settings.STREAM_SUBSCRIBER_QUEUE
+        self.version = 0
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._task: Optional[asyncio.Task] = None
+        self.counters = {"events": 0, "dropped_subscribers": 0}
+
+    def snapshot_event(self, since: Optional[int] = None) -> Optional[bytes]:
+        """Initial event for a new subscriber: everything, or only what changed after `since`"""
+        if since is not None and since > threat_snapshot.current_version():
+            # The id is from before a restart that lost the snapshot; start over
+            since = None
+        changes = threat_snapshot.changes_since(since or 0)
+        if since is not None and not changes["stations"]:
+            return None
+        stations = {station_id: compact_threat(entry) for station_id, entry in changes["stations"].items()}
+        return sse_event("snapshot" if since is None else "delta", changes["version"], {
+            "version": changes["version"], "stations": stations
+        })
+
+    def subscribe(self) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.add(queue)
+        if self._task is None or self._task.done():
+            self.version = threat_snapshot.current_version()
+            self._task = asyncio.create_task(self._watch())
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        self._subscribers.discard(queue)
+
+    def broadcast(self, message: bytes) -> None:
+        self.counters["events"] += 1
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # Too slow to keep up: close it; the client resumes from its last event id
+                self._subscribers.discard(queue)
+                self.counters["dropped_subscribers"] += 1
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(None)
+
+    async def _watch(self) -> None:
+        while self._subscribers:
+            try:
+                changes = await asyncio.to_thread(threat_snapshot.changes_since, self.version)
+                if changes["stations"]:
+                    stations = {station_id: compact_threat(entry) for station_id, entry in changes["stations"].items()}
+                    self.broadcast(sse_event("delta", changes["version"], {
+                        "version": changes["version"], "stations": stations
+                    }))
+                self.version = changes["version"]
+            except Exception as e:
+                logger.error(f"Error watching threat snapshot: {e}")
+            await asyncio.sleep(self.poll_seconds)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"subscribers": len(self._subscribers), "version": self.version, **self.counters}
+
+
+# Create a global instance
+threat_hub = ThreatBroadcastHub()
@@ -0,0 +1,97 @@
+# backend/app/services/webhook_signatures.py
+import base64
+import hashlib
+import hmac
+import logging
+import re
+import threading
+from typing import Dict, Mapping, Optional
+from urllib.parse import urlparse
+
+import requests
+from cryptography import x509
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric import padding
+
+logger = logging.getLogger(__name__)
+
+# Fields SNS signs, in signing order, per message type
+SNS_SIGNED_FIELDS = {
+    "Notification": ["Message", "MessageId", "Subject", "Timestamp", "TopicArn", "Type"],
+    "SubscriptionConfirmation": ["Message", "MessageId", "SubscribeURL", "Timestamp", "Token", "TopicArn", "Type"],
+    "UnsubscribeConfirmation": ["Message", "MessageId", "SubscribeURL", "Timestamp", "Token", "TopicArn", "Type"],
+}
+
+# Signing certificates are only fetched from SNS itself
+SNS_CERT_HOST = re.compile(r"^sns\.[a-z0-9-]+\.amazonaws\.com(\.cn)?$")
+
+
+def twilio_signature(auth_token: str, url: str, params: Mapping[str, str]) -> str:
+    """X-Twilio-Signature for a request: HMAC-SHA1 of the full URL followed by the sorted form fields"""
+    payload = url + "".join(f"{key}{params[key]}" for key in sorted(params))
+    digest = hmac.new(auth_token.encode("utf-8"), payload.encode("utf-8"), hashlib.sha1).digest()
+    return base64.b64encode(digest).decode("ascii")
+
+
+def verify_twilio_signature(auth_token: str, url: str, params: Mapping[str, str], signature: Optional[str]) -> bool:
+    if not auth_token or not signature:
+        return False
+    return hmac.compare_digest(twilio_signature(auth_token, url, params), signature)
+
+
+def sns_string_to_sign(message: Mapping[str, str]) -> Optional[str]:
+    """The canonical "Key\\nValue\\n" string SNS signs, or None for an unknown message type"""
+    fields = SNS_SIGNED_FIELDS.get(message.get("Type"))
+    if fields is None:
+        return None
+    return "".join(f"{field}\n{message[field]}\n" for field in fields if message.get(field) is not None)
+
+
+class SNSVerifier:
+    """
+    Verifies SNS message signatures (SignatureVersion 1: SHA1, 2: SHA256)
+    against the signing certificate, fetched once per certificate URL.
+    """
+
+    def __init__(self, timeout: float = 10.0):
+        self.timeout = timeout
+        self._public_keys: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def _public_key(self, cert_url: str):
+        with self._lock:
+            key = self._public_keys.get(cert_url)
+        if key is None:
+            response = requests.get(cert_url, timeout=self.timeout)
+            response.raise_for_status()
+            key = x509.load_pem_x509_certificate(response.content).public_key()
+            with self._lock:
+                self._public_keys[cert_url] = key
+        return key
+
+    def verify(self, message: Mapping[str, str]) -> bool:
+        """Whether a decoded SNS message carries a valid SNS signature; blocks on a certificate fetch"""
+        cert_url = message.get("SigningCertURL") or ""
+        parsed = urlparse(cert_url)
+        if parsed.scheme != "https" or not SNS_CERT_HOST.match(parsed.hostname or "") \
+                or not parsed.path.endswith(".pem"):
+            return False
+        algorithm = {"1": hashes.SHA1(), "2": hashes.SHA256()}.get(str(message.get("SignatureVersion")))
+        to_sign = sns_string_to_sign(message)
+        if algorithm is None or to_sign is None or not message.get("Signature"):
+            return False
+        try:
+            self._public_key(cert_url).verify(
+                base64.b64decode(message["Signature"]), to_sign.encode("utf-8"), padding.PKCS1v15(), algorithm
+            )
+        except (InvalidSignature, ValueError):
+            return False
+        except requests.RequestException as e:
+            logger.error(f"Could not fetch SNS signing certificate {cert_url}: {e}")
+            return False
+        return True
+
+
+# Create a global instance
+sns_verifier = SNSVerifier()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Backfill profiles.phone_e164 for existing users
+
+Run once after supabase_phone_e164_setup.sql. Profiles are read page by page
+and each page is normalized in one vectorized pass.
+"""
+
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+# Add the app directory to Python path
+sys.path.append(str(Path(__file__).parent / "app"))
+
+PAGE_SIZE = 1000
+
+
+def backfill_phone_numbers():
+    """Normalize every stored phone number and write it to phone_e164"""
+
+    from app.core.phone import normalize_phone_series
+    from app.services.notification_service import notification_service
+
+    if not notification_service.supabase:
+        print("❌ Supabase client not initialized")
+        return False
+
+    print("📞 Backfilling normalized phone numbers...")
+
+    updated = 0
+    invalid = 0
+    page = []
+    users = notification_service.iter_users(columns='id, email, phone', page_size=PAGE_SIZE)
+
+    def write_page(rows):
+        frame = pd.DataFrame(rows)
+        frame['phone_e164'] = normalize_phone_series(frame['phone'])
+        # Upsert on the primary key; email is sent along because it is NOT NULL
+        payload = frame[['id', 'email', 'phone_e164']].to_dict('records')
+        notification_service.supabase.table('profiles').upsert(payload).execute()
+        return len(frame), int((frame['phone'].notna() & frame['phone_e164'].isna()).sum())
+
+    try:
+        for user in users:
+            page.append(user)
+            if len(page) == PAGE_SIZE:
+                count, bad = write_page(page)
+                updated += count
+                invalid += bad
+                page = []
+        if page:
+            count, bad = write_page(page)
+            updated += count
+            invalid += bad
+    except Exception as e:
+        print(f"❌ Backfill failed after {updated} profiles: {e}")
+        return False
+
+    print(f"✅ Updated {updated} profiles")
+    if invalid:
+        print(f"⚠️  {invalid} profiles have a phone number that could not be normalized")
+    return True
+
+
+if __name__ == "__main__":
+    success = backfill_phone_numbers()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Benchmark a detection cycle: per-station run_threat_detection vs the batch engine
+
+Observations are simulated so the numbers don't depend on API keys; pass
+--latency to add a simulated fetch delay per station (seconds) and see how
+the partitioned fetch hides it.
+
+    python benchmark_threat_detection.py --stations 10 100 1000 --latency 0.05
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+# Add the app directory to Python path
+sys.path.append(str(Path(__file__).parent / "app"))
+
+
+def make_fetch(latency: float, seed: int):
+    """Deterministic simulated observation source"""
+
+    def fetch(station):
+        if latency:
+            time.sleep(latency)
+        rng = random.Random(f"{seed}:{station.station_id}")
+        return {
+            "valid": True,
+            "pressure": rng.uniform(940, 1020),
+            "wind_speed": rng.uniform(0, 220),
+            "wind_direction": rng.uniform(0, 360),
+            "temperature": rng.uniform(24, 34),
+            "humidity": rng.uniform(60, 100),
+            "lat": station.latitude,
+            "lon": station.longitude,
+            "tidal_height": rng.uniform(0, 4)
+        }
+
+    return fetch
+
+
+def run_serial(stations, fetch):
+    """The pre-batch cycle: one fetch and one full detection per station"""
+    from app.services.threat_detection import run_threat_detection
+
+    return {
+        station.station_id: run_threat_detection(
+            weather_data=fetch(station), location=station.station_id, station_id=station.station_id
+        )
+        for station in stations
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--stations", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--latency", type=float, default=0.0, help="Simulated fetch latency per station (s)")
+    parser.add_argument("--workers", type=int, default=None, help="Fetch workers for the batch engine")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    import logging
+    logging.disable(logging.WARNING)
+
+    from app.services.batch_detection import Station, run_threat_detection_batch
+
+    fetch = make_fetch(args.latency, args.seed)
+    print(f"⏱️  Detection cycle benchmark (fetch latency {args.latency}s)")
+    print(f"{'stations':>10} {'serial (s)':>12} {'batch (s)':>12} {'fetch':>9} {'assess':>9} {'speedup':>9}")
+
+    for count in args.stations:
+        stations = [Station(f"st{i:05d}", 8.0 + (i % 200) * 0.1, 68.0 + (i // 200) * 0.1) for i in range(count)]
+
+        started = time.perf_counter()
+        serial = run_serial(stations, fetch)
+        serial_seconds = time.perf_counter() - started
+
+        snapshot = run_threat_detection_batch(stations, args.workers, fetch)
+        timings = snapshot["timings"]
+
+        mismatched = sum(
+            serial[station_id]["overall_threat"] != threat["overall_threat"]
+            for station_id, threat in snapshot["stations"].items()
+        )
+        if mismatched:
+            print(f"⚠️  {mismatched} stations assessed differently by the two paths")
+
+        print(f"{count:>10} {serial_seconds:>12.3f} {timings['cycle_seconds']:>12.3f} "
+              f"{timings['fetch_seconds']:>9.3f} {timings['assess_seconds']:>9.3f} "
+              f"{serial_seconds / max(timings['cycle_seconds'], 1e-9):>8.1f}x")
+
+    print("✅ Done")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+-- Supabase SQL script to persist alert deduplication state
+-- Run this in your Supabase SQL editor after supabase_setup.sql
+--
+-- One row per zone (station, named location or rounded coordinates). The
+-- backend writes a row only when the zone's alert state changes: a new alert,
+-- an escalation, a reminder after the suppression window, or the all-clear.
+-- Without this table the backend keeps the same state in a local JSON file.
+
+CREATE TABLE IF NOT EXISTS alert_states (
+    zone TEXT PRIMARY KEY,
+    level TEXT NOT NULL DEFAULT 'CLEAR' CHECK (level IN ('CLEAR', 'HIGH', 'EXTREME')),
+    last_sent_at DOUBLE PRECISION,   -- epoch seconds of the last alert or all-clear
+    clear_since DOUBLE PRECISION,    -- epoch seconds the threat dropped below threshold
+    notification_id UUID,
+    affected_area JSONB,
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+ALTER TABLE alert_states ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Allow authenticated users to read alert states" ON alert_states
+    FOR SELECT USING (auth.role() = 'authenticated');
+
+GRANT ALL ON alert_states TO service_role;
+
+CREATE OR REPLACE FUNCTION touch_alert_states_updated_at()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.updated_at = NOW();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS alert_states_updated_at ON alert_states;
+CREATE TRIGGER alert_states_updated_at
+    BEFORE UPDATE ON alert_states
+    FOR EACH ROW EXECUTE FUNCTION touch_alert_states_updated_at();
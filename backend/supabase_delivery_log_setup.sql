@@ -0,0 +1,59 @@
+-- Supabase SQL script to set up the normalized delivery log
+-- Run this in your Supabase SQL editor after supabase_notifications_setup.sql
+--
+-- `notifications` keeps one row per alert (counts, a small threat summary and
+-- errors aggregated by code). Each recipient/channel attempt is one row in
+-- `notification_deliveries`, written by the backend in multi-row batches.
+
+CREATE TABLE IF NOT EXISTS notification_deliveries (
+    id BIGSERIAL PRIMARY KEY,
+    notification_id UUID NOT NULL REFERENCES notifications(id) ON DELETE CASCADE,
+    user_id TEXT,
+    channel TEXT NOT NULL,
+    status TEXT NOT NULL,
+    error_code TEXT,
+    latency_ms INTEGER,
+    provider_message_id TEXT,
+    created_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_notification_deliveries_notification_id ON notification_deliveries(notification_id);
+CREATE INDEX IF NOT EXISTS idx_notification_deliveries_user_id ON notification_deliveries(user_id);
+-- Only failures are looked up by error code, so keep that index small
+CREATE INDEX IF NOT EXISTS idx_notification_deliveries_failed ON notification_deliveries(notification_id, error_code)
+    WHERE status = 'failed';
+
+ALTER TABLE notification_deliveries ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Allow authenticated users to read deliveries" ON notification_deliveries
+    FOR SELECT USING (auth.role() = 'authenticated');
+
+CREATE POLICY "Allow service role to insert deliveries" ON notification_deliveries
+    FOR INSERT WITH CHECK (auth.role() = 'service_role');
+
+GRANT ALL ON notification_deliveries TO service_role;
+GRANT USAGE, SELECT ON SEQUENCE notification_deliveries_id_seq TO service_role;
+
+-- Allow the backend to fill in the event counts once the fan-out finishes
+CREATE POLICY "Allow service role to update notifications" ON notifications
+    FOR UPDATE USING (auth.role() = 'service_role');
+
+-- Per-channel breakdown for a single alert
+CREATE OR REPLACE FUNCTION get_delivery_breakdown(notification_id_param UUID)
+RETURNS TABLE (
+    channel TEXT,
+    status TEXT,
+    error_code TEXT,
+    deliveries BIGINT
+) AS $$
+BEGIN
+    RETURN QUERY
+    SELECT d.channel, d.status, d.error_code, COUNT(*)
+    FROM notification_deliveries d
+    WHERE d.notification_id = notification_id_param
+    GROUP BY d.channel, d.status, d.error_code
+    ORDER BY d.channel, d.status;
+END;
+$$ LANGUAGE plpgsql;
+
+GRANT EXECUTE ON FUNCTION get_delivery_breakdown(UUID) TO authenticated;
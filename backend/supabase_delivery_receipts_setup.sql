@@ -0,0 +1,91 @@
+-- Supabase SQL script to store provider delivery receipts
+-- Run this in your Supabase SQL editor after supabase_delivery_log_setup.sql
+--
+-- Providers report final delivery state (Twilio status callbacks, SNS delivery
+-- status logs, push receipts) to /api/v1/webhooks/*. The backend buffers them
+-- and upserts one row per provider message id in batches through
+-- ingest_delivery_receipts(). Receipts join to notification_deliveries on
+-- provider_message_id, which the backend records at send time.
+
+CREATE TABLE IF NOT EXISTS delivery_receipts (
+    provider_message_id TEXT PRIMARY KEY,
+    provider TEXT NOT NULL,
+    status TEXT NOT NULL,          -- queued, sent, delivered, failed
+    status_rank SMALLINT NOT NULL, -- out-of-order callbacks never move a message backwards
+    error_code TEXT,
+    received_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- Receipts are looked up from the delivery rows of one alert, so index the join key there
+CREATE INDEX IF NOT EXISTS idx_notification_deliveries_provider_message_id
+    ON notification_deliveries(provider_message_id)
+    WHERE provider_message_id IS NOT NULL;
+
+ALTER TABLE delivery_receipts ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Allow authenticated users to read receipts" ON delivery_receipts
+    FOR SELECT USING (auth.role() = 'authenticated');
+
+GRANT ALL ON delivery_receipts TO service_role;
+
+-- Batched upsert: one call per flush, keeping the furthest state per message
+CREATE OR REPLACE FUNCTION ingest_delivery_receipts(receipts JSONB)
+RETURNS INTEGER AS $$
+DECLARE
+    affected INTEGER;
+BEGIN
+    INSERT INTO delivery_receipts AS r (provider_message_id, provider, status, status_rank, error_code, received_at)
+    SELECT provider_message_id, provider, status, status_rank, error_code, COALESCE(received_at, NOW())
+    FROM jsonb_to_recordset(receipts) AS x(
+        provider_message_id TEXT,
+        provider TEXT,
+        status TEXT,
+        status_rank SMALLINT,
+        error_code TEXT,
+        received_at TIMESTAMPTZ
+    )
+    ON CONFLICT (provider_message_id) DO UPDATE SET
+        status = EXCLUDED.status,
+        status_rank = EXCLUDED.status_rank,
+        error_code = COALESCE(EXCLUDED.error_code, r.error_code),
+        received_at = EXCLUDED.received_at
+    WHERE r.status_rank <= EXCLUDED.status_rank;
+
+    GET DIAGNOSTICS affected = ROW_COUNT;
+    RETURN affected;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+GRANT EXECUTE ON FUNCTION ingest_delivery_receipts(JSONB) TO service_role;
+
+-- Delivered rate per channel for one alert. Touches only that alert's
+-- delivery rows (notification_id index) and their receipts (primary key),
+-- so it stays fast however many receipts are stored in total.
+CREATE OR REPLACE FUNCTION get_delivered_rate(notification_id_param UUID)
+RETURNS TABLE (
+    channel TEXT,
+    sent BIGINT,
+    delivered BIGINT,
+    failed BIGINT,
+    awaiting_receipt BIGINT,
+    delivered_rate NUMERIC
+) AS $$
+BEGIN
+    RETURN QUERY
+    SELECT
+        d.channel,
+        COUNT(*) AS sent,
+        COUNT(*) FILTER (WHERE r.status = 'delivered') AS delivered,
+        COUNT(*) FILTER (WHERE r.status = 'failed') AS failed,
+        COUNT(*) FILTER (WHERE r.provider_message_id IS NULL OR r.status_rank < 2) AS awaiting_receipt,
+        ROUND(COUNT(*) FILTER (WHERE r.status = 'delivered')::NUMERIC / NULLIF(COUNT(*), 0), 4) AS delivered_rate
+    FROM notification_deliveries d
+    LEFT JOIN delivery_receipts r ON r.provider_message_id = d.provider_message_id
+    WHERE d.notification_id = notification_id_param
+      AND d.status = 'sent'
+    GROUP BY d.channel
+    ORDER BY d.channel;
+END;
+$$ LANGUAGE plpgsql;
+
+GRANT EXECUTE ON FUNCTION get_delivered_rate(UUID) TO authenticated;
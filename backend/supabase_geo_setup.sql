@@ -0,0 +1,22 @@
+-- Supabase SQL script to add user coordinates for area targeting
+-- Run this in your Supabase SQL editor after supabase_setup.sql
+--
+-- Alerts carrying an inundation polygon or a storm track are sent only to
+-- users inside that area. Users are matched on their own coordinates, or on
+-- the coordinates of their evacuation zones ({"lat": .., "lng": ..} or a
+-- GeoJSON Point/Polygon in evacuation_zones.coordinates) when they have none.
+-- The backend keeps the spatial index in memory; these columns are its source.
+
+ALTER TABLE profiles ADD COLUMN IF NOT EXISTS latitude DOUBLE PRECISION;
+ALTER TABLE profiles ADD COLUMN IF NOT EXISTS longitude DOUBLE PRECISION;
+
+ALTER TABLE profiles DROP CONSTRAINT IF EXISTS profiles_coordinates_check;
+ALTER TABLE profiles ADD CONSTRAINT profiles_coordinates_check CHECK (
+    (latitude IS NULL AND longitude IS NULL)
+    OR (latitude BETWEEN -90 AND 90 AND longitude BETWEEN -180 AND 180)
+);
+
+-- Verify the columns were added
+SELECT column_name, data_type
+FROM information_schema.columns
+WHERE table_name = 'profiles' AND column_name IN ('latitude', 'longitude');
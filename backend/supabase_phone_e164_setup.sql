@@ -0,0 +1,18 @@
+-- Supabase SQL script to store normalized phone numbers
+-- Run this in your Supabase SQL editor after supabase_setup.sql
+--
+-- `profiles.phone_e164` holds the E.164 form of `phone`, written by the backend
+-- whenever a profile is created or its phone changes. Senders read it directly
+-- instead of re-validating the raw number on every alert. Fill existing rows
+-- with `python backfill_phone_numbers.py`.
+
+ALTER TABLE profiles ADD COLUMN IF NOT EXISTS phone_e164 TEXT;
+
+-- SMS targeting only looks at users that have a usable number
+CREATE INDEX IF NOT EXISTS idx_profiles_phone_e164 ON profiles(phone_e164)
+    WHERE phone_e164 IS NOT NULL;
+
+-- Verify the column was added
+SELECT column_name, data_type
+FROM information_schema.columns
+WHERE table_name = 'profiles' AND column_name = 'phone_e164';
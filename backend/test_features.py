@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Test script to verify FeaturePipeline's single-row path matches its batch path
+
+transform_one() and transform() must give the same features for the same
+observations: missing, None, NaN and non-numeric values, and dates as ISO
+and slash-separated strings, epoch seconds, date and datetime objects.
+"""
+
+import sys
+from datetime import date, datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Add the app directory to Python path
+sys.path.append(str(Path(__file__).parent / "app"))
+
+FEATURES = ['day_of_year', 'month', 'hour', 'wind_speed', 'pressure', 'wave_height']
+FILL_VALUES = {'wind_speed': 12.0, 'pressure': 1008.0, 'wave_height': 1.5}
+
+RECORDS = [
+    {'date': '2020-01-05T03:00:00', 'wind_speed': 10.0, 'pressure': 1000.0, 'wave_height': 2.0},
+    {'date': '2020/01/05 03:00', 'wind_speed': np.nan, 'pressure': None, 'wave_height': '2.5'},
+    {'date': 1578193200, 'wind_speed': 'calm', 'pressure': 990.5},
+    {'date': 1578193200.0, 'wind_speed': float('nan'), 'pressure': 1001.0, 'wave_height': np.float32('nan')},
+    {'date': date(2020, 3, 1), 'wind_speed': 25, 'pressure': 995, 'wave_height': 4},
+    {'date': datetime(2020, 7, 14, 18, 30), 'wind_speed': np.float64(33.3), 'pressure': 980.0, 'wave_height': 6.1},
+    {'date': '05 Jan 2020 17:00', 'wind_speed': 5.0, 'pressure': 1012.0, 'wave_height': 0.5},
+    {'date': 'not a date', 'wind_speed': 8.0, 'pressure': 1010.0, 'wave_height': 1.0},
+    {'wind_speed': 8.0, 'pressure': 1010.0, 'wave_height': 1.0},
+    {'date': None, 'day_of_year': 200, 'month': 7, 'hour': 6, 'wind_speed': 8.0},
+]
+
+
+def compare(pipeline, records, label):
+    batch = pipeline.transform(pd.DataFrame(records))
+    single = np.vstack([pipeline.transform_one(record).copy() for record in records])
+    mismatched = ~np.isclose(batch, single, equal_nan=True)
+    if mismatched.any():
+        for row, column in zip(*np.nonzero(mismatched)):
+            print(f"❌ {label}: row {row} {pipeline.features[column]}: "
+                  f"batch {batch[row, column]} vs single {single[row, column]} ({records[row]})")
+        return False
+    if np.isnan(single).any():
+        print(f"❌ {label}: NaN left in the features")
+        return False
+    print(f"✅ {label}: {len(records)} rows match")
+    return True
+
+
+def test_paths_match():
+    """Every record of the mixed set, together and with each date type in its own column"""
+    from app.ml_models.features import FeaturePipeline
+
+    print("🔢 Comparing transform() and transform_one()...")
+    pipeline = FeaturePipeline(FEATURES, FILL_VALUES)
+    results = [compare(pipeline, RECORDS, "mixed inputs")]
+    # A column of only numbers (or only strings) takes a different batch parsing path
+    results.append(compare(pipeline, [r for r in RECORDS if isinstance(r.get('date'), (int, float))], "epoch dates"))
+    results.append(compare(pipeline, [r for r in RECORDS if isinstance(r.get('date'), str)], "string dates"))
+    return all(results)
+
+
+def test_dates_read():
+    """Slash-separated and epoch dates give the right day, not the current time or 1970"""
+    from app.ml_models.features import FeaturePipeline
+
+    print("📅 Checking parsed dates...")
+    pipeline = FeaturePipeline(FEATURES, FILL_VALUES)
+    expected = [5, 1, 3]  # 2020-01-05 03:00
+    for value in ('2020/01/05 03:00', pd.Timestamp('2020-01-05T03:00').timestamp()):
+        features = pipeline.transform_one({'date': value})[0][:3].tolist()
+        if features != expected:
+            print(f"❌ {value!r} gave {features}, expected {expected}")
+            return False
+    print("✅ Dates read correctly")
+    return True
+
+
+def main():
+    print("🧪 Feature Pipeline Parity Test")
+    print("=" * 60)
+    results = [test_dates_read(), test_paths_match()]
+    print("\n" + "=" * 60)
+    if all(results):
+        print("🎉 Single-row and batch features match")
+        return True
+    print("❌ Single-row and batch features differ")
+    return False
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Test script to verify labeling.py against the per-event mask loop
+
+Covers overlapping events, events with a missing start or end, events
+that end before they start, and station-specific and station-less events.
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Add the app directory to Python path
+sys.path.append(str(Path(__file__).parent / "app"))
+
+from benchmark_labeling import label_loop, make_buoy, make_events
+
+
+def label_loop_by_station(buoy, cyclones, station_col):
+    """label_loop, with each event limited to its station (station-less events apply everywhere)"""
+    buoy = buoy.copy()
+    buoy["label"] = "NORMAL"
+    for _, row in cyclones.iterrows():
+        start, end = row["start_date"], row["end_date"]
+        if pd.notnull(start) and pd.notnull(end):
+            mask = (buoy["date"] >= start) & (buoy["date"] <= end)
+            if pd.notnull(row[station_col]):
+                mask &= buoy[station_col] == row[station_col]
+            buoy.loc[mask, "label"] = "CYCLONE"
+    return buoy
+
+
+def make_awkward_events(buoy, seed):
+    """Random overlapping windows plus missing and reversed ones, some without a station"""
+    events = make_events(buoy, 60, seed)
+    rng = np.random.default_rng(seed + 2)
+    # Reversed windows, each overlapping a valid one
+    reversed_events = events.sample(10, random_state=seed).rename(
+        columns={"start_date": "end_date", "end_date": "start_date"})
+    events = pd.concat([events, reversed_events], ignore_index=True)
+    events.loc[rng.choice(len(events), 5, replace=False), "start_date"] = pd.NaT
+    events.loc[rng.choice(len(events), 5, replace=False), "end_date"] = pd.NaT
+    stations = buoy["station"].unique()
+    events["station"] = rng.choice(stations, len(events))
+    events.loc[rng.choice(len(events), 10, replace=False), "station"] = None
+    return events
+
+
+def test_labels_match_loop(seed=1):
+    """Same labels as the loop, with and without per-station events"""
+    from app.ml_models.labeling import label_cyclone_windows
+
+    print(f"🏷️  Comparing labels with the mask loop (seed {seed})...")
+    buoy = make_buoy(20_000, 4, seed)
+    events = make_awkward_events(buoy, seed)
+
+    expected = label_loop(buoy, events)["label"].to_numpy()
+    labeled = label_cyclone_windows(buoy, events)["label"].to_numpy().astype(str)
+    if not (expected == labeled).all():
+        print(f"❌ {(expected != labeled).sum()} labels differ (all events)")
+        return False
+
+    expected = label_loop_by_station(buoy, events, "station")["label"].to_numpy()
+    labeled = label_cyclone_windows(buoy, events, station_col="station")["label"].to_numpy().astype(str)
+    if not (expected == labeled).all():
+        print(f"❌ {(expected != labeled).sum()} labels differ (per-station events)")
+        return False
+
+    print(f"✅ Labels match ({(labeled == 'CYCLONE').sum():,} CYCLONE rows)")
+    return True
+
+
+def test_reversed_event_ignored():
+    """An event ending before it starts must not cancel an overlapping one"""
+    from app.ml_models.labeling import count_active_events
+
+    print("🔁 Testing a reversed event overlapping a valid one...")
+    buoy = pd.DataFrame({"date": pd.date_range("2020-01-01", periods=10, freq="D")})
+    events = pd.DataFrame({"start_date": pd.to_datetime(["2020-01-02", "2020-01-06"]),
+                           "end_date": pd.to_datetime(["2020-01-08", "2020-01-03"])})
+    counts = count_active_events(buoy, events)
+    expected = [0, 1, 1, 1, 1, 1, 1, 1, 0, 0]
+    if counts.tolist() != expected:
+        print(f"❌ Got {counts.tolist()}, expected {expected}")
+        return False
+    print("✅ Reversed event ignored")
+    return True
+
+
+def main():
+    print("🧪 Labeling Test")
+    print("=" * 60)
+    results = [test_reversed_event_ignored()] + [test_labels_match_loop(seed) for seed in (1, 2, 3)]
+    print("\n" + "=" * 60)
+    if all(results):
+        print("🎉 labeling.py matches the per-event loop")
+        return True
+    print("❌ labeling.py disagrees with the per-event loop")
+    return False
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)